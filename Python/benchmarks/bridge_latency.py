@@ -0,0 +1,218 @@
+"""
+Benchmark the shared-memory simulator bridge against a socket/JSON bridge.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmarks/bridge_latency.py --steps 20000
+    python benchmarks/bridge_latency.py --output bridge_latency.json
+
+The cartpole sample's simulator runs in a separate process, started with
+subprocess as an external simulator would be, and is driven one step at a
+time from this process. One round trip is `episode_step(action)` followed by
+`get_state()`, the work of an EpisodeStep event. Reported per bridge, in
+microseconds per round trip: mean, p50, p99 and max, plus round trips/s.
+  - in-process: the simulator called directly, for reference
+  - socket/json: newline-delimited JSON over a localhost TCP connection
+  - shared memory: SharedMemoryBridge, layout from cartpole_description.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from microsoft_bonsai_api.simulator.bridge import BridgeLayout, SharedMemoryBridge, serve
+from microsoft_bonsai_api.simulator.description import load_description
+
+CARTPOLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "samples", "cartpole")
+
+
+class CartPoleSim:
+    """The cartpole model with the sample session's interface."""
+
+    def __init__(self):
+        sys.path.insert(0, CARTPOLE)
+        from sim.cartpole import CartPole
+
+        self.model = CartPole()
+
+    def episode_start(self, config):
+        self.model.reset(**config)
+
+    def episode_step(self, action):
+        self.model.step(action["command"])
+
+    def get_state(self):
+        return self.model.state
+
+    def halted(self):
+        return abs(self.model.state["cart_position"]) > self.model.x_threshold
+
+
+def layout():
+    with open(os.path.join(CARTPOLE, "cartpole_description.json")) as fh:
+        return BridgeLayout.from_description(load_description(json.load(fh)))
+
+
+class SocketBridge:
+    """Client end of the socket/JSON bridge."""
+
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        self.state = None
+
+    def _call(self, message):
+        self.sock.sendall(json.dumps(message).encode() + b"\n")
+        self.state = json.loads(self.reader.readline())["state"]
+
+    def episode_start(self, config):
+        self._call({"command": "start", "config": config})
+
+    def episode_step(self, action):
+        self._call({"command": "step", "action": action})
+
+    def get_state(self):
+        return self.state
+
+    def close(self):
+        self.sock.sendall(b'{"command": "close"}\n')
+        self.sock.close()
+
+
+def serve_socket(port):
+    sim = CartPoleSim()
+    with socket.create_server(("127.0.0.1", port)) as server:
+        print("listening", flush=True)
+        conn, _ = server.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with conn, conn.makefile("rb") as reader:
+            for line in reader:
+                message = json.loads(line)
+                if message["command"] == "close":
+                    return
+                if message["command"] == "start":
+                    sim.episode_start(message["config"])
+                else:
+                    sim.episode_step(message["action"])
+                reply = {"state": sim.get_state(), "halted": sim.halted()}
+                conn.sendall(json.dumps(reply).encode() + b"\n")
+
+
+def measure(sim, steps, seed):
+    rng = random.Random(seed)
+    times = np.empty(steps)
+    sim.episode_start({"initial_pole_angle": 0.0})
+    for i in range(steps):
+        action = {"command": rng.uniform(-1, 1)}
+        start = time.perf_counter()
+        sim.episode_step(action)
+        state = sim.get_state()
+        times[i] = time.perf_counter() - start
+        if abs(state["cart_position"]) > 1.0 or i % 200 == 199:
+            sim.episode_start({"initial_pole_angle": rng.uniform(-0.05, 0.05)})
+    micros = times * 1e6
+    return {
+        "mean_us": float(micros.mean()),
+        "p50_us": float(np.percentile(micros, 50)),
+        "p99_us": float(np.percentile(micros, 99)),
+        "max_us": float(micros.max()),
+        "round_trips_per_s": float(steps / times.sum()),
+    }
+
+
+def worker_command(*args):
+    return [sys.executable, os.path.abspath(__file__), "--worker", *map(str, args)]
+
+
+def run_socket(steps, seed, port):
+    process = subprocess.Popen(worker_command("socket", port), stdout=subprocess.PIPE)
+    try:
+        process.stdout.readline()  # listening
+        bridge = SocketBridge(port)
+        result = measure(bridge, steps, seed)
+        bridge.close()
+    finally:
+        process.wait(10)
+    return result
+
+
+def run_shared_memory(steps, seed):
+    bridge = SharedMemoryBridge(layout())
+    process = subprocess.Popen(worker_command("shm", bridge.name))
+    try:
+        bridge.wait_ready(timeout=30)
+        result = measure(bridge, steps, seed)
+    finally:
+        bridge.close()
+        process.wait(10)
+    return result
+
+
+def print_table(results):
+    print(
+        "{:<14} {:>9} {:>9} {:>9} {:>10} {:>14}".format(
+            "bridge", "mean us", "p50 us", "p99 us", "max us", "round trips/s"
+        )
+    )
+    for name, result in results.items():
+        print(
+            "{:<14} {:>9.1f} {:>9.1f} {:>9.1f} {:>10.1f} {:>14.0f}".format(
+                name,
+                result["mean_us"],
+                result["p50_us"],
+                result["p99_us"],
+                result["max_us"],
+                result["round_trips_per_s"],
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=9200, help="for the socket bridge")
+    parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    parser.add_argument("--worker", nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        kind, where = args.worker
+        if kind == "socket":
+            serve_socket(int(where))
+        else:
+            serve(CartPoleSim(), layout(), where)
+        return
+
+    results = {
+        "in-process": measure(CartPoleSim(), args.steps, args.seed),
+        "socket/json": run_socket(args.steps, args.seed, args.port),
+        "shared memory": run_shared_memory(args.steps, args.seed),
+    }
+    print_table(results)
+
+    if args.output:
+        report = {
+            "steps": args.steps,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=1)
+        print("Results written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark the exported brain clients against per-request connections.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmarks/exported_brain.py --seconds 3 --episodes 16
+    python benchmarks/exported_brain.py --url http://localhost:5000
+
+Without --url a stand-in brain (aiohttp) is started locally; with --url the
+state must be one the brain accepts, see --state. Reports predictions/s for
+  - requests.get: a new connection per prediction, as in the samples
+  - predict: ExportedBrainClient, one episode
+  - predict_many: ExportedBrainClient, --episodes episodes at once
+  - async: ExportedBrainClientAsync, --episodes episodes at once
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+import requests
+
+from microsoft_bonsai_api.simulator.exported_brain import (
+    ExportedBrainClient,
+    ExportedBrainClientAsync,
+)
+
+
+def serve_stand_in(port):
+    from aiohttp import web
+
+    async def predict(request):
+        state = await request.json()
+        return web.json_response({"command": -state["cart_position"]})
+
+    app = web.Application()
+    app.router.add_get("/v1/prediction", predict)
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+
+def wait_until_up(url, seconds=10):
+    deadline = time.perf_counter() + seconds
+    while True:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def rate(predict_batch, batch, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        predict_batch()
+        count += batch
+    return count / (time.perf_counter() - start)
+
+
+def run_async(url, state, episodes, seconds):
+    async def main():
+        states = [state] * episodes
+        async with ExportedBrainClientAsync(url, pool_size=episodes) as client:
+            count = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                await client.predict_many(states)
+                count += episodes
+            return count / (time.perf_counter() - start)
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--state", default='{"cart_position": 0.1}')
+    parser.add_argument("--episodes", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        url = "http://127.0.0.1:{}".format(args.port)
+        server = multiprocessing.Process(target=serve_stand_in, args=(args.port,), daemon=True)
+        server.start()
+        wait_until_up(url)
+
+    state = json.loads(args.state)
+    states = [state] * args.episodes
+    results = {}
+    try:
+        results["requests.get"] = rate(
+            lambda: requests.get(url + "/v1/prediction", json=state).json(), 1, args.seconds
+        )
+        with ExportedBrainClient(url, pool_size=args.episodes) as client:
+            results["predict"] = rate(lambda: client.predict(state), 1, args.seconds)
+            results["predict_many"] = rate(
+                lambda: client.predict_many(states), args.episodes, args.seconds
+            )
+        results["async"] = run_async(url, state, args.episodes, args.seconds)
+    finally:
+        if server is not None:
+            server.terminate()
+
+    for name, value in results.items():
+        print("{:<14} {:>12,.0f} predictions/s".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
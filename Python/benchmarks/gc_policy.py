@@ -0,0 +1,162 @@
+"""
+Benchmark step latency of a simulator loop with and without GCPolicy.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmarks/gc_policy.py --episodes 50 --heap-objects 300000
+    python benchmarks/gc_policy.py --output gc_policy.json
+
+Each mode runs in its own process. A step does the per-step work of the
+cartpole sample's main loop without a platform connection: deserialize an
+EpisodeStep event, step the cartpole model, serialize the SimulatorState and
+build the pandas row that --log-iterations writes. The last --keep rows are
+kept, as trajectory buffers and caches keep objects alive across episodes,
+and --heap-objects long-lived objects stand in for what a real simulator
+loads at start-up. Reported per
+mode: step latency p50/p99/p99.9/max in milliseconds, collections per generation
+and their longest pause.
+  - default: CPython's automatic collection
+  - policy: GCPolicy, freeze after start-up, collect at EpisodeFinish
+"""
+
+import argparse
+import collections
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+CARTPOLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "samples", "cartpole")
+
+STEP_EVENT = {
+    "type": "EpisodeStep",
+    "sessionId": "0123",
+    "sequenceId": 1,
+    "episodeStep": {"action": {"command": 0.0}},
+}
+
+
+def worker(mode, episodes, steps, heap_objects, keep, seed):
+    import pandas as pd
+
+    from microsoft_bonsai_api.simulator.gc_policy import GCPolicy
+    from microsoft_bonsai_api.simulator.generated.models import Event, SimulatorState
+
+    sys.path.insert(0, CARTPOLE)
+    from sim.cartpole import CartPole
+
+    rng = random.Random(seed)
+    heap = [{"index": i, "values": [float(i)]} for i in range(heap_objects)]
+    kept = collections.deque(maxlen=keep)
+    model = CartPole()
+    if mode == "policy":
+        policy = GCPolicy()
+        policy.after_registration()
+    else:
+        policy = GCPolicy(defer=False, freeze=False)
+
+    for episode in range(1, episodes + 1):
+        policy.on_event("EpisodeStart")
+        model.reset(initial_pole_angle=rng.uniform(-0.05, 0.05))
+        for iteration in range(1, steps + 1):
+            policy.on_event("EpisodeStep")
+            STEP_EVENT["episodeStep"]["action"]["command"] = rng.uniform(-1, 1)
+            start = time.perf_counter()
+            event = Event.deserialize(STEP_EVENT)
+            model.step(event.episode_step.action["command"])
+            state = SimulatorState(sequence_id=event.sequence_id, state=model.state, halted=False)
+            state.serialize()
+            row = dict(episode=episode, iteration=iteration, **model.state)
+            pd.DataFrame([row])
+            kept.append(row)
+            policy.record_step(time.perf_counter() - start)
+        policy.on_event("EpisodeFinish")
+
+    result = policy.report()
+    policy.close()
+    del heap
+    print(json.dumps(result))
+
+
+def run(mode, args):
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--worker",
+        mode,
+        "--episodes",
+        str(args.episodes),
+        "--steps",
+        str(args.steps),
+        "--heap-objects",
+        str(args.heap_objects),
+        "--keep",
+        str(args.keep),
+        "--seed",
+        str(args.seed),
+    ]
+    process = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def print_table(results):
+    print(
+        "{:<8} {:>8} {:>8} {:>9} {:>8} {:>12} {:>12} {:>8}".format(
+            "mode", "p50 ms", "p99 ms", "p99.9 ms", "max ms", "gc 0/1/2", "max gc ms", "RSS MB"
+        )
+    )
+    for name, result in results.items():
+        print(
+            "{:<8} {:>8.3f} {:>8.3f} {:>9.3f} {:>8.2f} {:>12} {:>12.2f} {:>8.1f}".format(
+                name,
+                result["p50_ms"],
+                result["p99_ms"],
+                result["p999_ms"],
+                result["max_ms"],
+                "/".join(str(count) for count in result["collections"]),
+                result["max_collection_ms"],
+                result["rss_mb"],
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--episodes", type=int, default=50)
+    parser.add_argument("--steps", type=int, default=200, help="per episode")
+    parser.add_argument("--heap-objects", type=int, default=300000)
+    parser.add_argument("--keep", type=int, default=50000, help="rows kept alive")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.episodes, args.steps, args.heap_objects, args.keep, args.seed)
+        return
+
+    results = {mode: run(mode, args) for mode in ("default", "policy")}
+    print_table(results)
+
+    if args.output:
+        report = {
+            "episodes": args.episodes,
+            "steps": args.steps,
+            "heap_objects": args.heap_objects,
+            "keep": args.keep,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=1)
+        print("Results written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
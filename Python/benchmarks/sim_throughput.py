@@ -0,0 +1,391 @@
+"""
+Benchmark every sample simulator headless, without a platform connection.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmarks/sim_throughput.py --seconds 2 --output sim_throughput.json
+    python benchmarks/sim_throughput.py --sims cartpole house-energy --seed 1
+
+Each simulator runs in its own process, started in its sample directory, and
+is driven by a random policy seeded with --seed. Reported per simulator:
+  - resets_per_s: episode starts per wall second
+  - steps_per_s: steps per wall second, episode starts excluded
+  - net_blocks_per_step: growth of sys.getallocatedblocks() per step over the
+    step phase; anything above 0 is memory kept between episodes
+  - gc_collections: garbage collections per generation during the step phase
+  - traced_peak_kb: peak Python memory allocated during one episode, measured
+    in a separate pass with tracemalloc
+  - import_rss_mb, peak_rss_mb: peak RSS after importing the simulator and at
+    the end of the run, NaN where the resource module is missing (Windows)
+
+CPython exposes no allocation counter, so net blocks, collections and the
+traced peak stand in for allocation counts. Simulators whose dependencies are
+not installed (gym, highway_env, pymgrid, ...) are reported as
+skipped with the import error. Results are printed as a table and, with
+--output, written as JSON.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, NamedTuple
+
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "samples")
+
+
+class Target(NamedTuple):
+    # starts an episode
+    reset: Callable[[], None]
+    # advances one step; returns True when the episode ended early
+    step: Callable[[], bool]
+    # steps per episode unless it ends early, the sample's iteration limit
+    episode_length: int
+
+
+def cartpole(rng):
+    from sim.cartpole import CartPole
+
+    model = CartPole()
+
+    def reset():
+        model.reset(
+            initial_pole_angle=rng.uniform(-0.05, 0.05),
+            initial_angular_velocity=rng.uniform(-0.05, 0.05),
+        )
+
+    def step():
+        model.step(rng.choice((-1.0, 1.0)))
+        model.state
+        return False
+
+    return Target(reset, step, 200)
+
+
+def quanser_qube(rng, integrator="odeint"):
+    from sim.qube_simulator import QubeSimulator
+
+    sim = QubeSimulator(integrator=integrator)
+
+    def step():
+        sim.step(rng.uniform(-3.0, 3.0))
+        return False
+
+    return Target(sim.reset, step, 640)
+
+
+def house_energy(rng):
+    from sim.house_simulator import House
+
+    # the sample builds a new House per episode
+    house = None
+
+    def reset():
+        nonlocal house
+        house = House()
+
+    def step():
+        house.update_hvacON(rng.randint(0, 1))
+        house.update_Tin()
+        house.get_Power()
+        return False
+
+    reset()
+    return Target(reset, step, 288)
+
+
+def microgrid(rng):
+    from sim.microgrid_sim import MicrogridSim
+
+    sim = MicrogridSim()
+    last_start = len(sim._load) - sim.episode_length
+
+    def reset():
+        sim.episode_start({"starting_time_step": rng.randrange(last_start)})
+        sim.get_state()
+
+    def step():
+        sim.episode_step(
+            {
+                "pv_to_consume": rng.uniform(0, 73225.11),
+                "battery_power": rng.uniform(-16327, 16327),
+                "grid_power": rng.uniform(-99625, 99625),
+            }
+        )
+        sim.get_state()
+        return False
+
+    return Target(reset, step, 200)
+
+
+def plastic_extrusion(rng):
+    from sim import extrusion_model as em
+    from sim import units
+
+    # the update of main.ExtruderSimulation, whose module needs bonsai_common
+    ω_s = f_c = T = 0.0
+
+    def reset():
+        nonlocal ω_s, f_c, T
+        ω_s, f_c, T = 10.0, 1.0, units.celsius_to_kelvin(190)
+        model = em.ExtrusionModel(ω=ω_s, Δω=0, f_c=f_c, T=T, Δt=1)
+        T += model.ΔT
+
+    def step():
+        nonlocal ω_s, f_c, T
+        Δω_s = rng.uniform(-0.021, 0.021) * (1 + rng.uniform(-0.0001, 0.0001))
+        Δf_c = rng.uniform(-0.01, 0.01) * (1 + rng.uniform(-0.0001, 0.0001))
+        ω_s += Δω_s
+        f_c += Δf_c
+        model = em.ExtrusionModel(ω=ω_s, Δω=Δω_s, f_c=f_c, T=T, Δt=1)
+        T += model.ΔT
+        return False
+
+    return Target(reset, step, 200)
+
+
+def lunarlander(rng):
+    from sim.LunarLander import LunarLander
+
+    sim = LunarLander(debug=False)
+
+    def reset():
+        sim.episode_start({})
+
+    def step():
+        sim.episode_step(
+            {"engine1": rng.uniform(-1.0, 1.0), "engine2": rng.uniform(-1.0, 1.0)}
+        )
+        sim.get_state()
+        return sim.terminal
+
+    return Target(reset, step, 640)
+
+
+def gym_highway(rng):
+    import gym
+    import highway_env  # registers highway-v0
+
+    env = gym.make("highway-v0")
+    env.seed(rng.randrange(2 ** 31))
+
+    def step():
+        _, _, done, _ = env.step(rng.randrange(env.action_space.n))
+        return done
+
+    return Target(env.reset, step, 640)
+
+
+def simple_adder(rng):
+    from sim.simulator_model import SimulatorModel
+
+    sim = SimulatorModel()
+
+    def reset():
+        sim.reset({"initial_value": rng.uniform(0, 100)})
+
+    def step():
+        sim.step({"addend": rng.uniform(-10, 10)})
+        return False
+
+    return Target(reset, step, 10)
+
+
+# name: (sample directory, builds the Target from a random.Random)
+SIMULATORS = {
+    "cartpole": ("cartpole", cartpole),
+    "quanser-qube": ("quanser-qube", quanser_qube),
+    "quanser-qube-rk4": ("quanser-qube", lambda rng: quanser_qube(rng, "rk4")),
+    "house-energy": ("house-energy", house_energy),
+    "microgrid": ("microgrid", microgrid),
+    "plastic-extrusion": ("plastic-extrusion", plastic_extrusion),
+    "lunarlander": ("lunarlander", lunarlander),
+    "gym-highway": ("gym-highway", gym_highway),
+    "simple-adder": ("simple-adder", simple_adder),
+}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # not available on Windows
+        return float("nan")
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def run_episode(target):
+    """Steps taken in one episode, from an already started one."""
+    for steps in range(1, target.episode_length + 1):
+        if target.step():
+            break
+    return steps
+
+
+def measure(name, seconds, seed):
+    """Benchmark simulator `name`, from its sample directory."""
+    random.seed(seed)
+    try:
+        import numpy as np
+
+        np.random.seed(seed)
+    except ImportError:
+        pass
+    rng = random.Random(seed)
+
+    try:
+        target = SIMULATORS[name][1](rng)
+    except ImportError as error:
+        return {"skipped": "{}: {}".format(type(error).__name__, error)}
+    import_rss = peak_rss_mb()
+
+    # warm up caches and lazily imported modules
+    target.reset()
+    run_episode(target)
+
+    resets = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds / 4:
+        target.reset()
+        resets += 1
+    resets_per_s = resets / (time.perf_counter() - start)
+
+    gc.collect()
+    collections = [stats["collections"] for stats in gc.get_stats()]
+    blocks = sys.getallocatedblocks()
+    steps = episodes = 0
+    elapsed = 0.0
+    while elapsed < seconds:
+        target.reset()
+        start = time.perf_counter()
+        steps += run_episode(target)
+        elapsed += time.perf_counter() - start
+        episodes += 1
+    collections = [
+        stats["collections"] - before
+        for stats, before in zip(gc.get_stats(), collections)
+    ]
+    gc.collect()
+    net_blocks = sys.getallocatedblocks() - blocks
+
+    tracemalloc.start()
+    target.reset()
+    tracemalloc.reset_peak()
+    run_episode(target)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "episodes": episodes,
+        "steps": steps,
+        "resets_per_s": resets_per_s,
+        "steps_per_s": steps / elapsed,
+        "net_blocks_per_step": net_blocks / steps,
+        "gc_collections": collections,
+        "traced_peak_kb": traced_peak / 1024,
+        "import_rss_mb": import_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def worker(name, seconds, seed):
+    sys.path.insert(0, os.getcwd())
+    # simulators print progress, keep stdout for the result
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = measure(name, seconds, seed)
+    print(json.dumps(result))
+
+
+def run(name, seconds, seed, timeout):
+    directory = os.path.normpath(os.path.join(SAMPLES, SIMULATORS[name][0]))
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--worker",
+        name,
+        "--seconds",
+        str(seconds),
+        "--seed",
+        str(seed),
+    ]
+    try:
+        process = subprocess.run(
+            command, cwd=directory, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": "timed out after {} s".format(timeout)}
+    lines = process.stdout.strip().splitlines()
+    if process.returncode or not lines:
+        stderr = process.stderr.strip().splitlines()
+        return {"error": stderr[-1] if stderr else "exit code {}".format(process.returncode)}
+    return json.loads(lines[-1])
+
+
+def print_table(results):
+    print(
+        "{:<18} {:>10} {:>12} {:>12} {:>14} {:>10} {:>9}".format(
+            "simulator", "resets/s", "steps/s", "blocks/step", "gc 0/1/2", "traced kB", "RSS MB"
+        )
+    )
+    for name, result in results.items():
+        if "steps_per_s" not in result:
+            print("{:<18} {}".format(name, result.get("skipped") or result.get("error")))
+            continue
+        print(
+            "{:<18} {:>10.0f} {:>12.0f} {:>12.3f} {:>14} {:>10.1f} {:>9.1f}".format(
+                name,
+                result["resets_per_s"],
+                result["steps_per_s"],
+                result["net_blocks_per_step"],
+                "/".join(str(count) for count in result["gc_collections"]),
+                result["traced_peak_kb"],
+                result["peak_rss_mb"],
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sims", nargs="+", choices=sorted(SIMULATORS), default=list(SIMULATORS))
+    parser.add_argument("--seconds", type=float, default=2.0, help="step phase per simulator")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="per simulator")
+    parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.seconds, args.seed)
+        return
+
+    results = {}
+    for name in args.sims:
+        results[name] = run(name, args.seconds, args.seed, args.timeout)
+    print_table(results)
+
+    if args.output:
+        report = {
+            "seconds": args.seconds,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=1)
+        print("Results written to {}".format(args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Benchmark the streaming trajectory reader against pandas.read_csv.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmarks/trajectory_reader.py --episodes 2000 --steps 500 --files 4
+
+Writes a synthetic sample-style log, then measures wall time and peak RSS of
+  - pandas: pd.read_csv of the whole file, then a groupby over episodes
+  - stream: iter_episodes over the same file
+  - parallel: read_episodes over the log split into --files files
+Each measurement runs in a fresh process and reports the peak RSS of that
+process and its children together, sampled every few milliseconds, as growth
+over the baseline (with numpy and pandas imported). For the parallel case this
+includes the reader's worker processes, whose pages shared with the parent
+after fork are counted once per process. Where /proc is not available, only
+the measuring process's own peak is reported.
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from microsoft_bonsai_api.simulator.trajectory import read_episodes
+
+
+def write_log(path, episodes, steps, columns, first_episode=1):
+    header = ["state_{}".format(i) for i in range(columns)]
+    header += ["action_command", "config_pole_length", "episode", "iteration"]
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header)
+        for episode in range(first_episode, first_episode + episodes):
+            for iteration in range(1, steps + 1):
+                row = [random.random() for _ in range(columns)]
+                writer.writerow(row + [random.choice([-1, 1]), 0.4, episode, iteration])
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # not available on Windows
+        return float("nan")
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def _children(pid):
+    try:
+        with open("/proc/{0}/task/{0}/children".format(pid)) as fh:
+            return [int(child) for child in fh.read().split()]
+    except OSError:
+        return []
+
+
+def tree_rss_mb(pid):
+    """RSS of `pid` and all its descendants, in megabytes."""
+    pages = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open("/proc/{}/statm".format(current)) as fh:
+                pages += int(fh.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        pending.extend(_children(current))
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class TreeRssSampler:
+    """Tracks the peak RSS of this process and its children on a thread."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        pid = os.getpid()
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss_mb(pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_pandas(paths, columns):
+    import pandas as pd
+
+    rows = 0
+    for path in paths:
+        df = pd.read_csv(path, usecols=columns)
+        for _, episode in df.groupby("episode", sort=False):
+            rows += len(episode.to_numpy())
+    return rows
+
+
+def run_stream(paths, columns, processes=1):
+    rows = 0
+    for block in read_episodes(paths, processes=processes, columns=columns):
+        rows += block.data.shape[0]
+    return rows
+
+
+def measure(name, func, args, results):
+    import numpy
+    import pandas
+
+    if not os.path.exists("/proc/self/statm"):
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        rows = func(*args)
+        seconds = time.perf_counter() - start
+        results.put((name, rows, seconds, peak_rss_mb() - baseline))
+        return
+
+    baseline = tree_rss_mb(os.getpid())
+    with TreeRssSampler() as sampler:
+        start = time.perf_counter()
+        rows = func(*args)
+        seconds = time.perf_counter() - start
+    results.put((name, rows, seconds, sampler.peak - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--files", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        per_file = args.episodes // args.files
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, "log_{}.csv".format(i))
+            write_log(path, per_file, args.steps, args.columns, i * per_file + 1)
+            paths.append(path)
+        big = os.path.join(tmp, "log_all.csv")
+        with open(big, "w") as out:
+            for i, path in enumerate(paths):
+                with open(path) as fh:
+                    if i:
+                        next(fh)
+                    out.writelines(fh)
+
+        size_mb = os.path.getsize(big) / 2 ** 20
+        print(
+            "synthetic log: {} episodes x {} steps, {:.0f} MB".format(
+                per_file * args.files, args.steps, size_mb
+            )
+        )
+
+        columns = ["state_0", "state_1", "action_command", "episode"]
+        cases = [
+            ("pandas.read_csv", run_pandas, ([big], None)),
+            ("pandas.read_csv (usecols)", run_pandas, ([big], columns)),
+            ("iter_episodes", run_stream, ([big], None)),
+            ("iter_episodes (columns)", run_stream, ([big], columns)),
+            ("read_episodes x{} files".format(args.files), run_stream, (paths, columns, None)),
+        ]
+        results = multiprocessing.Queue()
+        print("{:<32} {:>10} {:>10} {:>16}".format("case", "rows", "seconds", "RSS growth (MB)"))
+        for name, func, func_args in cases:
+            proc = multiprocessing.Process(
+                target=measure, args=(name, func, func_args, results)
+            )
+            proc.start()
+            name, rows, seconds, rss = results.get()
+            proc.join()
+            print("{:<32} {:>10} {:>10.2f} {:>16.0f}".format(name, rows, seconds, rss))
+
+
+if __name__ == "__main__":
+    main()
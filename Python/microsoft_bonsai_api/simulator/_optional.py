@@ -0,0 +1,23 @@
+"""
+Optional dependencies of the simulator tools
+Copyright 2021 Microsoft
+
+numpy is not a requirement of the client itself. The simulator tools that
+need it import it through `import_numpy`, which names the extra to install
+when it is missing.
+"""
+
+from typing import Any
+
+SIM_TOOLS = "pip install microsoft-bonsai-api[sim-tools]"
+
+
+def import_numpy() -> Any:
+    """The numpy module, or an ImportError that says how to install it."""
+    try:
+        import numpy
+    except ImportError as error:
+        raise ImportError(
+            "This simulator tool requires numpy; install it with '{}'.".format(SIM_TOOLS)
+        ) from error
+    return numpy
@@ -0,0 +1,483 @@
+"""
+Parallel local assessment of a policy over episode configurations
+Copyright 2021 Microsoft
+
+Runs the `episodeConfigurations` of an assessment file (as used by the
+samples' `test_policy`) across a pool of worker processes. Every worker builds
+its own simulator once, with `make_sim()`, and runs the episodes it is given.
+
+Each episode seeds `random` and `numpy.random` from the assessment seed and
+its position in the list before `episode_start`, so for a policy without
+memory results do not depend on the number of workers or on which worker ran
+the episode. A policy that keeps state between calls, such as an exported
+brain with memory, sees the episodes of a worker interleaved; run it with one
+worker and reset it between episodes, as the samples' `test_policy` does.
+
+Simulators are driven through the interface of the samples'
+TemplateSimulatorSession: `episode_start(config)`, `get_state()`,
+`episode_step(action)`, and optionally a `terminal` attribute and a
+`halted()` method that end the episode.
+
+`run_batch_assessment` instead runs episodes in batches of a batch
+simulator and a batch policy (see `batch`), with one array operation per
+step for a whole batch. `run_assessment` uses it when given a batch
+simulator and a batch policy. Both produce the same columns, but a batch is
+seeded once, from its first episode, so batch results also depend on the
+batch size.
+
+`add_arguments` adds the `--workers` and `--assess-output` options to a
+sample's command line and `main` runs an assessment file with them, so a
+sample only supplies its simulator factory and policy.
+
+Requires numpy, installed with the `sim-tools` extra.
+"""
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import random
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from ._optional import import_numpy
+from .batch import VectorizedPolicy, is_batch_policy
+
+
+def load_episode_configs(scenario_file: str) -> List[Dict[str, Any]]:
+    """The `episodeConfigurations` of an assessment file."""
+    with open(scenario_file) as fh:
+        return json.load(fh)["episodeConfigurations"]
+
+
+def episode_seed(seed: int, episode: int) -> int:
+    """Seed for the episode at 1-based position `episode`."""
+    np = import_numpy()
+
+    return int(np.random.SeedSequence([seed, episode]).generate_state(1)[0])
+
+
+def _flatten(value: Any, name: str, row: Dict[str, Any]) -> None:
+    # lists are split into one column per element, as description layouts are
+    if isinstance(value, Mapping):
+        for key, item in value.items():
+            _flatten(item, "{}_{}".format(name, key), row)
+    elif isinstance(value, (list, tuple)) or getattr(value, "ndim", 0) > 0:
+        for index, item in enumerate(value):
+            _flatten(item, "{}_{}".format(name, index), row)
+    else:
+        row[name] = value
+
+
+def _record(
+    rows: List[Dict[str, Any]], episode: int, iteration: int, state: Any, action: Any
+) -> None:
+    row = {"episode": episode, "iteration": iteration}  # type: Dict[str, Any]
+    _flatten(state, "state", row)
+    if action is not None:
+        _flatten(action, "action", row)
+    rows.append(row)
+
+
+def run_episode(
+    sim: Any,
+    policy: Callable[[Any], Any],
+    config: Mapping[str, Any],
+    episode: int,
+    num_iterations: int,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Run one episode and return its rows, the initial state first.
+
+    The episode ends after `num_iterations` steps, once `sim.terminal` is
+    true or once `sim.halted()` returns true.
+    """
+    np = import_numpy()
+
+    episode_rng_seed = episode_seed(seed, episode)
+    random.seed(episode_rng_seed)
+    np.random.seed(episode_rng_seed)
+
+    halted = getattr(sim, "halted", lambda: False)
+    rows = []  # type: List[Dict[str, Any]]
+    sim.episode_start(config)
+    state = sim.get_state()
+    _record(rows, episode, 0, state, None)
+    for iteration in range(1, num_iterations + 1):
+        action = policy(state)
+        sim.episode_step(action)
+        state = sim.get_state()
+        _record(rows, episode, iteration, state, action)
+        if getattr(sim, "terminal", False) or halted():
+            break
+    return rows
+
+
+# set in every worker by _init_worker
+_worker = {}  # type: Dict[str, Any]
+
+
+def _init_worker(
+    make_sim: Callable[[], Any], policy: Callable[[Any], Any], num_iterations: int, seed: int
+) -> None:
+    _worker.update(
+        sim=make_sim(), policy=policy, num_iterations=num_iterations, seed=seed
+    )
+
+
+def _run_task(task: Any) -> List[Dict[str, Any]]:
+    episode, config = task
+    return run_episode(
+        _worker["sim"],
+        _worker["policy"],
+        config,
+        episode,
+        _worker["num_iterations"],
+        _worker["seed"],
+    )
+
+
+def run_batch(
+    sim: Any,
+    policy: Any,
+    configs: Sequence[Mapping[str, Any]],
+    first_episode: int,
+    num_iterations: int,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Run `configs` as one batch, numbered from `first_episode`, and return
+    the columns of its rows, ordered by episode then iteration.
+
+    `random` and `numpy.random` are seeded from the first episode of the
+    batch. Each episode ends after `num_iterations` steps or once its entry in
+    `sim.terminal` is true; the batch is stepped until all have ended.
+    """
+    np = import_numpy()
+
+    batch_rng_seed = episode_seed(seed, first_episode)
+    random.seed(batch_rng_seed)
+    np.random.seed(batch_rng_seed)
+
+    n = len(configs)
+    width = len(policy.action_fields)
+    sim.episode_start(configs)
+    states = np.asarray(sim.get_states(), dtype=float)
+    history = np.empty((num_iterations + 1,) + states.shape)
+    actions = np.full((num_iterations + 1, n, width), math.nan)
+    # whether an episode was still running at each iteration
+    running = np.ones((num_iterations + 1, n), dtype=bool)
+    history[0] = states
+    ended = np.zeros(n, dtype=bool)
+
+    steps = num_iterations
+    for iteration in range(1, num_iterations + 1):
+        action = np.asarray(policy.act(states), dtype=float).reshape(n, width)
+        sim.episode_step(action)
+        states = np.asarray(sim.get_states(), dtype=float)
+        history[iteration] = states
+        actions[iteration] = action
+        running[iteration] = ~ended
+        terminal = getattr(sim, "terminal", None)
+        if terminal is not None:
+            ended |= np.asarray(terminal, dtype=bool)
+            if ended.all():
+                steps = iteration
+                break
+
+    # (episode, iteration) order, keeping only the rows of running episodes
+    keep = running[: steps + 1].T
+    history = history[: steps + 1].transpose(1, 0, 2)[keep]
+    actions = actions[: steps + 1].transpose(1, 0, 2)[keep]
+    episodes = np.arange(first_episode, first_episode + n)
+    columns = {
+        "episode": np.repeat(episodes, keep.sum(axis=1)).astype(float),
+        "iteration": np.nonzero(keep)[1].astype(float),
+    }
+    for i, name in enumerate(sim.state_fields):
+        columns["state_" + name] = history[:, i]
+    for i, name in enumerate(policy.action_fields):
+        columns["action_" + name] = actions[:, i]
+    return columns
+
+
+def _init_batch_worker(
+    make_batch_sim: Callable[[int], Any],
+    batch_size: int,
+    policy: Any,
+    num_iterations: int,
+    seed: int,
+) -> None:
+    _worker.update(
+        sim=make_batch_sim(batch_size),
+        policy=policy,
+        num_iterations=num_iterations,
+        seed=seed,
+    )
+
+
+def _run_batch_task(task: Any) -> Dict[str, Any]:
+    first_episode, configs = task
+    return run_batch(
+        _worker["sim"],
+        _worker["policy"],
+        configs,
+        first_episode,
+        _worker["num_iterations"],
+        _worker["seed"],
+    )
+
+
+def to_columns(rows: Iterable[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Merge rows into one array per column.
+
+    Columns appear in order of first use. Cells missing from a row are NaN for
+    numeric columns and None otherwise; bools become 0.0/1.0.
+    """
+    np = import_numpy()
+
+    rows = list(rows)
+    names = {}  # type: Dict[str, None]
+    for row in rows:
+        for name in row:
+            names.setdefault(name, None)
+
+    columns = {}  # type: Dict[str, Any]
+    for name in names:
+        values = [row.get(name) for row in rows]
+        try:
+            columns[name] = np.array(
+                [math.nan if value is None else float(value) for value in values]
+            )
+        except (TypeError, ValueError):
+            columns[name] = np.array(values, dtype=object)
+    return columns
+
+
+def write_columns(columns: Mapping[str, Any], path: str) -> None:
+    """Write assessment columns to `.npz` (one array per column) or `.csv`."""
+    np = import_numpy()
+
+    if path.endswith(".npz"):
+        np.savez(path, **columns)
+    elif path.endswith(".csv"):
+        names = list(columns)
+        with open(path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(names)
+            writer.writerows(zip(*(columns[name] for name in names)))
+    else:
+        raise ValueError("Unsupported output '{}', use .npz or .csv.".format(path))
+
+
+def _workers(workers: Optional[int], tasks: int) -> int:
+    workers = workers or multiprocessing.cpu_count()
+    return min(workers, max(tasks, 1))
+
+
+def run_batch_assessment(
+    make_batch_sim: Callable[[int], Any],
+    policy: Any,
+    episode_configs: Sequence[Mapping[str, Any]],
+    num_iterations: int,
+    batch_size: int = 1024,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    output: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Assess a batch policy with a batch simulator.
+
+    Episodes are split into batches of `batch_size` consecutive configs,
+    which are run by the worker processes. Results depend on `batch_size`
+    (each batch is seeded once) but not on the number of workers.
+
+    Parameters
+    ----------
+    make_batch_sim : Callable[[int], Any]
+        Builds a batch simulator for up to `batch_size` episodes; called once
+        per worker. Must be picklable.
+    policy : Any
+        Batch policy, see `batch.is_batch_policy`. Must be picklable.
+    batch_size : int, optional
+        Episodes per batch, by default 1024.
+
+    The other parameters and the result are as for `run_assessment`.
+    """
+    np = import_numpy()
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    if not is_batch_policy(policy):
+        raise ValueError("policy must be a batch policy, see batch.DictPolicyAdapter.")
+
+    tasks = [
+        (start + 1, list(episode_configs[start : start + batch_size]))
+        for start in range(0, len(episode_configs), batch_size)
+    ]
+    workers = _workers(workers, len(tasks))
+    init_args = (make_batch_sim, batch_size, policy, num_iterations, seed)
+
+    if workers == 1:
+        _init_batch_worker(*init_args)
+        try:
+            batches = [_run_batch_task(task) for task in tasks]
+        finally:
+            _worker.clear()
+    else:
+        with multiprocessing.Pool(workers, _init_batch_worker, init_args) as pool:
+            batches = pool.map(_run_batch_task, tasks)
+
+    if batches:
+        columns = {
+            name: np.concatenate([batch[name] for batch in batches])
+            for name in batches[0]
+        }
+    else:
+        columns = {}
+    if output is not None:
+        write_columns(columns, output)
+    return columns
+
+
+def run_assessment(
+    make_sim: Callable[[], Any],
+    policy: Callable[[Any], Any],
+    episode_configs: Sequence[Mapping[str, Any]],
+    num_iterations: int,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    output: Optional[str] = None,
+    make_batch_sim: Optional[Callable[[int], Any]] = None,
+    batch_size: int = 1024,
+) -> Dict[str, Any]:
+    """Assess `policy` on every episode configuration.
+
+    Parameters
+    ----------
+    make_sim : Callable[[], Any]
+        Builds a simulator; called once per worker. Must be picklable, e.g.
+        a class or a functools.partial of one.
+    policy : Callable[[Any], Any]
+        Maps a state to an action. Must be picklable and keep no state
+        between calls unless `workers` is 1.
+    episode_configs : Sequence[Mapping[str, Any]]
+        One config per episode; episodes are numbered from 1 in this order.
+    num_iterations : int
+        Maximum number of steps per episode.
+    workers : int, optional
+        Worker processes, None for one per core. With 1 the episodes run in
+        this process.
+    seed : int, optional
+        Assessment seed, by default 0.
+    output : str, optional
+        Also write the result to this `.npz` or `.csv` file.
+    make_batch_sim : Callable[[int], Any], optional
+        Builds a batch simulator. If given and `policy` is a batch policy,
+        the episodes run through `run_batch_assessment` with `batch_size`.
+    batch_size : int, optional
+        Episodes per batch for batch simulators, by default 1024.
+
+    Returns
+    -------
+    Dict[str, numpy.ndarray]
+        One array per column (episode, iteration, state_*, action_*), rows
+        ordered by episode then iteration.
+    """
+    if make_batch_sim is not None and is_batch_policy(policy):
+        return run_batch_assessment(
+            make_batch_sim,
+            policy,
+            episode_configs,
+            num_iterations,
+            batch_size=batch_size,
+            workers=workers,
+            seed=seed,
+            output=output,
+        )
+
+    tasks = list(enumerate(episode_configs, start=1))
+    workers = _workers(workers, len(tasks))
+
+    if workers == 1:
+        _init_worker(make_sim, policy, num_iterations, seed)
+        try:
+            episodes = [_run_task(task) for task in tasks]
+        finally:
+            _worker.clear()
+    else:
+        # small chunks keep long and short episodes balanced across workers
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with multiprocessing.Pool(
+            workers, _init_worker, (make_sim, policy, num_iterations, seed)
+        ) as pool:
+            episodes = pool.map(_run_task, tasks, chunksize)
+
+    columns = to_columns(row for rows in episodes for row in rows)
+    if output is not None:
+        write_columns(columns, output)
+    return columns
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the `--workers` and `--assess-output` options used by `main`."""
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Run the assessment episodes in parallel in this many processes",
+    )
+    parser.add_argument(
+        "--assess-output",
+        type=str,
+        default=None,
+        help="With --workers, write the results to this .npz or .csv file",
+    )
+
+
+def main(
+    make_sim: Callable[[], Any],
+    policy: Callable[[Any], Any],
+    scenario_file: str,
+    num_iterations: int,
+    workers: Optional[int] = None,
+    output: Optional[str] = None,
+    make_batch_sim: Optional[Any] = None,
+    batch_policies: Optional[Mapping[Any, Callable[[Any], Any]]] = None,
+    batch_size: int = 1024,
+) -> Dict[str, Any]:
+    """Assess `policy` on the episodes of `scenario_file` and print a summary.
+
+    Every episode is seeded from its position in `scenario_file`, so for a
+    policy without memory results are the same for any number of workers.
+    Batch results also depend on `batch_size`, see `run_batch_assessment`.
+
+    Parameters
+    ----------
+    make_batch_sim : Any, optional
+        Batch simulator class, with `state_fields` and `action_fields`
+    batch_policies : Mapping[Any, Callable[[Any], Any]], optional
+        Vectorized versions of per-state policies, functions of the (N, d)
+        state array. A policy found here runs on `make_batch_sim` as a
+        VectorizedPolicy, `batch_size` episodes per array operation.
+
+    The other parameters and the result are as for `run_assessment`.
+    """
+    if make_batch_sim is not None and batch_policies and policy in batch_policies:
+        policy = VectorizedPolicy(
+            batch_policies[policy],
+            make_batch_sim.state_fields,
+            make_batch_sim.action_fields,
+        )
+    columns = run_assessment(
+        make_sim,
+        policy,
+        load_episode_configs(scenario_file),
+        num_iterations,
+        workers=workers,
+        output=output,
+        make_batch_sim=make_batch_sim,
+        batch_size=batch_size,
+    )
+    print("Assessed {} episodes".format(len(set(columns.get("episode", [])))))
+    if output:
+        print("Results written to {}".format(output))
+    return columns
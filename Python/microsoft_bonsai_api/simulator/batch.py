@@ -0,0 +1,108 @@
+"""
+Batch policies for in-process evaluation of many episodes at once
+Copyright 2021 Microsoft
+
+A batch policy maps the states of N episodes, a float array of shape
+(N, len(state_fields)), to their actions, shape (N, len(action_fields)),
+with `act(states)`. Column order follows `state_fields` and `action_fields`.
+Any object with these three attributes is accepted; the classes below only
+make it convenient to write one or to lift an existing policy that maps one
+state dict to one action dict.
+
+A batch simulator runs N episodes in lockstep. It provides
+`state_fields`, `action_fields`, `episode_start(configs)` (one config per
+episode), `get_states()` returning an (N, len(state_fields)) array,
+`episode_step(actions)` and, optionally, a `terminal` boolean array of shape
+(N,). See `assessment.run_batch_assessment`.
+
+Requires numpy, installed with the `sim-tools` extra.
+"""
+
+from typing import Any, Callable, Dict, Mapping, Sequence
+
+from ._optional import import_numpy
+
+
+def is_batch_policy(policy: Any) -> bool:
+    return all(
+        hasattr(policy, name) for name in ("act", "state_fields", "action_fields")
+    )
+
+
+class BatchPolicy:
+    """Base class for batch policies; subclasses implement `act`.
+
+    Calling a batch policy with a single state dict returns an action dict,
+    so it can also drive simulators that run one episode at a time.
+    """
+
+    def __init__(self, state_fields: Sequence[str], action_fields: Sequence[str]):
+        self.state_fields = tuple(state_fields)
+        self.action_fields = tuple(action_fields)
+
+    def act(self, states: Any) -> Any:
+        raise NotImplementedError
+
+    def __call__(self, state: Mapping[str, Any]) -> Dict[str, float]:
+        np = import_numpy()
+
+        states = np.array([[state[name] for name in self.state_fields]], dtype=float)
+        actions = np.asarray(self.act(states), dtype=float).reshape(1, -1)
+        return dict(zip(self.action_fields, actions[0].tolist()))
+
+
+class VectorizedPolicy(BatchPolicy):
+    """A batch policy from a function of the (N, d) state array."""
+
+    def __init__(
+        self,
+        function: Callable[[Any], Any],
+        state_fields: Sequence[str],
+        action_fields: Sequence[str],
+    ):
+        super().__init__(state_fields, action_fields)
+        self.function = function
+
+    def act(self, states: Any) -> Any:
+        np = import_numpy()
+
+        actions = np.asarray(self.function(states), dtype=float)
+        return actions.reshape(len(states), len(self.action_fields))
+
+
+class DictPolicyAdapter(BatchPolicy):
+    """Lifts a policy that maps one state dict to one action dict.
+
+    The policy is still called once per episode, so this only lets such
+    policies drive batch simulators; it does not vectorize them.
+    """
+
+    def __init__(
+        self,
+        policy: Callable[[Mapping[str, Any]], Mapping[str, Any]],
+        state_fields: Sequence[str],
+        action_fields: Sequence[str],
+    ):
+        super().__init__(state_fields, action_fields)
+        self.policy = policy
+
+    def act(self, states: Any) -> Any:
+        np = import_numpy()
+
+        actions = np.empty((len(states), len(self.action_fields)))
+        for i, row in enumerate(states.tolist()):
+            action = self.policy(dict(zip(self.state_fields, row)))
+            actions[i] = [action[name] for name in self.action_fields]
+        return actions
+
+    def __call__(self, state: Mapping[str, Any]) -> Any:
+        return self.policy(state)
+
+
+def as_batch_policy(
+    policy: Any, state_fields: Sequence[str], action_fields: Sequence[str]
+) -> Any:
+    """`policy` itself if it is a batch policy, otherwise a DictPolicyAdapter."""
+    if is_batch_policy(policy):
+        return policy
+    return DictPolicyAdapter(policy, state_fields, action_fields)
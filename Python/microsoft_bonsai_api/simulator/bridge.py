@@ -0,0 +1,389 @@
+"""
+Shared-memory bridge to a simulator running in another process
+Copyright 2021 Microsoft
+
+SharedMemoryBridge lives in the process that talks to the platform and
+creates a block of shared memory; the simulator process attaches to it by
+name and answers requests with `serve`. States, actions and configs are
+exchanged as float64 values at fixed offsets, so nothing is serialized
+between the two processes and the bridge reads states without a copy.
+
+The layout comes from the simulator's interface description (see
+`description.numeric_paths`): the numeric leaves of the config, action and
+state types, in declaration order. Both processes build the same
+BridgeLayout from the same description. String fields are not transferred.
+
+The block is a header of HEADER_SLOTS int64 values followed by the config,
+action and state values, in that order:
+
+    REQUEST       incremented by the bridge once a command is written
+    RESPONSE      set by the simulator to the REQUEST it handled, once done
+    COMMAND       START, STEP, FINISH or CLOSE
+    STATUS        0, or 1 if the simulator raised handling the command; the
+                  bridge raises RuntimeError and the simulator keeps serving
+    HALTED        1 if the simulator is halted after the command
+    READY         1 once the simulator has published its initial state
+    CONFIG_SIZE, ACTION_SIZE, STATE_SIZE
+                  value counts, checked by the simulator when it attaches
+
+The simulator handles the latest REQUEST, so if it falls behind, commands
+in between are skipped. That only happens after the bridge gave up waiting:
+a bridge that timed out refuses further commands, and `close` leaves CLOSE
+for the simulator to pick up once the command it is running returns.
+
+A native simulator can implement the same protocol directly against this
+layout. Config leaves missing from an episode config are NaN in the block
+and left out of the config the simulator receives.
+
+The handshake has no memory barrier: a side writes the values, then bumps
+REQUEST or sets RESPONSE, and relies on the other side seeing those stores in
+that order. x86 and x86-64 (total store order) guarantee this. Weakly ordered
+CPUs such as ARM do not, so the bridge logs a warning there and is not
+supported on them.
+
+Requires numpy, installed with the `sim-tools` extra, and Python 3.8.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ._optional import import_numpy
+from .description import numeric_paths
+
+Path = Tuple[Union[str, int], ...]
+
+HEADER_SLOTS = 9
+(
+    REQUEST,
+    RESPONSE,
+    COMMAND,
+    STATUS,
+    HALTED,
+    READY,
+    CONFIG_SIZE,
+    ACTION_SIZE,
+    STATE_SIZE,
+) = range(HEADER_SLOTS)
+START, STEP, FINISH, CLOSE = range(1, 5)
+
+# how long a side only yields the CPU while waiting, before it sleeps
+SPIN_SECONDS = 0.002
+
+log = logging.getLogger(__name__)
+
+_yield = getattr(os, "sched_yield", lambda: time.sleep(0))
+
+# CPUs whose store order the handshake relies on, see the module docstring
+TSO_MACHINES = ("x86_64", "amd64", "i386", "i686", "x86")
+
+
+def _check_store_order() -> None:
+    if platform.machine().lower() not in TSO_MACHINES:
+        log.warning(
+            "The shared-memory bridge needs x86 store ordering; on %s the "
+            "other process can read values before they are written.",
+            platform.machine(),
+        )
+
+
+def _get(value: Any, path: Path) -> Any:
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _pack(paths: Sequence[Path], value: Mapping[str, Any], out: Any) -> None:
+    for i, path in enumerate(paths):
+        try:
+            out[i] = _get(value, path)
+        except (KeyError, IndexError, TypeError):
+            out[i] = math.nan
+
+
+def _listify(node: Any) -> Any:
+    if not isinstance(node, dict):
+        return node
+    if node and all(isinstance(key, int) for key in node):
+        return [_listify(node[i]) for i in sorted(node)]
+    return {key: _listify(item) for key, item in node.items()}
+
+
+def _unpack(paths: Sequence[Path], values: Sequence[float], skip_nan: bool = False) -> Any:
+    root = {}  # type: Dict[Any, Any]
+    for path, value in zip(paths, values):
+        if skip_nan and value != value:
+            continue
+        node = root
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return _listify(root)
+
+
+def _wait(header: Any, index: int, value: int, timeout: Optional[float]) -> None:
+    # wait for header[index] to reach at least `value`; yield while the other
+    # side is likely to answer soon, then sleep with back-off so an idle side
+    # costs little CPU
+    start = time.perf_counter()
+    pause = 0.0
+    while header[index] < value:
+        if pause:
+            if timeout is not None and time.perf_counter() - start > timeout:
+                raise TimeoutError("No answer over the shared-memory bridge.")
+            pause = min(pause * 2, 1e-3)
+        elif time.perf_counter() - start > SPIN_SECONDS:
+            pause = 1e-5
+        else:
+            # time.sleep(0) is a timed sleep of ~50 us on Linux
+            _yield()
+            continue
+        time.sleep(pause)
+
+
+class BridgeLayout:
+    """Order of the config, action and state values in the shared block.
+
+    Parameters
+    ----------
+    state_paths, action_paths, config_paths : Sequence[Path]
+        Leaves of each type, as from `description.numeric_paths`
+    """
+
+    def __init__(
+        self,
+        state_paths: Sequence[Path],
+        action_paths: Sequence[Path],
+        config_paths: Sequence[Path] = (),
+    ):
+        self.state_paths = [tuple(p) for p in state_paths]
+        self.action_paths = [tuple(p) for p in action_paths]
+        self.config_paths = [tuple(p) for p in config_paths]
+
+    @classmethod
+    def from_description(cls, description: Mapping[str, Any]) -> "BridgeLayout":
+        """Layout of a simulator description, see `description.load_description`."""
+        return cls(
+            numeric_paths(description.get("state", {})),
+            numeric_paths(description.get("action", {})),
+            numeric_paths(description.get("config", {})),
+        )
+
+    @property
+    def sizes(self) -> Tuple[int, int, int]:
+        return len(self.config_paths), len(self.action_paths), len(self.state_paths)
+
+    @property
+    def nbytes(self) -> int:
+        return 8 * (HEADER_SLOTS + sum(self.sizes))
+
+    def state_fields(self) -> List[str]:
+        """Flat state names, as `description.numeric_fields` gives them."""
+        return ["_".join(str(key) for key in path) for path in self.state_paths]
+
+    def views(self, buffer: Any) -> Tuple[Any, Any, Any, Any]:
+        """Header, config, action and state arrays over `buffer`, no copies."""
+        np = import_numpy()
+
+        n_config, n_action, n_state = self.sizes
+        header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=buffer)
+        values = np.ndarray(
+            (n_config + n_action + n_state,),
+            dtype=np.float64,
+            buffer=buffer,
+            offset=8 * HEADER_SLOTS,
+        )
+        return (
+            header,
+            values[:n_config],
+            values[n_config : n_config + n_action],
+            values[n_config + n_action :],
+        )
+
+
+def _attach(name: str) -> Any:
+    from multiprocessing import resource_tracker, shared_memory
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore
+    except TypeError:
+        pass
+    # Before Python 3.13, attaching on POSIX registers the block with this
+    # process's resource tracker, which unlinks it when the process exits,
+    # while the bridge still uses it. A process started by multiprocessing
+    # shares the tracker of its parent, assumed to be the bridge's process:
+    # the registration is the bridge's own and must stay. Any other process,
+    # e.g. one started with subprocess, has its own tracker and unregisters it.
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix" and multiprocessing.parent_process() is None:
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore
+    return shm
+
+
+class SharedMemoryBridge:
+    """Bonsai-side end of the bridge, with the interface of a sample session.
+
+    `episode_start`, `episode_step` and `episode_finish` hand the command to
+    the simulator process and wait for it; `get_state` and `halted` read the
+    state it published. The bridge can therefore replace the in-process
+    simulator of a sample's main loop, or be run by `runner.run_simulator`.
+
+    Parameters
+    ----------
+    layout : BridgeLayout
+        Layout shared with the simulator process
+    name : str, optional
+        Name of the shared memory block, by default a random one
+    timeout : float, optional
+        Seconds to wait for the simulator per command, by default 60. After a
+        command times out, the bridge is broken and only `close` can be used.
+    """
+
+    def __init__(
+        self, layout: BridgeLayout, name: Optional[str] = None, timeout: Optional[float] = 60.0
+    ):
+        from multiprocessing import shared_memory
+
+        _check_store_order()
+        self.layout = layout
+        self.timeout = timeout
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=layout.nbytes)
+        self._broken = False
+        self._header, self._config, self._action, self._state = layout.views(self._shm.buf)
+        self._header[:] = 0
+        self._header[[CONFIG_SIZE, ACTION_SIZE, STATE_SIZE]] = layout.sizes
+
+    @property
+    def name(self) -> str:
+        """Name the simulator process attaches to."""
+        return self._shm.name
+
+    @property
+    def states(self) -> Any:
+        """The published state values, a view into shared memory."""
+        return self._state
+
+    def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """Wait until the simulator process has published its initial state."""
+        _wait(self._header, READY, 1, self.timeout if timeout is None else timeout)
+
+    def _post(self, command: int) -> None:
+        header = self._header
+        header[COMMAND] = command
+        header[REQUEST] += 1
+
+    def _call(self, command: int) -> None:
+        if self._broken:
+            raise RuntimeError("The simulator process timed out on an earlier command.")
+        self.wait_ready()
+        self._post(command)
+        try:
+            _wait(self._header, RESPONSE, self._header[REQUEST], self.timeout)
+        except TimeoutError:
+            # the simulator may still be running the command; a later one
+            # would be answered by its response, or skipped
+            self._broken = True
+            raise
+        if self._header[STATUS]:
+            raise RuntimeError("The simulator process failed handling the command.")
+
+    def episode_start(self, config: Optional[Mapping[str, Any]] = None) -> None:
+        _pack(self.layout.config_paths, config or {}, self._config)
+        self._call(START)
+
+    def episode_step(self, action: Mapping[str, Any]) -> None:
+        _pack(self.layout.action_paths, action, self._action)
+        self._call(STEP)
+
+    def episode_finish(self) -> None:
+        self._call(FINISH)
+
+    def get_state(self) -> Dict[str, Any]:
+        self.wait_ready()
+        return _unpack(self.layout.state_paths, self._state.tolist())
+
+    def halted(self) -> bool:
+        return bool(self._header[HALTED])
+
+    def close(self) -> None:
+        """Stop the simulator's `serve` loop and free the shared memory."""
+        if self._header[READY] and self._broken:
+            # do not wait on a simulator that is still busy, it finds CLOSE
+            # when the command it is running returns
+            self._post(CLOSE)
+        elif self._header[READY]:
+            try:
+                self._call(CLOSE)
+            except (RuntimeError, TimeoutError):
+                pass
+        del self._header, self._config, self._action, self._state
+        self._shm.close()
+        self._shm.unlink()
+
+
+def serve(sim: Any, layout: BridgeLayout, name: str, poll_timeout: Optional[float] = None) -> None:
+    """Answer the bridge's commands with `sim` until it is closed.
+
+    Parameters
+    ----------
+    sim : Any
+        Simulator with `episode_start(config)`, `episode_step(action)` and
+        `get_state()`, and optionally `episode_finish()` and `halted()`
+    layout : BridgeLayout
+        Layout the bridge was created with
+    name : str
+        Name of the bridge's shared memory block
+    poll_timeout : float, optional
+        Give up after waiting this many seconds for a command, by default never
+    """
+    _check_store_order()
+    shm = _attach(name)
+    try:
+        _serve(sim, layout, shm.buf, poll_timeout)
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # the views are still held by the traceback of the error raised
+            pass
+
+
+def _serve(sim: Any, layout: BridgeLayout, buffer: Any, poll_timeout: Optional[float]) -> None:
+    header, config, action, state = layout.views(buffer)
+    if tuple(header[[CONFIG_SIZE, ACTION_SIZE, STATE_SIZE]]) != layout.sizes:
+        raise ValueError("The bridge was created with a different layout.")
+    halted = getattr(sim, "halted", lambda: False)
+
+    def publish() -> None:
+        _pack(layout.state_paths, sim.get_state(), state)
+        header[HALTED] = bool(halted())
+
+    publish()
+    header[READY] = 1
+    handled = int(header[REQUEST])
+    while True:
+        _wait(header, REQUEST, handled + 1, poll_timeout)
+        # the latest request, skipping any the bridge gave up on
+        handled = int(header[REQUEST])
+        command = header[COMMAND]
+        header[STATUS] = 0
+        try:
+            if command == START:
+                sim.episode_start(_unpack(layout.config_paths, config.tolist(), True))
+            elif command == STEP:
+                sim.episode_step(_unpack(layout.action_paths, action.tolist()))
+            elif command == FINISH and hasattr(sim, "episode_finish"):
+                sim.episode_finish()
+            if command != CLOSE:
+                publish()
+        except Exception:
+            # reported to the bridge, the simulator keeps serving
+            log.exception("Simulator failed handling command %d", command)
+            header[STATUS] = 1
+        header[RESPONSE] = handled
+        if command == CLOSE:
+            return
@@ -0,0 +1,122 @@
+"""
+Helpers for simulator interface descriptions
+Copyright 2021 Microsoft
+
+See Reference/siminterface.schema.json for the description format.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+# sections of a simulator description, in the order used for flat layouts
+DESCRIPTION_SECTIONS = ("state", "action", "config")
+
+
+def numeric_fields(type_description: Mapping[str, Any], prefix: str = "") -> List[str]:
+    """Flatten a description type into the names of its numeric leaves.
+
+    Struct fields are joined with "_", array elements are suffixed with their
+    index. String and special types have no fixed-width numeric form and are
+    skipped.
+
+    Parameters
+    ----------
+    type_description : Mapping[str, Any]
+        A type from a simulator description, e.g. `description["state"]`.
+    prefix : str, optional
+        Name of the enclosing field, by default ""
+
+    Returns
+    -------
+    List[str]
+        Leaf names in declaration order.
+    """
+    category = str(type_description.get("category", "")).lower()
+
+    if category == "number":
+        return [prefix] if prefix else []
+
+    if category == "struct":
+        names = []  # type: List[str]
+        for field in type_description.get("fields", []):
+            name = "{}_{}".format(prefix, field["name"]) if prefix else field["name"]
+            names.extend(numeric_fields(field["type"], name))
+        return names
+
+    if category == "array":
+        length = type_description.get("length")
+        if length is None:
+            raise ValueError(
+                "Array field '{}' has no length and cannot be laid out.".format(prefix)
+            )
+        names = []
+        for i in range(length):
+            names.extend(
+                numeric_fields(type_description["type"], "{}_{}".format(prefix, i))
+            )
+        return names
+
+    return []
+
+
+def numeric_paths(
+    type_description: Mapping[str, Any], prefix: Tuple[Union[str, int], ...] = ()
+) -> List[Tuple[Union[str, int], ...]]:
+    """Like `numeric_fields`, but each leaf is the tuple of struct field names
+    and array indices leading to it, e.g. ("position", 0) for "position_0".
+    """
+    category = str(type_description.get("category", "")).lower()
+
+    if category == "number":
+        return [prefix] if prefix else []
+
+    if category == "struct":
+        paths = []  # type: List[Tuple[Union[str, int], ...]]
+        for field in type_description.get("fields", []):
+            paths.extend(numeric_paths(field["type"], prefix + (field["name"],)))
+        return paths
+
+    if category == "array":
+        length = type_description.get("length")
+        if length is None:
+            raise ValueError(
+                "Array field '{}' has no length and cannot be laid out.".format(
+                    "_".join(str(p) for p in prefix)
+                )
+            )
+        paths = []
+        for i in range(length):
+            paths.extend(numeric_paths(type_description["type"], prefix + (i,)))
+        return paths
+
+    return []
+
+
+def description_columns(
+    description: Mapping[str, Any],
+    sections: Sequence[str] = DESCRIPTION_SECTIONS,
+    prefixed: bool = True,
+) -> List[str]:
+    """Flat numeric column names for the given sections of a description.
+
+    With `prefixed`, names follow the sample loggers' CSV layout, e.g.
+    "state_cart_position", "action_command", "config_pole_length".
+    """
+    columns = []  # type: List[str]
+    for section in sections:
+        if section not in description:
+            continue
+        fields = numeric_fields(description[section])
+        if prefixed:
+            fields = ["{}_{}".format(section, f) for f in fields]
+        columns.extend(fields)
+    return columns
+
+
+def load_description(interface: Mapping[str, Any]) -> Dict[str, Any]:
+    """Return the `description` block of an interface file, or the input itself
+    if it already is one."""
+    description = interface.get("description", interface)  # type: Optional[Any]
+    if not isinstance(description, dict):
+        raise ValueError("Interface does not contain a description.")
+    return description
+
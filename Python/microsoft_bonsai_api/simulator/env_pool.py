@@ -0,0 +1,88 @@
+"""
+Keyed pool of gym environments for simulators that wrap them
+Copyright 2021 Microsoft
+
+Creating an environment through gym.make (registry lookup, wrappers, and
+whatever the constructor builds: a road network, a Box2D world, often a
+first reset) costs at least as much as resetting one. EnvPool constructs each
+environment name once and later episodes reuse the instance, so an episode
+start that switches environments costs a single reset.
+
+A reused environment keeps whatever its previous episode configured; a
+simulator that changes an environment's configuration has to set it again
+at every episode start. gym is only imported by the default factory.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def scenario_env_names(scenario_file: str, default: Optional[str] = None) -> List[str]:
+    """Environment names used by an assessment file, in order of first use.
+
+    Episodes without an `env_name` run on `default`. A missing file gives
+    just `default`.
+    """
+    names = [default] if default else []
+    if not os.path.exists(scenario_file):
+        return names
+    with open(scenario_file) as fh:
+        configs = json.load(fh).get("episodeConfigurations", [])
+    for config in configs:
+        name = config.get("env_name", default)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _gym_make(env_name: str) -> Any:
+    import gym
+
+    return gym.make(env_name)
+
+
+class EnvPool:
+    """One environment instance per name, created on first request.
+
+    Parameters
+    ----------
+    make : Callable[[str], Any], optional
+        Environment factory, by default gym.make
+    reuse : bool, optional
+        If False, every request builds a new environment and closes the one
+        it replaces, as without a pool, by default True
+    """
+
+    def __init__(self, make: Optional[Callable[[str], Any]] = None, reuse: bool = True):
+        self.make = make or _gym_make
+        self.reuse = reuse
+        self.envs = {}  # type: Dict[str, Any]
+
+    def get(self, env_name: str) -> Any:
+        """The environment called `env_name`, constructed if needed."""
+        env = self.envs.get(env_name)
+        if env is not None and self.reuse:
+            return env
+        if env is not None:
+            env.close()
+        env = self.envs[env_name] = self.make(env_name)
+        return env
+
+    def prewarm(self, env_names: Iterable[str]) -> None:
+        """Construct the given environments ahead of the first episode."""
+        for env_name in env_names:
+            if env_name not in self.envs:
+                self.get(env_name)
+
+    def close(self) -> None:
+        """Close every environment in the pool."""
+        for env in self.envs.values():
+            env.close()
+        self.envs.clear()
+
+    def __enter__(self) -> "EnvPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
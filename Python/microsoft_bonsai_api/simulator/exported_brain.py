@@ -0,0 +1,206 @@
+"""
+Clients for a locally running exported brain
+Copyright 2021 Microsoft
+
+An exported brain container serves predictions over HTTP:
+
+    GET    {url}/v1/prediction   state as JSON body, returns the action
+    DELETE {url}/v1              clears the brain's memory between episodes
+
+Both clients keep their connections open, so a prediction costs one
+request/response on an existing connection rather than a new TCP handshake.
+Predictions for several concurrent episodes are in flight at the same time:
+ExportedBrainClient gives every thread its own requests.Session, which is not
+safe to share between threads, and ExportedBrainClientAsync shares a pool of
+connections on one event loop.
+
+`shared_client(url)` returns one ExportedBrainClient per address for the
+whole process, for plain policy functions such as the samples' brain_policy.
+
+Note that the v1 endpoints keep a single memory for the whole brain; brains
+that use memory should only be evaluated one episode at a time.
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+DEFAULT_URL = "http://localhost:5000"
+
+
+class ExportedBrainClient:
+    """Keep-alive client for an exported brain.
+
+    Instances are callable with a state, so a client can be used directly as
+    the `policy` of a sample's `test_policy`.
+
+    Parameters
+    ----------
+    url : str, optional
+        Address of the exported brain, by default "http://localhost:5000"
+    pool_size : int, optional
+        Threads, each with its own connection, that `predict_many` sends
+        predictions from, by default 8
+    timeout : float, optional
+        Seconds to wait for a response, by default 30
+    """
+
+    def __init__(
+        self, url: str = DEFAULT_URL, pool_size: int = 8, timeout: Optional[float] = 30.0
+    ):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1.")
+        self.url = url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sessions = []  # type: List[Any]
+        self._lock = threading.Lock()
+        self._executor = None  # type: Optional[ThreadPoolExecutor]
+
+    @property
+    def session(self) -> Any:
+        """The calling thread's requests.Session, created on first use."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            with self._lock:
+                self._sessions.append(session)
+            self._local.session = session
+        return session
+
+    def predict(self, state: Mapping[str, Any]) -> Dict[str, Any]:
+        """Action chosen by the brain for `state`."""
+        response = self.session.get(
+            self.url + "/v1/prediction", json=state, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    __call__ = predict
+
+    def predict_many(self, states: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        """Actions for the current states of several concurrent episodes.
+
+        Up to `pool_size` requests are sent at once. Actions are returned in
+        the order of `states`.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.pool_size)
+        return list(self._executor.map(self.predict, states))
+
+    def forget_memory(self) -> bool:
+        """Clear the brain's memory before a new episode.
+
+        Returns
+        -------
+        bool
+            Whether the brain acknowledged the reset.
+        """
+        response = self.session.delete(self.url + "/v1", timeout=self.timeout)
+        return response.status_code == 204
+
+    def close(self) -> None:
+        """Stop the `predict_many` threads and close every thread's session."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            self._local = threading.local()
+        for session in sessions:
+            session.close()
+
+    def __enter__(self) -> "ExportedBrainClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+_shared_clients = {}  # type: Dict[str, ExportedBrainClient]
+_shared_lock = threading.Lock()
+
+
+def shared_client(url: str = DEFAULT_URL) -> ExportedBrainClient:
+    """The ExportedBrainClient for `url` shared within this process."""
+    url = url.rstrip("/")
+    with _shared_lock:
+        client = _shared_clients.get(url)
+        if client is None:
+            client = _shared_clients[url] = ExportedBrainClient(url)
+    return client
+
+
+class ExportedBrainClientAsync:
+    """asyncio client for an exported brain, using aiohttp.
+
+    Drives many episodes concurrently from one thread: each episode awaits
+    its own predictions while the others' requests are in flight.
+
+    Parameters
+    ----------
+    url : str, optional
+        Address of the exported brain, by default "http://localhost:5000"
+    pool_size : int, optional
+        Maximum number of open connections, by default 64
+    timeout : float, optional
+        Seconds to wait for a response, by default 30
+    """
+
+    def __init__(
+        self, url: str = DEFAULT_URL, pool_size: int = 64, timeout: Optional[float] = 30.0
+    ):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1.")
+        self.url = url.rstrip("/")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None  # type: Any
+
+    def _get_session(self) -> Any:
+        # created lazily, aiohttp sessions belong to the running event loop
+        if self._session is None:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                json_serialize=json.dumps,
+            )
+        return self._session
+
+    async def predict(self, state: Mapping[str, Any]) -> Dict[str, Any]:
+        """Action chosen by the brain for `state`."""
+        session = self._get_session()
+        async with session.get(self.url + "/v1/prediction", json=state) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def predict_many(
+        self, states: Sequence[Mapping[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Actions for the current states of several concurrent episodes,
+        in the order of `states`."""
+        return list(await asyncio.gather(*(self.predict(state) for state in states)))
+
+    async def forget_memory(self) -> bool:
+        """Clear the brain's memory before a new episode."""
+        session = self._get_session()
+        async with session.delete(self.url + "/v1") as response:
+            return response.status == 204
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "ExportedBrainClientAsync":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
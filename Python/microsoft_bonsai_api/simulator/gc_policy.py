@@ -0,0 +1,188 @@
+"""
+Garbage-collection and memory policy for the simulator loop
+Copyright 2021 Microsoft
+
+Every step allocates container objects (msrest models for the event and the
+state, dicts, logged rows), so CPython's cyclic collector runs every few
+hundred steps. Its older generations are scanned object by object, including
+everything imported or loaded at start-up, and show up as periodic spikes of
+step latency.
+
+GCPolicy moves those collections between episodes:
+
+    after_registration()   collects once and freezes what exists by then
+                           (gc.freeze), so later collections skip it
+    on_event(event_type)   disables automatic collection at EpisodeStart and
+                           collects at EpisodeFinish or Idle, when the
+                           platform is not waiting on the simulator
+    should_recycle()       whether the process RSS is above `rss_limit_mb`;
+                           check it at EpisodeFinish and, if so, unregister
+                           and call `recycle_process`
+
+`record_step` keeps step latencies and `report` summarizes them with the
+collections that ran, so a run with and without the policy can be compared.
+
+Reference cycles created during an episode are only freed at its end; use
+`max_deferred_steps` to collect the youngest generation during long episodes.
+
+Requires numpy, installed with the `sim-tools` extra.
+"""
+
+import gc
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from ._optional import import_numpy
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in megabytes, or its peak where the
+    current size is not available."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def recycle_process() -> None:
+    """Replace this process with a fresh run of the same command line.
+
+    Unregister the simulator session first; the new process registers again.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+class GCPolicy:
+    """Collect garbage between episodes rather than during them.
+
+    Parameters
+    ----------
+    defer : bool, optional
+        Disable automatic collection during episodes, by default True
+    freeze : bool, optional
+        Freeze objects that exist after registration, by default True
+    max_deferred_steps : int, optional
+        Collect the youngest generation after this many steps of an episode,
+        by default never
+    rss_limit_mb : float, optional
+        RSS above which `should_recycle` is true, by default no limit
+    history : int, optional
+        Number of most recent step latencies kept, by default 100000
+    """
+
+    def __init__(
+        self,
+        defer: bool = True,
+        freeze: bool = True,
+        max_deferred_steps: Optional[int] = None,
+        rss_limit_mb: Optional[float] = None,
+        history: int = 100000,
+    ):
+        np = import_numpy()
+
+        if max_deferred_steps is not None and max_deferred_steps < 1:
+            raise ValueError("max_deferred_steps must be at least 1.")
+        if history < 1:
+            raise ValueError("history must be at least 1.")
+        self.defer = defer
+        self.freeze = freeze
+        self.max_deferred_steps = max_deferred_steps
+        self.rss_limit_mb = rss_limit_mb
+        self._steps = np.empty(history)
+        self._step_count = 0
+        self._deferred = 0
+        self._in_episode = False
+        self.collections = [0, 0, 0]
+        self.collection_seconds = 0.0
+        self.max_collection_seconds = 0.0
+        self._collection_start = 0.0
+        gc.callbacks.append(self._on_collection)
+
+    def _on_collection(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == "start":
+            self._collection_start = time.perf_counter()
+            return
+        seconds = time.perf_counter() - self._collection_start
+        self.collections[info["generation"]] += 1
+        self.collection_seconds += seconds
+        self.max_collection_seconds = max(self.max_collection_seconds, seconds)
+
+    def after_registration(self) -> None:
+        """Collect, then freeze the objects that survived, if `freeze`.
+
+        The collection counters start from zero again afterwards.
+        """
+        gc.collect()
+        if self.freeze:
+            gc.freeze()
+        self.collections = [0, 0, 0]
+        self.collection_seconds = 0.0
+        self.max_collection_seconds = 0.0
+
+    def _collect(self) -> None:
+        if self._in_episode or self._deferred:
+            gc.collect()
+        self._in_episode = False
+        self._deferred = 0
+        gc.enable()
+
+    def on_event(self, event_type: str) -> None:
+        """Apply the policy for an event, before the event is handled."""
+        if not self.defer:
+            return
+        if event_type == "EpisodeStart":
+            self._collect()
+            self._in_episode = True
+            gc.disable()
+        elif event_type == "EpisodeStep":
+            self._deferred += 1
+            if self.max_deferred_steps and self._deferred >= self.max_deferred_steps:
+                gc.collect(0)
+                self._deferred = 0
+        elif event_type in ("EpisodeFinish", "Idle", "Unregister"):
+            self._collect()
+
+    def record_step(self, seconds: float) -> None:
+        """Record how long a step took."""
+        self._steps[self._step_count % len(self._steps)] = seconds
+        self._step_count += 1
+
+    def should_recycle(self) -> bool:
+        """Whether the process has grown past `rss_limit_mb`."""
+        return self.rss_limit_mb is not None and rss_mb() > self.rss_limit_mb
+
+    def report(self) -> Dict[str, Any]:
+        """Step latency percentiles in milliseconds over the recorded steps,
+        collections per generation, their total and longest pause, and RSS."""
+        np = import_numpy()
+
+        steps = self._steps[: min(self._step_count, len(self._steps))] * 1e3
+        if not len(steps):
+            steps = np.zeros(1)
+        return {
+            "steps": self._step_count,
+            "p50_ms": float(np.percentile(steps, 50)),
+            "p99_ms": float(np.percentile(steps, 99)),
+            "p999_ms": float(np.percentile(steps, 99.9)),
+            "max_ms": float(steps.max()),
+            "collections": list(self.collections),
+            "collection_ms": self.collection_seconds * 1e3,
+            "max_collection_ms": self.max_collection_seconds * 1e3,
+            "rss_mb": rss_mb(),
+        }
+
+    def close(self) -> None:
+        """Re-enable automatic collection and stop counting collections."""
+        gc.enable()
+        if self._on_collection in gc.callbacks:
+            gc.callbacks.remove(self._on_collection)
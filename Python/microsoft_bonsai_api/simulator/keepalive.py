@@ -0,0 +1,126 @@
+"""
+Session keep-alive for long simulator steps
+Copyright 2021 Microsoft
+
+The platform unregisters a simulator session that does not call advance
+within the `timeout` of its SimulatorInterface, so a step that occasionally
+takes longer than that costs the episode and a re-registration.
+
+KeepAlive runs a step on a worker thread and, while the step is running,
+resends the state that produced the pending event every `interval` seconds.
+Sending the same state again is allowed by the advance operation; the
+platform answers with Idle, or with the pending event once more, and those
+replies are dropped. Any other reply, such as Unregister, stops the
+heartbeats and is returned to the caller once the step is done. A heartbeat
+that fails, with an HTTP error or a connection error, is logged and retried
+at the next interval.
+
+Only one request is made on the client at a time: the calling thread sends
+the heartbeats and the worker thread only runs the step.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Optional, Tuple
+
+from azure.core.exceptions import AzureError
+
+from .generated.models import Event, SimulatorState
+
+log = logging.getLogger(__name__)
+
+
+def heartbeat_interval(timeout: float) -> float:
+    """Heartbeat interval for an interface `timeout`, a third of it, so two
+    heartbeats can be lost before the session times out."""
+    return timeout / 3
+
+
+class KeepAlive:
+    """Runs simulator steps while keeping their session registered.
+
+    Parameters
+    ----------
+    client : BonsaiClient
+        Client whose session operations send the heartbeats
+    workspace_name : str
+        Workspace of the session
+    interval : float, optional
+        Seconds between heartbeats, by default 20, a third of the usual 60 s
+        interface timeout
+    """
+
+    def __init__(self, client: Any, workspace_name: str, interval: float = 20.0):
+        if interval <= 0:
+            raise ValueError("interval must be positive.")
+        self.client = client
+        self.workspace_name = workspace_name
+        self.interval = interval
+        self.heartbeats = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sim-step")
+
+    def _heartbeat(
+        self, session_id: str, last_state: SimulatorState, pending: Event
+    ) -> Optional[Event]:
+        try:
+            reply = self.client.session.advance(
+                workspace_name=self.workspace_name,
+                session_id=session_id,
+                body=last_state,
+            )
+        except AzureError as ex:
+            # heartbeats are best-effort: whether the service or the
+            # connection failed, keep waiting for the step, whose own advance
+            # will retry or re-register
+            log.warning("Heartbeat failed: %s", ex)
+            return None
+        self.heartbeats += 1
+        if reply.type == "Idle" or reply.sequence_id == pending.sequence_id:
+            return None
+        return reply
+
+    def run(
+        self,
+        step: Callable[[], Any],
+        session_id: str,
+        last_state: SimulatorState,
+        pending: Event,
+    ) -> Tuple[Any, Optional[Event]]:
+        """Run `step` on the worker thread, sending heartbeats while it runs.
+
+        Parameters
+        ----------
+        step : Callable[[], Any]
+            Applies the action of `pending` to the simulator
+        session_id : str
+            Session the heartbeats are sent for
+        last_state : SimulatorState
+            State that was sent to receive `pending`, resent as the heartbeat
+        pending : Event
+            Event being handled by `step`
+
+        Returns
+        -------
+        Tuple[Any, Optional[Event]]
+            What `step` returned, and the first reply to a heartbeat that was
+            neither Idle nor `pending`, or None. Exceptions raised by `step`
+            are raised here.
+        """
+        future = self._executor.submit(step)
+        interrupt = None  # type: Optional[Event]
+        while True:
+            try:
+                return future.result(timeout=self.interval), interrupt
+            except TimeoutError:
+                if interrupt is None:
+                    interrupt = self._heartbeat(session_id, last_state, pending)
+
+    def close(self) -> None:
+        """Stop the worker thread, after the step it is running."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "KeepAlive":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,196 @@
+"""
+Latency injection for emulating slow simulators
+Copyright 2021 Microsoft
+
+LatencyInjector sleeps for a random delay before a simulator step, to try a
+brain or a training setup against a simulator slower than the one at hand.
+Delays are drawn `block_size` at a time with one vectorized NumPy call, so
+taking the next delay costs an array index rather than building a
+distribution per step.
+
+Distributions, with `mean` and `spread` in seconds:
+
+    constant      always `mean`
+    uniform       uniform on [mean - spread, mean + spread]
+    truncnorm     normal(mean, spread), truncated to mean +/- 3 spread and 0
+    lognormal     log-normal with the given mean and standard deviation
+    exponential   exponential with the given mean; spread is ignored
+
+Delays are never negative. time.sleep and asyncio.sleep overshoot by up to a
+scheduler tick; with `compensate`, the overshoot of past sleeps is taken off
+the next ones, so the average delay matches the distribution. Applied delays
+are kept in a fixed-size array, see `applied` and `stats`.
+
+Requires numpy, installed with the `sim-tools` extra.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from ._optional import import_numpy
+
+DISTRIBUTIONS = ("constant", "uniform", "truncnorm", "lognormal", "exponential")
+
+
+def sample_delays(
+    rng: Any, distribution: str, mean: float, spread: float, size: int
+) -> Any:
+    """`size` delays in seconds from `distribution`, as a float array."""
+    np = import_numpy()
+
+    if distribution == "constant" or (spread <= 0 and distribution != "exponential"):
+        delays = np.full(size, float(mean))
+    elif distribution == "uniform":
+        delays = rng.uniform(mean - spread, mean + spread, size)
+    elif distribution == "truncnorm":
+        lower, upper = max(mean - 3 * spread, 0.0), mean + 3 * spread
+        delays = rng.normal(mean, spread, size)
+        # redraw the draws outside the bounds, 0.3% when mean >= 3 spread
+        outside = (delays < lower) | (delays > upper)
+        while outside.any():
+            delays[outside] = rng.normal(mean, spread, int(outside.sum()))
+            outside = (delays < lower) | (delays > upper)
+    elif distribution == "lognormal":
+        if mean <= 0:
+            delays = np.zeros(size)
+        else:
+            sigma2 = np.log1p((spread / mean) ** 2)
+            delays = rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size)
+    elif distribution == "exponential":
+        delays = rng.exponential(mean, size) if mean > 0 else np.zeros(size)
+    else:
+        raise ValueError(
+            "distribution must be one of {}, not {!r}.".format(DISTRIBUTIONS, distribution)
+        )
+    return np.maximum(delays, 0.0)
+
+
+class LatencyInjector:
+    """Sleeps for delays drawn from a distribution, see the module docstring.
+
+    Parameters
+    ----------
+    mean : float
+        Mean delay in seconds; 0 disables sleeping
+    spread : float, optional
+        Standard deviation (truncnorm, lognormal) or half-width (uniform) in
+        seconds, by default 0
+    distribution : str, optional
+        One of DISTRIBUTIONS, by default "truncnorm"
+    block_size : int, optional
+        Delays drawn per vectorized call, by default 1024
+    seed : int, optional
+        Seed of the delay generator, by default unseeded
+    history : int, optional
+        Number of most recent applied delays kept, by default 4096
+    compensate : bool, optional
+        Subtract the overshoot of earlier sleeps from later ones, by default True
+    """
+
+    def __init__(
+        self,
+        mean: float,
+        spread: float = 0.0,
+        distribution: str = "truncnorm",
+        block_size: int = 1024,
+        seed: Optional[int] = None,
+        history: int = 4096,
+        compensate: bool = True,
+    ):
+        np = import_numpy()
+
+        if mean < 0 or spread < 0:
+            raise ValueError("mean and spread must not be negative.")
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(
+                "distribution must be one of {}, not {!r}.".format(
+                    DISTRIBUTIONS, distribution
+                )
+            )
+        if block_size < 1 or history < 1:
+            raise ValueError("block_size and history must be at least 1.")
+        self.mean = mean
+        self.spread = spread
+        self.distribution = distribution
+        self.block_size = block_size
+        self.compensate = compensate
+        self._rng = np.random.default_rng(seed)
+        self._block = np.empty(0)
+        self._next = 0
+        self._applied = np.empty(history)
+        self._count = 0
+        self._total = 0.0
+        self._slept = 0.0
+        # overshoot of earlier sleeps not yet taken off later ones
+        self._debt = 0.0
+
+    def next_delay(self) -> float:
+        """The next delay of the schedule, in seconds, without sleeping."""
+        if self._next == len(self._block):
+            self._block = sample_delays(
+                self._rng, self.distribution, self.mean, self.spread, self.block_size
+            )
+            self._next = 0
+        delay = float(self._block[self._next])
+        self._next += 1
+        return delay
+
+    def _record(self, delay: float, slept: float) -> None:
+        self._applied[self._count % len(self._applied)] = delay
+        self._count += 1
+        self._total += delay
+        self._slept += slept
+        if self.compensate:
+            self._debt += slept - delay
+
+    def _duration(self, delay: float) -> float:
+        if not self.compensate:
+            return delay
+        return max(delay - self._debt, 0.0)
+
+    def sleep(self) -> float:
+        """Block for the next delay. Returns the delay drawn, in seconds."""
+        if self.mean <= 0:
+            return 0.0
+        delay = self.next_delay()
+        start = time.perf_counter()
+        duration = self._duration(delay)
+        if duration > 0:
+            time.sleep(duration)
+        self._record(delay, time.perf_counter() - start)
+        return delay
+
+    async def sleep_async(self) -> float:
+        """Wait for the next delay without blocking the event loop. Returns
+        the delay drawn, in seconds."""
+        if self.mean <= 0:
+            return 0.0
+        delay = self.next_delay()
+        start = time.perf_counter()
+        duration = self._duration(delay)
+        if duration > 0:
+            await asyncio.sleep(duration)
+        self._record(delay, time.perf_counter() - start)
+        return delay
+
+    @property
+    def applied(self) -> Any:
+        """The most recent applied delays, oldest first, up to `history`."""
+        np = import_numpy()
+
+        size = len(self._applied)
+        if self._count <= size:
+            return self._applied[: self._count].copy()
+        start = self._count % size
+        return np.concatenate((self._applied[start:], self._applied[:start]))
+
+    def stats(self) -> Dict[str, float]:
+        """Number of delays applied, their total and mean, and the time
+        actually spent sleeping, in seconds."""
+        return {
+            "count": self._count,
+            "total": self._total,
+            "mean": self._total / self._count if self._count else 0.0,
+            "slept": self._slept,
+        }
@@ -0,0 +1,125 @@
+"""
+Rendering simulators in a separate process
+Copyright 2021 Microsoft
+
+The simulation publishes a snapshot of the values to draw into shared memory
+after every step, which costs a copy of a few floats. A renderer process reads
+the latest snapshot at a fixed frame rate and draws it; snapshots published
+between two frames are never drawn. The simulation therefore steps at full
+speed with visualization on, however slow the drawing is.
+
+A renderer is built in the child process by `factory(feedback)` and provides
+
+    draw(snapshot)  called with a copy of the snapshot whenever it changed
+    poll()          called once per frame; returns False once the window closed
+
+`feedback` is a small float array shared in the other direction, e.g. for a
+mouse click that changes a target. Unused entries hold NaN.
+
+Call `close` when the simulator shuts down; the renderer process also stops
+by itself once the process that started it has exited.
+
+Requires numpy, installed with the `sim-tools` extra.
+"""
+
+import ctypes
+import multiprocessing as mp
+import os
+import time
+
+from ._optional import import_numpy
+
+np = import_numpy()
+
+SEQUENCE, CLOSED, STOP = range(3)
+
+
+def _read(header, snapshot):
+    """Sequence number and a consistent copy of the snapshot."""
+    while True:
+        sequence = header[SEQUENCE]
+        if sequence % 2:
+            # a write is in progress
+            time.sleep(0)
+            continue
+        values = snapshot.copy()
+        if header[SEQUENCE] == sequence:
+            return sequence, values
+
+
+def _run(factory, header, snapshot, feedback, fps, parent):
+    header_view = np.frombuffer(header, dtype=np.int64)
+    snapshot_view = np.frombuffer(snapshot, dtype=np.float64)
+    feedback_view = np.frombuffer(feedback, dtype=np.float64)
+    period = 1.0 / fps
+    drawn = 0
+    try:
+        renderer = factory(feedback_view)
+        next_frame = time.perf_counter()
+        while not header_view[STOP] and os.getppid() == parent:
+            if header_view[SEQUENCE] != drawn:
+                drawn, values = _read(header_view, snapshot_view)
+                renderer.draw(values)
+            if not renderer.poll():
+                break
+            next_frame += period
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # drawing is slower than fps, do not try to catch up
+                next_frame = time.perf_counter()
+    finally:
+        header_view[CLOSED] = 1
+
+
+class RenderProcess:
+    def __init__(self, factory, size: int, fps: float = 30.0, feedback: int = 0):
+        """Start a renderer process.
+
+        Parameters
+        ----------
+        factory : Callable
+            builds the renderer in the child process, must be picklable
+        size : int
+            number of floats in a snapshot
+        fps : float, optional
+            frames drawn per second, by default 30
+        feedback : int, optional
+            number of floats the renderer can send back, by default 0
+        """
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        header = mp.RawArray(ctypes.c_int64, 3)
+        snapshot = mp.RawArray(ctypes.c_double, size)
+        feedback_array = mp.RawArray(ctypes.c_double, max(feedback, 1))
+        self._header = np.frombuffer(header, dtype=np.int64)
+        self._snapshot = np.frombuffer(snapshot, dtype=np.float64)
+        self.feedback = np.frombuffer(feedback_array, dtype=np.float64)[:feedback]
+        self.feedback[:] = np.nan
+
+        self._process = mp.Process(
+            target=_run,
+            args=(factory, header, snapshot, feedback_array, fps, os.getpid()),
+            daemon=True,
+        )
+        self._process.start()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the renderer has stopped, e.g. because its window closed."""
+        return bool(self._header[CLOSED])
+
+    def publish(self, values):
+        """Make `values` the snapshot drawn by the next frame."""
+        header = self._header
+        header[SEQUENCE] += 1
+        self._snapshot[: len(values)] = values
+        header[SEQUENCE] += 1
+
+    def close(self, timeout: float = 1.0) -> None:
+        """Stop the renderer process, terminating it after `timeout` seconds."""
+        self._header[STOP] = 1
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
@@ -0,0 +1,214 @@
+"""
+Asyncio session runner for simulators
+Copyright 2021 Microsoft
+
+An async simulator provides coroutines `episode_start(config)` and
+`episode_step(action)`, and `get_state()`, plus optionally `halted()` and
+`episode_finish()`. Each of the last three may be a plain method or a
+coroutine. Simulators that wrap an external solver or co-simulation process
+await it in `episode_step`, so many of them share one event loop and their
+waits overlap instead of each blocking a process.
+
+`run_simulator` registers one session on a BonsaiClientAsync and drives a
+simulator through its events; `run_simulators` runs one session per
+simulator concurrently and, once one of them raises, cancels the others so
+every session is deleted. Simulators with the plain synchronous interface of
+the samples' TemplateSimulatorSession are wrapped in SyncSimulatorAdapter,
+which runs their methods on a thread pool so they do not block the loop.
+"""
+
+import asyncio
+import inspect
+import logging
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional, Sequence
+
+from azure.core.exceptions import HttpResponseError
+
+from .generated.models import SimulatorInterface, SimulatorState
+
+log = logging.getLogger(__name__)
+
+
+def is_async_simulator(sim: Any) -> bool:
+    return asyncio.iscoroutinefunction(getattr(sim, "episode_step", None))
+
+
+class SyncSimulatorAdapter:
+    """Async simulator interface for a synchronous simulator.
+
+    Every call runs on `executor`, the event loop's default thread pool
+    unless given, one call at a time for a given simulator.
+
+    Parameters
+    ----------
+    sim : Any
+        Simulator with episode_start, episode_step and get_state methods
+    executor : Executor, optional
+        Pool the simulator's methods run on
+    """
+
+    def __init__(self, sim: Any, executor: Optional[Executor] = None):
+        self.sim = sim
+        self.executor = executor
+
+    async def _call(self, name: str, *args: Any) -> Any:
+        method = getattr(self.sim, name, None)
+        if method is None:
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, method, *args)
+
+    async def episode_start(self, config: Dict[str, Any]) -> None:
+        await self._call("episode_start", config)
+
+    async def episode_step(self, action: Dict[str, Any]) -> None:
+        await self._call("episode_step", action)
+
+    async def episode_finish(self) -> None:
+        await self._call("episode_finish")
+
+    async def get_state(self) -> Dict[str, Any]:
+        return await self._call("get_state")
+
+    async def halted(self) -> bool:
+        return bool(await self._call("halted"))
+
+
+def as_async_simulator(sim: Any, executor: Optional[Executor] = None) -> Any:
+    """`sim` itself if it is an async simulator, otherwise a SyncSimulatorAdapter."""
+    if is_async_simulator(sim):
+        return sim
+    return SyncSimulatorAdapter(sim, executor)
+
+
+async def _maybe_call(sim: Any, name: str, *args: Any) -> Any:
+    method = getattr(sim, name, None)
+    if method is None:
+        return None
+    result = method(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _delete_session(client: Any, workspace_name: str, session_id: str) -> None:
+    try:
+        await client.session.delete(workspace_name, session_id)
+    except Exception:
+        # logged rather than raised, so it does not replace the exception
+        # that ended the runner
+        log.exception("Could not delete simulator session %s", session_id)
+
+
+async def run_simulator(
+    client: Any,
+    workspace_name: str,
+    interface: SimulatorInterface,
+    sim: Any,
+    max_events: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Dict[str, int]:
+    """Register a session for `sim` and handle its events.
+
+    The session is registered again after an Unregister event or a failed
+    advance, in which case the old session is deleted first, and deleted when
+    the runner returns, raises or is cancelled. An error deleting a session
+    is logged, not raised.
+
+    Parameters
+    ----------
+    client : BonsaiClientAsync
+        Client the session is registered on
+    workspace_name : str
+        Workspace of the session
+    interface : SimulatorInterface
+        Interface the session is registered with
+    sim : Any
+        Async simulator, or a synchronous one run through SyncSimulatorAdapter
+    max_events : int, optional
+        Return after this many events, by default run until cancelled
+    executor : Executor, optional
+        Pool for a synchronous simulator, by default the loop's
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of events handled, by event type
+    """
+    sim = as_async_simulator(sim, executor)
+    counts = {}  # type: Dict[str, int]
+    session = await client.session.create(workspace_name, interface)
+    sequence_id = 1
+    try:
+        while max_events is None or sum(counts.values()) < max_events:
+            state = SimulatorState(
+                sequence_id=sequence_id,
+                state=await _maybe_call(sim, "get_state"),
+                halted=bool(await _maybe_call(sim, "halted")),
+            )
+            try:
+                event = await client.session.advance(
+                    workspace_name, session.session_id, body=state
+                )
+            except HttpResponseError as ex:
+                # the client has already retried; the platform has most
+                # likely dropped the session, so continue in a new one. The
+                # old one is deleted in case it is still registered.
+                log.warning("Advance failed, registering again: %s", ex)
+                await _delete_session(client, workspace_name, session.session_id)
+                session = await client.session.create(workspace_name, interface)
+                sequence_id = 1
+                continue
+            sequence_id = event.sequence_id
+            counts[event.type] = counts.get(event.type, 0) + 1
+
+            if event.type == "Idle":
+                await asyncio.sleep(event.idle.callback_time or 0)
+            elif event.type == "EpisodeStart":
+                await sim.episode_start(event.episode_start.config)
+            elif event.type == "EpisodeStep":
+                await sim.episode_step(event.episode_step.action)
+            elif event.type == "EpisodeFinish":
+                await _maybe_call(sim, "episode_finish")
+            elif event.type == "Unregister":
+                session = await client.session.create(workspace_name, interface)
+                sequence_id = 1
+    finally:
+        await _delete_session(client, workspace_name, session.session_id)
+    return counts
+
+
+async def run_simulators(
+    client: Any,
+    workspace_name: str,
+    interface: SimulatorInterface,
+    sims: Sequence[Any],
+    max_events: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Sequence[Dict[str, int]]:
+    """Run one session per simulator concurrently, see `run_simulator`.
+
+    Returns the event counts of each simulator, in the order of `sims`. If a
+    session raises, the others are cancelled, and so delete their sessions,
+    before its exception is raised.
+    """
+    tasks = [
+        asyncio.ensure_future(
+            run_simulator(client, workspace_name, interface, sim, max_events, executor)
+        )
+        for sim in sims
+    ]
+    if not tasks:
+        return []
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        # also reached when this coroutine is cancelled
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()  # type: ignore
+    return [task.result() for task in tasks]
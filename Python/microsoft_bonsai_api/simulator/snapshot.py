@@ -0,0 +1,98 @@
+"""
+Snapshots of simulator state for fast episode starts
+Copyright 2021 Microsoft
+
+A simulator supports snapshots with two methods:
+
+    snapshot()          returns a copy of everything needed to resume from
+                        the current state
+    restore(snapshot)   makes that the current state; the snapshot is not
+                        modified and can be restored again
+
+SnapshotCache keeps the state reached right after an episode start, keyed by
+the episode config. A later episode with an equal config restores that state
+instead of running the simulator's reset again, which pays off for resets
+that rebuild schedules, rewind datasets or run warm-up steps.
+
+A cached start is the state produced the first time a config was seen. Only
+use the cache where the config determines the start state; for simulators
+that draw a random start state, every hit repeats that first draw.
+"""
+
+import json
+from collections import OrderedDict
+from typing import Any, Mapping, Optional
+
+
+def supports_snapshots(sim: Any) -> bool:
+    return callable(getattr(sim, "snapshot", None)) and callable(
+        getattr(sim, "restore", None)
+    )
+
+
+def config_key(config: Optional[Mapping[str, Any]]) -> str:
+    """Canonical form of an episode config, equal for equal configs."""
+    return json.dumps(config, sort_keys=True, default=repr)
+
+
+class SnapshotCache:
+    """Post-reset snapshots keyed by episode config, least recently used
+    evicted first.
+
+    Usage in a session's episode start::
+
+        if cache is None or not cache.restore(self.simulator, config):
+            self.simulator.reset(config)
+            if cache is not None:
+                cache.save(self.simulator, config)
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Number of snapshots kept, by default 128
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._snapshots = OrderedDict()  # type: OrderedDict[str, Any]
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def __contains__(self, config: Optional[Mapping[str, Any]]) -> bool:
+        return config_key(config) in self._snapshots
+
+    def restore(self, sim: Any, config: Optional[Mapping[str, Any]]) -> bool:
+        """Restore the start state cached for `config` into `sim`.
+
+        Returns
+        -------
+        bool
+            Whether a snapshot was found; if not, `sim` is unchanged.
+        """
+        key = config_key(config)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            self.misses += 1
+            return False
+        self._snapshots.move_to_end(key)
+        sim.restore(snapshot)
+        self.hits += 1
+        return True
+
+    def save(self, sim: Any, config: Optional[Mapping[str, Any]]) -> None:
+        """Cache the current state of `sim` as the start state for `config`."""
+        key = config_key(config)
+        self._snapshots[key] = sim.snapshot()
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.maxsize:
+            self._snapshots.popitem(last=False)
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+        self.hits = 0
+        self.misses = 0
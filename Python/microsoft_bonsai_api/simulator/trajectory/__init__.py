@@ -0,0 +1,16 @@
+from .binary_store import (
+    BinaryTrajectoryReader,
+    BinaryTrajectoryWriter,
+    binary_to_csv,
+    csv_to_binary,
+)
+from .encoding import (
+    DELTA_MARKER,
+    DeltaEncoder,
+    csv_to_delta,
+    delta_to_csv,
+    is_delta_encoded,
+)
+from .reader import EpisodeBlock, iter_episodes, map_episodes, read_episodes
+from .rotation import RotatingTrajectoryLog, segment_paths
+from .sink import AsyncTrajectorySink, OverflowPolicy
@@ -0,0 +1,421 @@
+"""
+Append-only, memory-mapped binary trajectory store.
+Copyright 2021 Microsoft
+
+A store is a directory with three files:
+
+    meta.json     column names and format version
+    data.f64      32 byte header followed by row-major little-endian float64 rows
+    episodes.idx  (episode number, first row) int64 pairs, one per episode
+
+The header holds the number of committed rows, so rows preallocated by the
+writer but not yet flushed are never visible to readers. Opening a store and
+slicing any episode out of it costs O(1) regardless of the store size.
+"""
+
+import csv
+import itertools
+import json
+import math
+import mmap
+import os
+import struct
+from typing import Any, Iterable, List, Mapping, Optional, Sequence
+
+from ..description import description_columns, load_description
+from .encoding import iter_rows
+
+FORMAT_VERSION = 1
+
+META_FILE = "meta.json"
+DATA_FILE = "data.f64"
+INDEX_FILE = "episodes.idx"
+
+_MAGIC = b"BTRJ0001"
+# magic, committed rows, columns, reserved
+_HEADER = struct.Struct("<8sqqq")
+HEADER_SIZE = _HEADER.size
+_INDEX_ENTRY = struct.Struct("<qq")
+
+# columns that identify an iteration in the sample loggers' CSV layout
+LOG_COLUMNS = ("episode", "iteration")
+
+_TRUE_STRINGS = ("true", "yes")
+_FALSE_STRINGS = ("false", "no")
+
+
+def to_float(value: Any) -> float:
+    """Convert a logged value to float, using NaN for anything non-numeric."""
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return math.nan
+        try:
+            return float(text)
+        except ValueError:
+            lowered = text.lower()
+            if lowered in _TRUE_STRINGS:
+                return 1.0
+            if lowered in _FALSE_STRINGS:
+                return 0.0
+            return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def format_float(value: float) -> str:
+    """Inverse of `to_float` for writing CSV: empty for NaN, no ".0" on integers."""
+    if math.isnan(value):
+        return ""
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+class BinaryTrajectoryWriter:
+    """Appends fixed-width float rows to a binary trajectory store.
+
+    Rows are written into a memory-mapped file that grows `chunk_rows` at a
+    time. If the layout has an `episode_column`, a new episode is indexed
+    whenever its value changes; otherwise call `start_episode` explicitly.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Optional[Sequence[str]] = None,
+        chunk_rows: int = 65536,
+        episode_column: Optional[str] = "episode",
+    ):
+        """
+        Parameters
+        ----------
+        path : str
+            Store directory. An existing store is opened for appending.
+        columns : Sequence[str], optional
+            Column layout; required when creating a new store.
+        chunk_rows : int, optional
+            Number of rows the data file grows by when it is full.
+        episode_column : str, optional
+            Column whose changes start a new episode, by default "episode".
+        """
+        if chunk_rows <= 0:
+            raise ValueError("chunk_rows must be positive.")
+
+        self.path = path
+        self.chunk_rows = chunk_rows
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        data_path = os.path.join(path, DATA_FILE)
+        index_path = os.path.join(path, INDEX_FILE)
+
+        if os.path.exists(meta_path):
+            with open(meta_path) as fh:
+                stored_columns = json.load(fh)["columns"]
+            if columns is not None and list(columns) != stored_columns:
+                raise ValueError(
+                    "Columns do not match the existing store at {}.".format(path)
+                )
+            columns = stored_columns
+        else:
+            if not columns:
+                raise ValueError("columns are required to create a new store.")
+            with open(meta_path, "w") as fh:
+                json.dump({"version": FORMAT_VERSION, "columns": list(columns)}, fh)
+
+        self.columns = list(columns)  # type: List[str]
+        self._width = len(self.columns)
+        self._row = struct.Struct("<{}d".format(self._width))
+        self._episode_index = (
+            self.columns.index(episode_column)
+            if episode_column in self.columns
+            else None
+        )
+
+        if not os.path.exists(data_path):
+            with open(data_path, "wb") as fh:
+                fh.write(_HEADER.pack(_MAGIC, 0, self._width, 0))
+        self._data = open(data_path, "r+b")
+        magic, rows, width, _ = _HEADER.unpack(self._data.read(HEADER_SIZE))
+        if magic != _MAGIC or width != self._width:
+            self._data.close()
+            raise ValueError("{} is not a compatible trajectory store.".format(path))
+        self._rows = rows
+
+        self._mm = None  # type: Optional[mmap.mmap]
+        self._capacity = 0
+        self._map(max(self._rows + chunk_rows, self._file_capacity()))
+
+        self._last_episode = None  # type: Optional[int]
+        self.num_episodes = 0
+        if os.path.exists(index_path):
+            with open(index_path, "r+b") as fh:
+                size = os.path.getsize(index_path)
+                entries = list(
+                    _INDEX_ENTRY.iter_unpack(fh.read(size - size % _INDEX_ENTRY.size))
+                )
+                # keep the episodes whose first row was committed, as readers
+                # do; later ones, and a torn trailing entry, are left by a crash
+                kept = 0
+                while kept < len(entries) and entries[kept][1] < self._rows:
+                    kept += 1
+                fh.truncate(kept * _INDEX_ENTRY.size)
+                if kept:
+                    self._last_episode = entries[kept - 1][0]
+            self.num_episodes = kept
+        self._index = open(index_path, "ab")
+
+    @classmethod
+    def from_interface(
+        cls,
+        path: str,
+        interface: Mapping[str, Any],
+        extra_columns: Sequence[str] = LOG_COLUMNS,
+        **kwargs: Any
+    ) -> "BinaryTrajectoryWriter":
+        """Create a writer whose columns are the numeric state, action and config
+        fields of a simulator interface, in the sample loggers' CSV naming."""
+        columns = description_columns(load_description(interface))
+        columns.extend(c for c in extra_columns if c not in columns)
+        return cls(path, columns, **kwargs)
+
+    @property
+    def num_rows(self) -> int:
+        return self._rows
+
+    def _file_capacity(self) -> int:
+        size = os.fstat(self._data.fileno()).st_size
+        return max(0, (size - HEADER_SIZE) // self._row.size)
+
+    def _map(self, capacity: int) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+        self._data.truncate(HEADER_SIZE + capacity * self._row.size)
+        self._mm = mmap.mmap(self._data.fileno(), 0)
+        self._capacity = capacity
+
+    def start_episode(self, episode: Optional[int] = None) -> None:
+        """Mark the next appended row as the first row of a new episode."""
+        if episode is None:
+            episode = self._last_episode + 1 if self._last_episode is not None else 1
+        self._index.write(_INDEX_ENTRY.pack(episode, self._rows))
+        self._last_episode = episode
+        self.num_episodes += 1
+
+    def append(self, row: Mapping[str, Any]) -> None:
+        """Append a row given as a dict, e.g. the one built by `log_iterations`.
+        Missing and non-numeric values are stored as NaN."""
+        self.append_values([to_float(row.get(name)) for name in self.columns])
+
+    def append_values(self, values: Sequence[float]) -> None:
+        """Append a row given as floats in column order."""
+        if len(values) != self._width:
+            raise ValueError(
+                "Expected {} values, got {}.".format(self._width, len(values))
+            )
+        if self._episode_index is not None:
+            episode = values[self._episode_index]
+            if not math.isnan(episode) and int(episode) != self._last_episode:
+                self.start_episode(int(episode))
+        if self.num_episodes == 0:
+            self.start_episode()
+
+        if self._rows >= self._capacity:
+            self._map(self._capacity + self.chunk_rows)
+        self._row.pack_into(self._mm, HEADER_SIZE + self._rows * self._row.size, *values)
+        self._rows += 1
+
+    def flush(self) -> None:
+        """Commit appended rows so readers opened from now on can see them."""
+        self._index.flush()
+        self._mm.flush()
+        _HEADER.pack_into(self._mm, 0, _MAGIC, self._rows, self._width, 0)
+        self._mm.flush(0, min(mmap.PAGESIZE, len(self._mm)))
+
+    def close(self) -> None:
+        """Commit everything and trim the preallocated tail of the data file."""
+        if self._mm is None:
+            return
+        self.flush()
+        self._mm.close()
+        self._mm = None
+        self._data.truncate(HEADER_SIZE + self._rows * self._row.size)
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self) -> "BinaryTrajectoryWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class BinaryTrajectoryReader:
+    """Read-only, memory-mapped view of a binary trajectory store.
+
+    Requires numpy. Episodes are returned as (rows, columns) views into the
+    mapped file; nothing is copied until the caller does so.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as fh:
+            self.columns = json.load(fh)["columns"]  # type: List[str]
+        width = len(self.columns)
+
+        data_path = os.path.join(path, DATA_FILE)
+        with open(data_path, "rb") as fh:
+            magic, rows, stored_width, _ = _HEADER.unpack(fh.read(HEADER_SIZE))
+        if magic != _MAGIC or stored_width != width:
+            raise ValueError("{} is not a compatible trajectory store.".format(path))
+
+        if rows:
+            self._data = np.memmap(
+                data_path, dtype="<f8", mode="r", offset=HEADER_SIZE, shape=(rows, width)
+            )
+        else:
+            self._data = np.empty((0, width), dtype="<f8")
+
+        index_path = os.path.join(path, INDEX_FILE)
+        entries = 0
+        if os.path.exists(index_path):
+            entries = os.path.getsize(index_path) // _INDEX_ENTRY.size
+        if entries:
+            index = np.memmap(index_path, dtype="<i8", mode="r", shape=(entries, 2))
+            # ignore episodes whose rows were never committed
+            entries = int(np.searchsorted(index[:, 1], rows, side="right"))
+            if entries and index[entries - 1, 1] == rows:
+                entries -= 1
+            self._index = index[:entries]
+        else:
+            self._index = np.empty((0, 2), dtype="<i8")
+
+    @property
+    def num_rows(self) -> int:
+        return self._data.shape[0]
+
+    @property
+    def num_episodes(self) -> int:
+        return self._index.shape[0]
+
+    @property
+    def episode_numbers(self):
+        """Episode numbers in store order."""
+        return self._index[:, 0]
+
+    @property
+    def rows(self):
+        """All committed rows as a (num_rows, columns) array."""
+        return self._data
+
+    def column(self, name: str):
+        """One column over all rows."""
+        return self._data[:, self.columns.index(name)]
+
+    def episode(self, i: int):
+        """Rows of the `i`-th episode in the store (not the episode number)."""
+        if i < 0:
+            i += self.num_episodes
+        if not 0 <= i < self.num_episodes:
+            raise IndexError("episode index out of range")
+        start = int(self._index[i, 1])
+        stop = int(self._index[i + 1, 1]) if i + 1 < self.num_episodes else self.num_rows
+        return self._data[start:stop]
+
+    def __len__(self) -> int:
+        return self.num_episodes
+
+    def __getitem__(self, i: int):
+        return self.episode(i)
+
+    def __iter__(self):
+        for i in range(self.num_episodes):
+            yield self.episode(i)
+
+    def close(self) -> None:
+        self._data = None
+        self._index = None
+
+    def __enter__(self) -> "BinaryTrajectoryReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def csv_to_binary(
+    csv_path: str,
+    store_path: str,
+    columns: Optional[Sequence[str]] = None,
+    **kwargs: Any
+) -> int:
+    """Convert a CSV log (as written by the samples' `log_iterations`) into a
+    binary store, streaming row by row. Delta-encoded logs are decoded.
+
+    Parameters
+    ----------
+    csv_path : str
+        Source CSV file with a header row.
+    store_path : str
+        Destination store directory; appended to if it already exists.
+    columns : Sequence[str], optional
+        Columns to keep, by default every column of the CSV.
+
+    Returns
+    -------
+    int
+        Number of rows converted.
+    """
+    count = 0
+    rows = iter_rows(csv_path)
+    first = next(rows, None)
+    if columns is None:
+        columns = list(first.keys()) if first is not None else []
+    with BinaryTrajectoryWriter(store_path, columns, **kwargs) as writer:
+        for row in itertools.chain([first] if first is not None else [], rows):
+            writer.append(row)
+            count += 1
+    return count
+
+
+def binary_to_csv(store_path: str, csv_path: str) -> int:
+    """Write a binary store back out in the CSV layout.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+    """
+    with open(os.path.join(store_path, META_FILE)) as fh:
+        columns = json.load(fh)["columns"]
+    row = struct.Struct("<{}d".format(len(columns)))
+
+    with open(os.path.join(store_path, DATA_FILE), "rb") as data:
+        _, rows, _, _ = _HEADER.unpack(data.read(HEADER_SIZE))
+        with open(csv_path, "w", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(columns)
+            for values in _iter_rows(data, row, rows):
+                writer.writerow([format_float(v) for v in values])
+    return rows
+
+
+def _iter_rows(data: Any, row: struct.Struct, rows: int) -> Iterable[Sequence[float]]:
+    block_rows = 4096
+    remaining = rows
+    while remaining:
+        n = min(block_rows, remaining)
+        buffer = data.read(n * row.size)
+        for values in row.iter_unpack(buffer):
+            yield values
+        remaining -= n
@@ -0,0 +1,177 @@
+"""
+Delta (repeat-suppressed) encoding for CSV simulator logs.
+Copyright 2021 Microsoft
+
+Most logged columns change rarely: `config_*` columns are constant for a
+whole episode, and quantities like a cart mass or a tariff only change every
+few hundred iterations. In a delta-encoded log a cell is left empty when its
+value equals the one in the row above, so such columns cost a single comma
+per row. The first row of every episode is always written in full, which
+makes every episode decodable on its own.
+
+A delta-encoded file starts with the `DELTA_MARKER` line, followed by an
+ordinary CSV header. Values that are genuinely missing are written as "NaN"
+so they cannot be confused with a repeat.
+"""
+
+import csv
+import gzip
+import itertools
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence
+
+DELTA_MARKER = "#trajectory-encoding: delta-v1"
+PLAIN = "plain"
+DELTA = "delta"
+ENCODINGS = (PLAIN, DELTA)
+
+MISSING = "NaN"
+
+
+def check_encoding(encoding: str) -> str:
+    if encoding not in ENCODINGS:
+        raise ValueError(
+            "Unknown log encoding '{}', expected one of {}.".format(encoding, ENCODINGS)
+        )
+    return encoding
+
+
+class DeltaEncoder:
+    """Turns full rows into delta-encoded rows, one row at a time.
+
+    Rows are compared against the previous row of the same episode. Values
+    are compared exactly, so decoding is lossless.
+    """
+
+    def __init__(self, fieldnames: Sequence[str], episode_column: str = "episode"):
+        self.fieldnames = list(fieldnames)
+        self.episode_column = episode_column
+        self._previous = None  # type: Optional[Dict[str, Any]]
+
+    def reset(self) -> None:
+        """Write the next row in full."""
+        self._previous = None
+
+    def encode(self, row: Mapping[str, Any]) -> Dict[str, Any]:
+        current = {}  # type: Dict[str, Any]
+        for name in self.fieldnames:
+            value = row.get(name)
+            current[name] = MISSING if value is None or value == "" else value
+        previous = self._previous
+        self._previous = current
+        if previous is None or previous.get(self.episode_column) != current.get(
+            self.episode_column
+        ):
+            return current
+
+        encoded = {}  # type: Dict[str, Any]
+        for name, value in current.items():
+            if name == self.episode_column or value != previous[name]:
+                encoded[name] = value
+            else:
+                encoded[name] = ""
+        return encoded
+
+
+def _open_text(path: str) -> Any:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+
+def is_delta_encoded(path: str) -> bool:
+    """Whether a CSV log (optionally gzipped) starts with `DELTA_MARKER`."""
+    with _open_text(path) as fh:
+        return fh.readline().rstrip("\r\n") == DELTA_MARKER
+
+
+def iter_rows(path: str) -> Iterator[Dict[str, str]]:
+    """Yield the rows of a plain or delta-encoded CSV log as full dicts."""
+    with _open_text(path) as fh:
+        first = fh.readline()
+        if first.rstrip("\r\n") == DELTA_MARKER:
+            reader = csv.DictReader(fh)
+            previous = {}  # type: Dict[str, str]
+            for row in reader:
+                decoded = {
+                    k: v if v != "" else previous.get(k, "") for k, v in row.items()
+                }
+                previous = decoded
+                yield decoded
+        else:
+            for row in csv.DictReader(itertools.chain([first], fh)):
+                yield row
+
+
+def decode_frame(frame: Any, carry: Optional[Any] = None) -> Any:
+    """Fill the repeated (empty) cells of a chunk read with `na_filter=False`.
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+        Consecutive rows of a delta-encoded log, all columns as strings.
+    carry : pandas.Series, optional
+        Last decoded row of the previous chunk.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Decoded rows, still as strings.
+    """
+    import numpy as np
+
+    if frame.empty:
+        return frame
+    values = frame.to_numpy(dtype=object)
+    blank = values == ""
+    if carry is not None:
+        first_blank = blank[0]
+        values[0, first_blank] = carry.to_numpy(dtype=object)[first_blank]
+        blank[0] = False
+    # forward-fill each column from the last non-empty cell above it; the
+    # first row of every episode is complete, so fills never cross episodes
+    index = np.where(~blank, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = np.take_along_axis(values, index, axis=0)
+    return frame.__class__(filled, columns=frame.columns, index=frame.index)
+
+
+def delta_to_csv(path: str, csv_path: str) -> int:
+    """Expand a delta-encoded log into a plain CSV file.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+    """
+    count = 0
+    writer = None  # type: Optional[csv.DictWriter]
+    with open(csv_path, "w", newline="") as out:
+        for row in iter_rows(path):
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def csv_to_delta(csv_path: str, path: str, episode_column: str = "episode") -> int:
+    """Rewrite a plain CSV log with delta encoding.
+
+    Returns
+    -------
+    int
+        Number of rows written.
+    """
+    count = 0
+    with _open_text(csv_path) as src, open(path, "w", newline="") as out:
+        reader = csv.DictReader(src)
+        fieldnames = reader.fieldnames or []  # type: List[str]
+        encoder = DeltaEncoder(fieldnames, episode_column)
+        out.write(DELTA_MARKER + "\r\n")
+        writer = csv.DictWriter(out, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in reader:
+            writer.writerow(encoder.encode(row))
+            count += 1
+    return count
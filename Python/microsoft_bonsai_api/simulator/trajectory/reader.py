@@ -0,0 +1,329 @@
+"""
+Streaming, per-episode readers for CSV simulator logs.
+Copyright 2021 Microsoft
+
+Works with the CSV files written by the samples' `log_iterations`
+(episode/iteration columns) and with KQL exports of assessment logs
+(EpisodeIndex/IterationIndex columns). Files are parsed in bounded chunks, so
+memory use depends on the longest episode, not on the size of the file.
+
+Requires numpy and pandas.
+"""
+
+import collections
+import itertools
+import multiprocessing
+from typing import (
+    Any,
+    Callable,
+    Container,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from .encoding import decode_frame, is_delta_encoded
+from .rotation import MANIFEST_SUFFIX, segment_paths
+
+# column names recognized automatically, sample logs first, then KQL exports
+EPISODE_COLUMNS = ("episode", "EpisodeIndex")
+ITERATION_COLUMNS = ("iteration", "IterationIndex")
+
+_BOOL_STRINGS = {"True": 1.0, "False": 0.0, "true": 1.0, "false": 0.0}
+
+
+class EpisodeBlock(NamedTuple):
+    """Consecutive rows of one episode from one log file."""
+
+    source: str
+    episode: int
+    columns: List[str]
+    # (rows, len(columns)) float64; non-numeric cells are NaN
+    data: Any
+
+    def column(self, name: str) -> Any:
+        return self.data[:, self.columns.index(name)]
+
+
+def _detect(
+    header: Sequence[str], explicit: Optional[str], candidates: Sequence[str]
+) -> Optional[str]:
+    if explicit is not None:
+        if explicit not in header:
+            raise ValueError("Column '{}' not found in log.".format(explicit))
+        return explicit
+    for name in candidates:
+        if name in header:
+            return name
+    return None
+
+
+def _isin(values: Any, container: Container[int]) -> Any:
+    import numpy as np
+
+    if isinstance(container, range) and container.step == 1:
+        return (values >= container.start) & (values < container.stop)
+    return np.fromiter(
+        (v == v and int(v) in container for v in values.tolist()),
+        dtype=bool,
+        count=len(values),
+    )
+
+
+def _to_numeric_block(frame: Any) -> Any:
+    import numpy as np
+    import pandas as pd
+
+    if frame.empty:
+        return np.empty((0, frame.shape[1]), dtype=np.float64)
+    converted = {}
+    for name in frame.columns:
+        series = frame[name]
+        if pd.api.types.is_bool_dtype(series):
+            series = series.astype(np.float64)
+        elif not pd.api.types.is_numeric_dtype(series):
+            # text columns: booleans become 1/0, anything else non-numeric NaN
+            booleans = series.map(_BOOL_STRINGS).astype(np.float64)
+            numbers = pd.to_numeric(series, errors="coerce").astype(np.float64)
+            series = numbers.fillna(booleans)
+        converted[name] = series
+    return pd.DataFrame(converted).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def iter_episodes(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    episodes: Optional[Container[int]] = None,
+    iterations: Optional[Container[int]] = None,
+    episode_column: Optional[str] = None,
+    iteration_column: Optional[str] = None,
+    chunk_rows: int = 65536,
+) -> Iterator[EpisodeBlock]:
+    """Yield the episodes of one CSV log as numpy blocks.
+
+    Parameters
+    ----------
+    path : str
+        CSV log file.
+    columns : Sequence[str], optional
+        Columns to load, by default all. Other columns are skipped by the
+        parser and never materialized.
+    episodes : Container[int], optional
+        Only keep these episodes, e.g. `range(100, 200)` or a set.
+    iterations : Container[int], optional
+        Only keep rows with these iteration numbers.
+    episode_column, iteration_column : str, optional
+        Override the automatically detected episode and iteration columns.
+    chunk_rows : int, optional
+        Number of rows parsed at a time.
+
+    Yields
+    ------
+    EpisodeBlock
+        One block per run of consecutive rows with the same episode number.
+
+    Delta-encoded logs (see `encoding`) are decoded transparently.
+    """
+    import numpy as np
+    import pandas as pd
+
+    delta = is_delta_encoded(path)
+    skiprows = 1 if delta else None
+    header = list(pd.read_csv(path, nrows=0, skiprows=skiprows).columns)
+    episode_column = _detect(header, episode_column, EPISODE_COLUMNS)
+    if episode_column is None:
+        raise ValueError("No episode column found in {}.".format(path))
+    iteration_column = _detect(header, iteration_column, ITERATION_COLUMNS)
+    if iterations is not None and iteration_column is None:
+        raise ValueError("No iteration column found in {}.".format(path))
+
+    if columns is None:
+        columns = header
+    else:
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError("Columns not found in {}: {}".format(path, missing))
+    columns = list(columns)
+
+    # the filter columns are parsed even when they are not projected
+    usecols = set(columns)
+    usecols.add(episode_column)
+    if iterations is not None:
+        usecols.add(iteration_column)
+
+    pending = []  # type: List[Any]
+    pending_episode = None  # type: Optional[int]
+    read_options = {}  # type: Dict[str, Any]
+    if delta:
+        # keep cells as text so a repeated (empty) cell differs from "NaN"
+        read_options = dict(skiprows=1, dtype=str, na_filter=False)
+    carry = None  # type: Optional[Any]
+
+    for chunk in pd.read_csv(
+        path, usecols=sorted(usecols), chunksize=chunk_rows, **read_options
+    ):
+        if delta:
+            chunk = decode_frame(chunk, carry)
+            if chunk.empty:
+                continue
+            carry = chunk.iloc[-1]
+            for name in (episode_column, iteration_column):
+                if name in chunk.columns:
+                    chunk[name] = pd.to_numeric(chunk[name], errors="coerce")
+        chunk_episodes = chunk[episode_column].to_numpy()
+
+        # rows without an episode number (e.g. a blank line) cannot be grouped
+        keep = ~pd.isna(chunk_episodes)
+        if episodes is not None:
+            keep &= _isin(chunk_episodes, episodes)
+        if iterations is not None:
+            keep &= _isin(chunk[iteration_column].to_numpy(), iterations)
+        if not keep.all():
+            chunk = chunk[keep]
+            chunk_episodes = chunk_episodes[keep]
+        if chunk.empty:
+            continue
+
+        block = _to_numeric_block(chunk[columns])
+        # split the chunk where the episode number changes
+        boundaries = np.flatnonzero(chunk_episodes[1:] != chunk_episodes[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        stops = np.concatenate((boundaries, [len(chunk_episodes)]))
+
+        for start, stop in zip(starts, stops):
+            episode = int(chunk_episodes[start])
+            if pending and episode != pending_episode:
+                yield EpisodeBlock(path, pending_episode, columns, np.concatenate(pending))
+                pending = []
+            pending_episode = episode
+            pending.append(block[start:stop])
+
+    if pending:
+        yield EpisodeBlock(path, pending_episode, columns, np.concatenate(pending))
+
+
+def _stream_file(path: str, kwargs: Dict[str, Any], out: Any) -> None:
+    # runs in a worker process; `out` is bounded, so the worker parses ahead
+    # of the caller by at most its size in blocks
+    try:
+        for block in iter_episodes(path, **kwargs):
+            out.put(block)
+    except Exception as err:
+        out.put(err)
+        return
+    out.put(None)
+
+
+def _stream_files(
+    paths: Sequence[str], processes: int, prefetch: int, kwargs: Dict[str, Any]
+) -> Iterator[EpisodeBlock]:
+    def start(path: str) -> Any:
+        out = multiprocessing.Queue(maxsize=prefetch)  # type: Any
+        worker = multiprocessing.Process(
+            target=_stream_file, args=(path, kwargs, out), daemon=True
+        )
+        worker.start()
+        return worker, out
+
+    remaining = iter(paths)
+    running = collections.deque(start(p) for p in itertools.islice(remaining, processes))
+    try:
+        while running:
+            worker, out = running[0]
+            while True:
+                item = out.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            worker.join()
+            running.popleft()
+            path = next(remaining, None)
+            if path is not None:
+                running.append(start(path))
+    finally:
+        for worker, _ in running:
+            worker.terminate()
+            worker.join()
+
+
+def _map_file(args: Any) -> List[Any]:
+    func, path, kwargs = args
+    return [func(block) for block in iter_episodes(path, **kwargs)]
+
+
+def _expand(paths: Union[str, Sequence[str]]) -> List[str]:
+    if isinstance(paths, str):
+        paths = [paths]
+    expanded = []  # type: List[str]
+    for path in paths:
+        if path.endswith(MANIFEST_SUFFIX):
+            expanded.extend(segment_paths(path))
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def _pool(processes: Optional[int], jobs: int) -> Any:
+    processes = processes or multiprocessing.cpu_count()
+    return multiprocessing.Pool(min(processes, max(jobs, 1)))
+
+
+def read_episodes(
+    paths: Union[str, Sequence[str]],
+    processes: Optional[int] = 1,
+    prefetch: int = 4,
+    **kwargs: Any
+) -> Iterator[EpisodeBlock]:
+    """Yield episode blocks from several log files, in file order.
+
+    With `processes` other than 1, up to that many files are parsed at once in
+    worker processes (None uses every core). Each worker streams its blocks
+    back through a queue of `prefetch` blocks, so memory stays bounded per
+    worker as it does for `iter_episodes`. A rotation manifest stands for its
+    segments, oldest first. Keyword arguments are passed to `iter_episodes`.
+    """
+    paths = _expand(paths)
+    if processes == 1 or len(paths) <= 1:
+        for path in paths:
+            for block in iter_episodes(path, **kwargs):
+                yield block
+        return
+
+    if prefetch < 1:
+        raise ValueError("prefetch must be at least 1.")
+    processes = processes or multiprocessing.cpu_count()
+    for block in _stream_files(paths, processes, prefetch, kwargs):
+        yield block
+
+
+def map_episodes(
+    func: Callable[[EpisodeBlock], Any],
+    paths: Union[str, Sequence[str]],
+    processes: Optional[int] = None,
+    **kwargs: Any
+) -> List[Any]:
+    """Apply `func` to every episode block inside the worker processes.
+
+    Only the results travel back to the caller, which makes this the cheapest
+    way to compute per-episode KPIs over many large logs. `func` must be
+    picklable, i.e. defined at module level.
+
+    Returns
+    -------
+    List[Any]
+        Results in file order, then episode order.
+    """
+    paths = _expand(paths)
+    jobs = [(func, p, kwargs) for p in paths]
+    if processes == 1 or len(paths) <= 1:
+        results = [_map_file(job) for job in jobs]
+    else:
+        with _pool(processes, len(paths)) as pool:
+            results = pool.map(_map_file, jobs)
+    return [result for file_results in results for result in file_results]
@@ -0,0 +1,291 @@
+"""
+Size- and episode-based rotation for long-running CSV logs.
+Copyright 2021 Microsoft
+
+A rotating log is a sequence of standalone CSV segments, each with its own
+header, plus a JSON manifest listing them in write order:
+
+    <prefix>.00000.csv.gz
+    <prefix>.00001.csv.gz
+    <prefix>.00002.csv          <- segment currently being written
+    <prefix>.manifest.json
+
+Closed segments are gzip-compressed by a background thread and, if
+`keep_segments` is set, the oldest ones are deleted so a run cannot fill the
+disk. Appending costs the same regardless of how long the run has been going.
+"""
+
+import atexit
+import csv
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from .encoding import DELTA, DELTA_MARKER, PLAIN, DeltaEncoder, check_encoding
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+class _CountingWriter:
+    """File wrapper that keeps track of how many bytes were written."""
+
+    def __init__(self, fh: Any):
+        self.fh = fh
+        self.encoding = fh.encoding
+        self.written = 0
+
+    def write(self, text: str) -> int:
+        # bytes, not characters, so max_bytes holds for non-ASCII values
+        self.written += len(text.encode(self.encoding))
+        return self.fh.write(text)
+
+
+class RotatingTrajectoryLog:
+    """Writes log rows to CSV segments that rotate by size or episode count."""
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "log",
+        max_bytes: Optional[int] = None,
+        max_episodes: Optional[int] = None,
+        compress: bool = True,
+        keep_segments: Optional[int] = None,
+        fieldnames: Optional[Sequence[str]] = None,
+        episode_column: str = "episode",
+        encoding: str = PLAIN,
+    ):
+        """
+        Parameters
+        ----------
+        directory : str
+            Directory for segments and manifest; created if needed.
+        prefix : str, optional
+            File name prefix shared by all segments, by default "log"
+        max_bytes : int, optional
+            Start a new segment once the current one reaches this size.
+        max_episodes : int, optional
+            Start a new segment after this many calls to `episode_finish`.
+        compress : bool, optional
+            Gzip closed segments in a background thread, by default True
+        keep_segments : int, optional
+            Delete the oldest closed segments beyond this many.
+        fieldnames : Sequence[str], optional
+            Column order; by default the keys of the first row.
+        episode_column : str, optional
+            Column used to record each segment's episode range.
+        encoding : str, optional
+            "plain" or "delta", by default "plain". Each segment is encoded
+            on its own so it stays readable without its predecessors.
+        """
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes must be positive.")
+        if max_episodes is not None and max_episodes <= 0:
+            raise ValueError("max_episodes must be positive.")
+        if keep_segments is not None and keep_segments <= 0:
+            raise ValueError("keep_segments must be positive.")
+
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_episodes = max_episodes
+        self.compress = compress
+        self.keep_segments = keep_segments
+        self.episode_column = episode_column
+        self.encoding = check_encoding(encoding)
+        self.manifest_path = os.path.join(directory, prefix + MANIFEST_SUFFIX)
+        os.makedirs(directory, exist_ok=True)
+
+        self._fieldnames = list(fieldnames) if fieldnames else None
+        self._lock = threading.Lock()
+        self._segments = []  # type: List[Dict[str, Any]]
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as fh:
+                self._segments = json.load(fh)["segments"]
+            for segment in self._segments:
+                segment["open"] = False
+
+        self._file = None  # type: Any
+        self._counter = None  # type: Optional[_CountingWriter]
+        self._writer = None  # type: Optional[csv.DictWriter]
+        self._encoder = None  # type: Optional[DeltaEncoder]
+        self._current = None  # type: Optional[Dict[str, Any]]
+        self._episodes_in_segment = 0
+        self._closed = False
+
+        self._compress_queue = queue.Queue()  # type: queue.Queue
+        self._compressor = None  # type: Optional[threading.Thread]
+        if compress:
+            self._compressor = threading.Thread(
+                target=self._compress_loop, name="RotatingTrajectoryLog", daemon=True
+            )
+            self._compressor.start()
+            # finish compressing segments left behind by a previous run
+            for segment in self._segments:
+                if not segment["compressed"]:
+                    self._compress_queue.put(segment)
+        atexit.register(self.close)
+
+    @property
+    def segments(self) -> List[Dict[str, Any]]:
+        """Manifest entries in write order."""
+        with self._lock:
+            return [dict(s) for s in self._segments]
+
+    def log(self, row: Mapping[str, Any]) -> None:
+        """Append one row to the current segment."""
+        if self._closed:
+            raise RuntimeError("Cannot log to a closed RotatingTrajectoryLog.")
+        if self._writer is None:
+            self._open_segment(row)
+
+        if self._encoder is not None:
+            self._writer.writerow(self._encoder.encode(row))
+        else:
+            self._writer.writerow(row)
+        segment = self._current
+        segment["rows"] += 1
+        episode = row.get(self.episode_column)
+        if episode is not None:
+            if segment["first_episode"] is None:
+                segment["first_episode"] = episode
+            segment["last_episode"] = episode
+
+        if self.max_bytes is not None and self._counter.written >= self.max_bytes:
+            self.rotate()
+
+    def episode_finish(self) -> None:
+        """Flush the segment and rotate it if `max_episodes` is reached."""
+        if self._file is None:
+            return
+        self._episodes_in_segment += 1
+        if self.max_episodes is not None and self._episodes_in_segment >= self.max_episodes:
+            self.rotate()
+        else:
+            self._file.flush()
+
+    def rotate(self) -> None:
+        """Close the current segment; the next row starts a new one."""
+        if self._file is None:
+            return
+        self._file.close()
+        segment = self._current
+        segment["bytes"] = self._counter.written
+        segment["open"] = False
+        self._file = self._counter = self._writer = self._encoder = None
+        self._current = None
+        self._episodes_in_segment = 0
+
+        with self._lock:
+            self._write_manifest()
+        if self.compress:
+            self._compress_queue.put(segment)
+        else:
+            self._apply_retention()
+
+    def close(self) -> None:
+        """Close the current segment and wait for pending compression."""
+        if self._closed:
+            return
+        self.rotate()
+        self._closed = True
+        atexit.unregister(self.close)
+        if self._compressor is not None:
+            self._compress_queue.put(None)
+            self._compressor.join()
+
+    def __enter__(self) -> "RotatingTrajectoryLog":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _open_segment(self, row: Mapping[str, Any]) -> None:
+        if self._fieldnames is None:
+            self._fieldnames = list(row.keys())
+        index = self._segments[-1]["index"] + 1 if self._segments else 0
+        name = "{}.{:05d}.csv".format(self.prefix, index)
+
+        self._file = open(os.path.join(self.directory, name), "w", newline="")
+        self._counter = _CountingWriter(self._file)
+        self._writer = csv.DictWriter(
+            self._counter, fieldnames=self._fieldnames, restval="", extrasaction="ignore"
+        )
+        if self.encoding == DELTA:
+            self._encoder = DeltaEncoder(self._fieldnames, self.episode_column)
+            self._counter.write(DELTA_MARKER + "\r\n")
+        self._writer.writeheader()
+        self._current = {
+            "index": index,
+            "file": name,
+            "rows": 0,
+            "bytes": 0,
+            "first_episode": None,
+            "last_episode": None,
+            "compressed": False,
+            "open": True,
+        }
+        with self._lock:
+            self._segments.append(self._current)
+            self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        # write-then-rename so readers never see a partial manifest
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump({"prefix": self.prefix, "segments": self._segments}, fh, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _compress_loop(self) -> None:
+        while True:
+            segment = self._compress_queue.get()
+            if segment is None:
+                return
+            source = os.path.join(self.directory, segment["file"])
+            target = source + ".gz"
+            if os.path.exists(source):
+                with open(source, "rb") as src, gzip.open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                with self._lock:
+                    segment["file"] = segment["file"] + ".gz"
+                    segment["compressed"] = True
+                    self._write_manifest()
+                os.remove(source)
+            self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        if self.keep_segments is None:
+            return
+        with self._lock:
+            closed = [s for s in self._segments if not s["open"]]
+            expired = closed[: max(0, len(closed) - self.keep_segments)]
+            # never delete a segment still waiting to be compressed
+            expired = [s for s in expired if s["compressed"] or not self.compress]
+            if not expired:
+                return
+            for segment in expired:
+                path = os.path.join(self.directory, segment["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+                self._segments.remove(segment)
+            self._write_manifest()
+
+
+def segment_paths(manifest_path: str, include_open: bool = True) -> List[str]:
+    """Paths of the segments listed in a manifest, oldest first.
+
+    The result can be passed straight to `read_episodes`, which reads
+    compressed and uncompressed segments alike.
+    """
+    with open(manifest_path) as fh:
+        segments = json.load(fh)["segments"]
+    directory = os.path.dirname(manifest_path)
+    return [
+        os.path.join(directory, s["file"])
+        for s in segments
+        if include_open or not s["open"]
+    ]
@@ -0,0 +1,372 @@
+"""
+Asynchronous trajectory logging for simulator integrations.
+Copyright 2021 Microsoft
+"""
+
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from .encoding import (
+    DELTA,
+    DELTA_MARKER,
+    PLAIN,
+    DeltaEncoder,
+    check_encoding,
+    is_delta_encoded,
+)
+
+
+class OverflowPolicy(str, Enum):
+    """What `AsyncTrajectorySink.log` does when the queue is full."""
+
+    # wait for the writer thread to make room (lossless backpressure)
+    BLOCK = "block"
+    # discard the oldest queued row to make room for the new one
+    DROP_OLDEST = "drop_oldest"
+    # keep one row in `sample_every`, discard the rest, while the queue is full
+    SAMPLE = "sample"
+
+
+# markers passed through the queue alongside rows; _FLUSH only wakes the
+# writer, which then flushes up to the row count of the latest request
+_FLUSH = object()
+_STOP = object()
+
+# how often a blocked `log` or `close` checks that the writer is still running
+POLL_SECONDS = 0.1
+
+
+class AsyncTrajectorySink:
+    """Hands logged rows to a dedicated writer thread over a bounded queue.
+
+    The stepping thread only pays for a queue insert; CSV formatting,
+    buffered writes and (optionally) fsync happen on the writer thread, so a
+    slow disk no longer delays the next call to `advance`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fieldnames: Optional[Sequence[str]] = None,
+        max_queue_size: int = 10000,
+        overflow: Union[OverflowPolicy, str] = OverflowPolicy.BLOCK,
+        sample_every: int = 10,
+        batch_size: int = 256,
+        fsync: bool = False,
+        append: bool = False,
+        encoding: str = PLAIN,
+        episode_column: str = "episode",
+    ):
+        """
+        Parameters
+        ----------
+        path : str
+            CSV file the rows are written to.
+        fieldnames : Sequence[str], optional
+            Column order. If omitted, the keys of the first row are used.
+            Keys missing from a row are written empty, unknown keys are ignored.
+        max_queue_size : int, optional
+            Number of rows that may be pending before `overflow` applies.
+        overflow : OverflowPolicy or str, optional
+            One of "block", "drop_oldest" or "sample", by default "block".
+        sample_every : int, optional
+            With the "sample" policy, keep one row out of this many while full.
+        batch_size : int, optional
+            Maximum number of rows the writer drains per wake-up.
+        fsync : bool, optional
+            Whether flushes also fsync the file, by default False.
+        append : bool, optional
+            Append to an existing file instead of truncating it.
+        encoding : str, optional
+            "plain" or "delta" (cells equal to the row above are left empty,
+            see `encoding`), by default "plain".
+        episode_column : str, optional
+            Column that separates episodes for the delta encoding.
+        """
+        if max_queue_size <= 0:
+            raise ValueError("max_queue_size must be positive.")
+        if sample_every <= 0:
+            raise ValueError("sample_every must be positive.")
+
+        self.path = path
+        self.overflow = OverflowPolicy(overflow)
+        self.sample_every = sample_every
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.encoding = check_encoding(encoding)
+        self.episode_column = episode_column
+
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            if is_delta_encoded(path) != (self.encoding == DELTA):
+                raise ValueError(
+                    "Cannot append {} rows to {}: it uses a different encoding.".format(
+                        self.encoding, path
+                    )
+                )
+
+        self._fieldnames = list(fieldnames) if fieldnames else None
+        self._append = append
+        self._queue = queue.Queue(maxsize=max_queue_size)  # type: queue.Queue
+        self._flushed = threading.Condition()
+        # rows queued when the latest flush was requested, and rows known to
+        # be flushed; a flush is pending while the first exceeds the second
+        self._flush_target = 0
+        self._flushed_rows = 0
+        self._wakeup_queued = False
+        self._closed = False
+
+        # counters exported through `stats`
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._evicted = 0
+        self._full_hits = 0
+        self._max_depth = 0
+        self._writer_error = None  # type: Optional[BaseException]
+
+        self._thread = threading.Thread(
+            target=self._run, name="AsyncTrajectorySink", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, row: Dict[str, Any]) -> bool:
+        """Queue one row for writing.
+
+        Returns
+        -------
+        bool
+            False if the row was discarded by the overflow policy.
+        """
+        if self._closed:
+            raise RuntimeError("Cannot log to a closed AsyncTrajectorySink.")
+        self._check_writer()
+
+        try:
+            self._queue.put_nowait(dict(row))
+        except queue.Full:
+            if not self._put_when_full(dict(row)):
+                return False
+
+        self._enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self._max_depth:
+            self._max_depth = depth
+        return True
+
+    def _check_writer(self) -> None:
+        if self._writer_error is not None:
+            raise RuntimeError(
+                "AsyncTrajectorySink writer thread failed: {}".format(self._writer_error)
+            )
+        if not self._thread.is_alive():
+            raise RuntimeError("AsyncTrajectorySink writer thread has stopped.")
+
+    def _put_blocking(self, item: Any, timeout: Optional[float] = None) -> bool:
+        # wait for room in bounded steps, so a writer that died while the
+        # queue was full raises instead of blocking the caller forever
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._check_writer()
+            wait = POLL_SECONDS
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            try:
+                self._queue.put(item, timeout=wait)
+                return True
+            except queue.Full:
+                pass
+
+    def _put_when_full(self, row: Dict[str, Any]) -> bool:
+        self._full_hits += 1
+        if self.overflow is OverflowPolicy.BLOCK:
+            return self._put_blocking(row)
+
+        if self.overflow is OverflowPolicy.SAMPLE:
+            if self._full_hits % self.sample_every == 0:
+                # never wait: the sampled row is dropped too if still full
+                try:
+                    self._queue.put_nowait(row)
+                    return True
+                except queue.Full:
+                    pass
+            self._dropped += 1
+            return False
+
+        # DROP_OLDEST: replace the oldest queued row in place. Markers are
+        # never evicted, nor moved behind newer rows. Rows always leave the
+        # queue oldest first, so flushes can count them with `_evicted`.
+        q = self._queue
+        with q.mutex:
+            items = q.queue
+            if len(items) < q.maxsize:
+                # the writer made room meanwhile
+                items.append(row)
+                q.unfinished_tasks += 1
+                q.not_empty.notify()
+                return True
+            for index, item in enumerate(items):
+                if item is not _FLUSH and item is not _STOP:
+                    del items[index]
+                    items.append(row)
+                    self._dropped += 1
+                    self._evicted += 1
+                    return True
+        # only markers are queued, give up on this row instead
+        self._dropped += 1
+        return False
+
+    def episode_finish(self) -> None:
+        """Ask the writer to flush at the episode boundary without waiting."""
+        if not self._closed and self._thread.is_alive():
+            self._request_flush()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every row queued so far is written and flushed.
+
+        Rows discarded by the overflow policy meanwhile count as flushed.
+
+        Returns
+        -------
+        bool
+            False if `timeout` expired first.
+        """
+        if self._closed or not self._thread.is_alive():
+            return True
+        target = self._request_flush()
+        with self._flushed:
+            return self._flushed.wait_for(
+                lambda: self._flushed_rows >= target or not self._thread.is_alive(),
+                timeout=timeout,
+            )
+
+    def _request_flush(self) -> int:
+        # never waits for room: a full queue keeps the writer busy, and it
+        # checks for pending flushes after every batch
+        with self._flushed:
+            self._flush_target = self._enqueued
+            target = self._flush_target
+            if target <= self._flushed_rows or self._wakeup_queued:
+                return target
+            self._wakeup_queued = True
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except queue.Full:
+            with self._flushed:
+                self._wakeup_queued = False
+        return target
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write out everything still queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        if not self._thread.is_alive():
+            return
+        try:
+            if not self._put_blocking(_STOP, timeout):
+                return
+        except RuntimeError:
+            # the writer already stopped, its error is kept in `error`
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and row counters, e.g. for periodic export to metrics."""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self._max_depth,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "dropped": self._dropped,
+        }
+
+    @property
+    def error(self) -> Optional[BaseException]:
+        """Exception that stopped the writer thread, if any."""
+        return self._writer_error
+
+    def __enter__(self) -> "AsyncTrajectorySink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        mode = "a" if self._append else "w"
+        write_header = not (
+            self._append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        )
+        try:
+            with open(self.path, mode, newline="") as fh:
+                writer = None  # type: Optional[csv.DictWriter]
+                encoder = None  # type: Optional[DeltaEncoder]
+                stop = False
+                while not stop:
+                    batch = [self._queue.get()]  # type: List[Any]
+                    while len(batch) < self.batch_size:
+                        try:
+                            batch.append(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+
+                    for item in batch:
+                        if item is _STOP:
+                            stop = True
+                        elif item is _FLUSH:
+                            with self._flushed:
+                                self._wakeup_queued = False
+                        else:
+                            if writer is None:
+                                if self._fieldnames is None:
+                                    self._fieldnames = list(item.keys())
+                                writer = csv.DictWriter(
+                                    fh,
+                                    fieldnames=self._fieldnames,
+                                    restval="",
+                                    extrasaction="ignore",
+                                )
+                                if self.encoding == DELTA:
+                                    encoder = DeltaEncoder(
+                                        self._fieldnames, self.episode_column
+                                    )
+                                    if write_header:
+                                        fh.write(DELTA_MARKER + "\r\n")
+                                if write_header:
+                                    writer.writeheader()
+                            if encoder is not None:
+                                item = encoder.encode(item)
+                            writer.writerow(item)
+                            self._written += 1
+                        self._queue.task_done()
+
+                    with self._flushed:
+                        target = self._flush_target
+                    # rows leave the queue in order, so once this many are
+                    # written or evicted every row up to the target is written
+                    done = self._written + self._evicted >= target
+                    if stop or (target > self._flushed_rows and done):
+                        fh.flush()
+                        if self.fsync:
+                            os.fsync(fh.fileno())
+                        self._mark_flushed(target)
+        except BaseException as err:
+            self._writer_error = err
+            raise
+        finally:
+            with self._flushed:
+                self._flushed.notify_all()
+
+    def _mark_flushed(self, rows: int) -> None:
+        with self._flushed:
+            self._flushed_rows = max(self._flushed_rows, rows)
+            self._flushed.notify_all()
@@ -0,0 +1,58 @@
+"""
+Benchmark BatchCartPole against stepping CartPole models one by one.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmark.py --sizes 1 100 10000 --seconds 2
+
+Reports cart-steps per second, i.e. carts x steps advanced per wall second.
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from sim.cartpole import BatchCartPole, CartPole
+
+
+def run_scalar(n, seconds):
+    carts = [CartPole() for _ in range(n)]
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for model in carts:
+            model.step(random.choice((-1, 1)))
+            model.state
+        steps += 1
+    return n * steps / (time.perf_counter() - start)
+
+
+def run_batch(n, seconds):
+    batch = BatchCartPole(n, seed=0)
+    commands = np.array([-1.0, 1.0])
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        batch.step(batch.rng.choice(commands, n))
+        batch.state
+        steps += 1
+    return n * steps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print("{:>8} {:>18} {:>18} {:>9}".format("N", "CartPole steps/s", "Batch steps/s", "speedup"))
+    for n in args.sizes:
+        scalar = run_scalar(n, args.seconds)
+        batch = run_batch(n, args.seconds)
+        print("{:>8} {:>18,.0f} {:>18,.0f} {:>8.1f}x".format(n, scalar, batch, batch / scalar))
+
+
+if __name__ == "__main__":
+    main()
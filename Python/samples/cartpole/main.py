@@ -10,16 +10,16 @@ Usage:
     Then connect your registered simulator to a Brain via UI, or using the CLI: `bonsai simulator unmanaged connect -b <brain-name> -a <train-or-assess> -c BalancePole --simulator-name Cartpole
 """
 
+import contextlib
 import datetime
 import json
+import math
 import os
 import pathlib
 import random
 import sys
 import time
-import numpy as np
 from typing import Dict, Union
-from scipy.stats import truncnorm
 
 from dotenv import load_dotenv, set_key
 from microsoft_bonsai_api.simulator.client import BonsaiClient, BonsaiClientConfig
@@ -62,6 +62,11 @@ class TemplateSimulatorSession:
         env_name: str = "Cartpole",
         log_data: bool = False,
         log_file_name: str = None,
+        log_async: bool = False,
+        log_rotate_mb: float = None,
+        log_rotate_episodes: int = None,
+        log_delta: bool = False,
+        snapshot_cache: bool = False,
     ):
         """Simulator Interface with the Bonsai Platform
 
@@ -75,6 +80,22 @@ class TemplateSimulatorSession:
             Whether to log data, by default False
         log_file_name : str, optional
             where to log data, by default None. If not specified, will generate a name.
+        log_async : bool, optional
+            Whether to hand log rows to a background writer thread instead of
+            writing them on the stepping thread, by default False
+        log_rotate_mb : float, optional
+            Start a new, compressed log segment every this many megabytes
+        log_rotate_episodes : int, optional
+            Start a new, compressed log segment every this many episodes.
+            Either rotation option replaces the single log file (and log_async)
+            with segments listed in a manifest next to it.
+        log_delta : bool, optional
+            Leave cells that repeat the row above empty (delta encoding), by
+            default False. Implies log_async unless rotating.
+        snapshot_cache : bool, optional
+            Restore the state after a reset from a cache keyed by the episode
+            config, instead of resetting again, when a config repeats. By
+            default False.
         """
         self.simulator = cartpole.CartPole()
         self.count_view = False
@@ -87,6 +108,31 @@ class TemplateSimulatorSession:
 
         self.log_full_path = os.path.join(LOG_PATH, log_file_name)
         ensure_log_dir(self.log_full_path)
+        self.log_sink = None
+        if log_data and (log_rotate_mb or log_rotate_episodes):
+            from microsoft_bonsai_api.simulator.trajectory import RotatingTrajectoryLog
+
+            self.log_sink = RotatingTrajectoryLog(
+                LOG_PATH,
+                prefix=os.path.splitext(log_file_name)[0],
+                max_bytes=int(log_rotate_mb * 1e6) if log_rotate_mb else None,
+                max_episodes=log_rotate_episodes,
+                encoding="delta" if log_delta else "plain",
+            )
+        elif log_data and (log_async or log_delta):
+            from microsoft_bonsai_api.simulator.trajectory import AsyncTrajectorySink
+
+            # append like the synchronous logger, which never truncates
+            self.log_sink = AsyncTrajectorySink(
+                self.log_full_path,
+                append=True,
+                encoding="delta" if log_delta else "plain",
+            )
+        self.snapshot_cache = None
+        if snapshot_cache:
+            from microsoft_bonsai_api.simulator.snapshot import SnapshotCache
+
+            self.snapshot_cache = SnapshotCache()
 
     def get_state(self) -> Dict[str, float]:
         """Extract current states from the simulator
@@ -134,7 +180,11 @@ class TemplateSimulatorSession:
         # Keep the config around so we can log it later
         self.config = config
 
-        self.simulator.reset(**config)
+        cache = self.snapshot_cache
+        if cache is None or not cache.restore(self.simulator, config):
+            self.simulator.reset(**config)
+            if cache is not None:
+                cache.save(self.simulator, config)
 
     def log_iterations(
         self,
@@ -155,8 +205,6 @@ class TemplateSimulatorSession:
         sim_speed_delay : float, optional
         """
 
-        import pandas as pd
-
         def add_prefixes(d, prefix: str):
             return {f"{prefix}_{k}": v for k, v in d.items()}
 
@@ -167,6 +215,13 @@ class TemplateSimulatorSession:
         data["episode"] = episode
         data["iteration"] = iteration
         data["sim_speed_delay"] = sim_speed_delay
+
+        if self.log_sink is not None:
+            self.log_sink.log(data)
+            return
+
+        import pandas as pd
+
         log_df = pd.DataFrame(data, index=[0])
 
         if os.path.exists(self.log_full_path):
@@ -178,6 +233,18 @@ class TemplateSimulatorSession:
                 path_or_buf=self.log_full_path, mode="w", header=True, index=False
             )
 
+    def episode_finish(self):
+        """Flush pending log rows at the end of an episode."""
+        if self.log_sink is not None:
+            self.log_sink.episode_finish()
+
+    def close(self):
+        """Write out any pending log rows and stop the renderer."""
+        if self.log_sink is not None:
+            self.log_sink.close()
+        if self.count_view:
+            self.viewer.close()
+
     def episode_step(self, action: Dict):
         """Step through the environment for a single iteration.
 
@@ -192,14 +259,21 @@ class TemplateSimulatorSession:
 
     def sim_render(self):
         from sim import render
+        from microsoft_bonsai_api.simulator.render_process import RenderProcess
 
         if self.count_view == False:
-            self.viewer = render.Viewer()
-            self.viewer.model = self.simulator
+            # draw in another process, so stepping is not held back by the display
+            self.viewer = RenderProcess(
+                render.CartPoleRenderer, len(render.CartPoleRenderer.FIELDS), feedback=1
+            )
             self.count_view = True
 
-        self.viewer.update()
-        if self.viewer.has_exit:
+        target = self.viewer.feedback[0]
+        if not math.isnan(target):
+            self.simulator._target_pole_position = float(target)
+            self.viewer.feedback[0] = math.nan
+        self.viewer.publish(render.CartPoleRenderer.snapshot(self.simulator))
+        if self.viewer.closed:
             sys.exit(0)
 
 
@@ -241,6 +315,7 @@ def test_policy(
     log_iterations: bool = False,
     policy=random_policy,
     policy_name: str = "random",
+    snapshot_cache: bool = False,
 ):
     """Test a policy using random actions over a fixed number of episodes
 
@@ -248,12 +323,17 @@ def test_policy(
     ----------
     num_episodes : int, optional
         number of iterations to run, by default 10
+    snapshot_cache : bool, optional
+        restore cached post-reset states for repeated episode configs
     """
 
     current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
     log_file_name = current_time + "_" + policy_name + "_log.csv"
     sim = TemplateSimulatorSession(
-        render=render, log_data=log_iterations, log_file_name=log_file_name
+        render=render,
+        log_data=log_iterations,
+        log_file_name=log_file_name,
+        snapshot_cache=snapshot_cache,
     )
     # test_config = {"length": 1.5}
     for episode in range(num_episodes):
@@ -281,9 +361,18 @@ def main(
     render: bool = False,
     simulator_name: str = "Cartpole",
     log_iterations: bool = False,
+    log_async: bool = False,
+    log_rotate_mb: float = None,
+    log_rotate_episodes: int = None,
+    log_delta: bool = False,
+    snapshot_cache: bool = False,
     config_setup: bool = False,
     sim_speed: int = 0,
     sim_speed_variance: int = 0,
+    sim_speed_distribution: str = "truncnorm",
+    keep_alive: bool = False,
+    gc_policy: bool = False,
+    recycle_rss_mb: float = None,
     env_file: Union[str, bool] = ".env",
     workspace: str = None,
     accesskey: str = None,
@@ -296,12 +385,34 @@ def main(
         visualize steps in environment, by default True, by default False
     log_iterations: bool, optional
         log iterations during training to a CSV file
+    log_async: bool, optional
+        write logged iterations from a background thread
+    log_rotate_mb: float, optional
+        rotate and compress the iteration log every this many megabytes
+    log_rotate_episodes: int, optional
+        rotate and compress the iteration log every this many episodes
+    log_delta: bool, optional
+        delta-encode the iteration log, leaving repeated cells empty
+    snapshot_cache: bool, optional
+        restore cached post-reset states for repeated episode configs
     config_setup: bool, optional
         if enabled then uses a local `.env` file to find sim workspace id and access_key
     sim_speed: int, optional
         the average delay to use, default = 0
     sim_speed_variance: int, optional
         the variance for sim delay
+    sim_speed_distribution: str, optional
+        distribution of the sim delay when sim_speed_variance is set, one of
+        microsoft_bonsai_api.simulator.latency.DISTRIBUTIONS
+    keep_alive: bool, optional
+        run steps on a worker thread and resend the last state while they run,
+        so steps longer than the interface timeout keep the session
+    gc_policy: bool, optional
+        freeze start-up objects and collect garbage between episodes instead
+        of during them, reporting step latency at the end of each episode
+    recycle_rss_mb: float, optional
+        with gc_policy, restart the process at the end of an episode once its
+        RSS exceeds this many megabytes
     env_file: str, optional
         if config_setup True, then where the environment variable for lookup exists
     workspace: str, optional
@@ -345,7 +456,16 @@ def main(
             )
 
     # Grab standardized way to interact with sim API
-    sim = TemplateSimulatorSession(render=render, log_data=log_iterations, env_name=simulator_name)
+    sim = TemplateSimulatorSession(
+        render=render,
+        log_data=log_iterations,
+        log_async=log_async,
+        log_rotate_mb=log_rotate_mb,
+        log_rotate_episodes=log_rotate_episodes,
+        log_delta=log_delta,
+        snapshot_cache=snapshot_cache,
+        env_name=simulator_name,
+    )
 
     # Configure client to interact with Bonsai service
     config_client = BonsaiClientConfig()
@@ -394,117 +514,180 @@ def main(
             )
             raise ex
 
+    keepalive = None
+    if keep_alive:
+        from microsoft_bonsai_api.simulator.keepalive import (
+            KeepAlive,
+            heartbeat_interval,
+        )
+
+        keepalive = KeepAlive(
+            client,
+            config_client.workspace,
+            interval=heartbeat_interval(interface["timeout"]),
+        )
+
+    latency = None
+    if sim_speed > 0:
+        # delays are sampled in blocks, so stepping only indexes the schedule
+        from microsoft_bonsai_api.simulator.latency import LatencyInjector
+
+        latency = LatencyInjector(
+            sim_speed,
+            sim_speed_variance,
+            distribution=sim_speed_distribution if sim_speed_variance > 0 else "constant",
+        )
+
+    def step(action):
+        delay = latency.sleep() if latency else 0.0
+        sim.episode_step(action)
+        return delay
+
     registered_session, sequence_id = CreateSession(registration_info, config_client)
     episode = 0
+
+    policy = None
+    if gc_policy:
+        from microsoft_bonsai_api.simulator.gc_policy import GCPolicy, recycle_process
+
+        policy = GCPolicy(rss_limit_mb=recycle_rss_mb)
+        policy.after_registration()
     iteration = 0
+    # reply to a keep-alive heartbeat, handled instead of the next advance
+    next_event = None
 
     try:
-        while True:
-            # Proceed to the next event by calling the advance function and passing the simulation state
-            # resulting from the previous event. Note that the sim must always be able to return a valid
-            # structure from get_state, including the first time advance is called, before an EpisodeStart
-            # message has been received.
-            sim_state = SimulatorState(
-                sequence_id=sequence_id, state=sim.get_state(), halted=sim.halted(),
-            )
-            try:
-                event = client.session.advance(
-                    workspace_name=config_client.workspace,
-                    session_id=registered_session.session_id,
-                    body=sim_state,
-                )
-                sequence_id = event.sequence_id
-                print(
-                    "[{}] Last Event: {}".format(time.strftime("%H:%M:%S"), event.type)
-                )
-            except HttpResponseError as ex:
-                print(
-                    "HttpResponseError in Advance: StatusCode: {}, Error: {}, Exception: {}".format(
-                        ex.status_code, ex.error.message, ex
+        with contextlib.ExitStack() as stack:
+            if keepalive:
+                # closed with the loop, so its worker thread does not outlive it
+                stack.enter_context(keepalive)
+            while True:
+                if next_event is not None:
+                    event, next_event = next_event, None
+                    sequence_id = event.sequence_id
+                    print(
+                        "[{}] Event during step: {}".format(time.strftime("%H:%M:%S"), event.type)
                     )
-                )
-                # This can happen in network connectivity issue, though SDK has retry logic, but even after that request may fail,
-                # if your network has some issue, or sim session at platform is going away..
-                # So let's re-register sim-session and get a new session and continue iterating. :-)
-                registered_session, sequence_id = CreateSession(
-                    registration_info, config_client
-                )
-                continue
-            except Exception as err:
-                print("Unexpected error in Advance: {}".format(err))
-                # Ideally this shouldn't happen, but for very long-running sims It can happen with various reasons, let's re-register sim & Move on.
-                # If possible try to notify Bonsai team to see, if this is platform issue and can be fixed.
-                registered_session, sequence_id = CreateSession(
-                    registration_info, config_client
-                )
-                continue
-
-            # Event loop
-            if event.type == "Idle":
-                time.sleep(event.idle.callback_time)
-                print("Idling...")
-            elif event.type == "EpisodeStart":
-                print(event.episode_start.config)
-                sim.episode_start(event.episode_start.config)
-                episode += 1
-            elif event.type == "EpisodeStep":
-                # Simulate the next state transition using the value of event.episode_step.action.
-                # This updates the simulation state, which will be sent back in the next loop when
-                # client.session.advance is called.
-                iteration += 1
-                delay = 0.0
-                if sim_speed > 0:
-                    if (
-                        sim_speed_variance > 0
-                    ):  # stochastic delay, truncated normal distribution
-                        mu = sim_speed
-                        sigma = sim_speed_variance
-                        lower = np.max(
-                            [0, sim_speed - 3 * sim_speed_variance]
-                        )  # truncating at min +/- 3*variance
-                        upper = sim_speed + 3 * sim_speed_variance
-                        delay = truncnorm.rvs(
-                            (lower - mu) / sigma,
-                            (upper - mu) / sigma,
-                            loc=mu,
-                            scale=sigma,
+                else:
+                    # Proceed to the next event by calling the advance function and passing the simulation state
+                    # resulting from the previous event. Note that the sim must always be able to return a valid
+                    # structure from get_state, including the first time advance is called, before an EpisodeStart
+                    # message has been received.
+                    sim_state = SimulatorState(
+                        sequence_id=sequence_id, state=sim.get_state(), halted=sim.halted(),
+                    )
+                    try:
+                        event = client.session.advance(
+                            workspace_name=config_client.workspace,
+                            session_id=registered_session.session_id,
+                            body=sim_state,
+                        )
+                        sequence_id = event.sequence_id
+                        print(
+                            "[{}] Last Event: {}".format(time.strftime("%H:%M:%S"), event.type)
+                        )
+                    except HttpResponseError as ex:
+                        print(
+                            "HttpResponseError in Advance: StatusCode: {}, Error: {}, Exception: {}".format(
+                                ex.status_code, ex.error.message, ex
+                            )
+                        )
+                        # This can happen in network connectivity issue, though SDK has retry logic, but even after that request may fail,
+                        # if your network has some issue, or sim session at platform is going away..
+                        # So let's re-register sim-session and get a new session and continue iterating. :-)
+                        registered_session, sequence_id = CreateSession(
+                            registration_info, config_client
+                        )
+                        continue
+                    except Exception as err:
+                        print("Unexpected error in Advance: {}".format(err))
+                        # Ideally this shouldn't happen, but for very long-running sims It can happen with various reasons, let's re-register sim & Move on.
+                        # If possible try to notify Bonsai team to see, if this is platform issue and can be fixed.
+                        registered_session, sequence_id = CreateSession(
+                            registration_info, config_client
+                        )
+                        continue
+
+                if policy:
+                    policy.on_event(event.type)
+
+                # Event loop
+                if event.type == "Idle":
+                    time.sleep(event.idle.callback_time)
+                    print("Idling...")
+                elif event.type == "EpisodeStart":
+                    print(event.episode_start.config)
+                    sim.episode_start(event.episode_start.config)
+                    episode += 1
+                elif event.type == "EpisodeStep":
+                    # Simulate the next state transition using the value of event.episode_step.action.
+                    # This updates the simulation state, which will be sent back in the next loop when
+                    # client.session.advance is called.
+                    iteration += 1
+                    step_start = time.perf_counter()
+                    if keepalive:
+                        # step on a worker thread, resending sim_state meanwhile
+                        delay, interrupt = keepalive.run(
+                            partial(step, event.episode_step.action),
+                            registered_session.session_id,
+                            sim_state,
+                            event,
+                        )
+                        # the platform moved on during the step (Unregister,
+                        # EpisodeFinish, EpisodeStart, ...): handle that event
+                        # next instead of advancing with the stepped state
+                        next_event = interrupt
+                    else:
+                        delay = step(event.episode_step.action)
+                    if sim.log_data:
+                        sim.log_iterations(
+                            episode=episode,
+                            iteration=iteration,
+                            state=sim.get_state(),
+                            action=event.episode_step.action,
+                            sim_speed_delay=delay,
+                        )
+                    if policy:
+                        policy.record_step(time.perf_counter() - step_start)
+                elif event.type == "EpisodeFinish":
+                    print("Episode Finishing...")
+                    sim.episode_finish()
+                    if latency:
+                        print("sim delay: {count} steps, mean {mean:.3f}s".format(**latency.stats()))
+                    iteration = 0
+                    if policy:
+                        print(
+                            "step latency: p50 {p50_ms:.3f}ms, p99 {p99_ms:.3f}ms, max {max_ms:.3f}ms, RSS {rss_mb:.0f}MB".format(
+                                **policy.report()
+                            )
+                        )
+                        if policy.should_recycle():
+                            print("RSS above {}MB, restarting the simulator process".format(recycle_rss_mb))
+                            client.session.delete(
+                                workspace_name=config_client.workspace,
+                                session_id=registered_session.session_id,
+                            )
+                            sim.close()
+                            recycle_process()
+                elif event.type == "Unregister":
+                    print(
+                        "Simulator Session unregistered by platform because '{}', Registering again!".format(
+                            event.unregister.details
                         )
-                        print("stochastic sim delay: {}s".format(delay))
-                        time.sleep(delay)
-                    else:  # fixed delay
-                        delay = sim_speed
-                        print("sim delay: {}s".format(delay))
-                        time.sleep(delay)
-                sim.episode_step(event.episode_step.action)
-                if sim.log_data:
-                    sim.log_iterations(
-                        episode=episode,
-                        iteration=iteration,
-                        state=sim.get_state(),
-                        action=event.episode_step.action,
-                        sim_speed_delay=delay,
                     )
-            elif event.type == "EpisodeFinish":
-                print("Episode Finishing...")
-                iteration = 0
-            elif event.type == "Unregister":
-                print(
-                    "Simulator Session unregistered by platform because '{}', Registering again!".format(
-                        event.unregister.details
+                    registered_session, sequence_id = CreateSession(
+                        registration_info, config_client
                     )
-                )
-                registered_session, sequence_id = CreateSession(
-                    registration_info, config_client
-                )
-                continue
-            else:
-                pass
+                    continue
+                else:
+                    pass
     except KeyboardInterrupt:
         # Gracefully unregister with keyboard interrupt
         client.session.delete(
             workspace_name=config_client.workspace,
             session_id=registered_session.session_id,
         )
+        sim.close()
         print("Unregistered simulator.")
     except Exception as err:
         # Gracefully unregister for any other exceptions
@@ -512,6 +695,7 @@ def main(
             workspace_name=config_client.workspace,
             session_id=registered_session.session_id,
         )
+        sim.close()
         print("Unregistered simulator because: {}".format(err))
 
 
@@ -529,6 +713,38 @@ if __name__ == "__main__":
         default=False,
         help="Log iterations during training",
     )
+    parser.add_argument(
+        "--log-async",
+        action="store_true",
+        default=False,
+        help="Write logged iterations from a background thread",
+    )
+    parser.add_argument(
+        "--log-rotate-mb",
+        type=float,
+        metavar="MEGABYTES",
+        default=None,
+        help="Rotate and compress the iteration log every MEGABYTES",
+    )
+    parser.add_argument(
+        "--log-rotate-episodes",
+        type=int,
+        metavar="EPISODES",
+        default=None,
+        help="Rotate and compress the iteration log every EPISODES episodes",
+    )
+    parser.add_argument(
+        "--log-delta",
+        action="store_true",
+        default=False,
+        help="Delta-encode the iteration log (repeated cells are left empty)",
+    )
+    parser.add_argument(
+        "--snapshot-cache",
+        action="store_true",
+        default=False,
+        help="Restore cached post-reset states when an episode config repeats",
+    )
     parser.add_argument(
         "--sim-name",
         type=str,
@@ -603,11 +819,43 @@ if __name__ == "__main__":
         default=0,
     )
 
+    parser.add_argument(
+        "--sim-speed-distribution",
+        choices=["truncnorm", "uniform", "lognormal", "exponential"],
+        help="distribution of the emulated sim speed when --sim-speed-variance is set",
+        default="truncnorm",
+    )
+
+    parser.add_argument(
+        "--keep-alive",
+        action="store_true",
+        default=False,
+        help="Keep the session registered during steps longer than its timeout",
+    )
+
+    parser.add_argument(
+        "--gc-policy",
+        action="store_true",
+        default=False,
+        help="Collect garbage between episodes and report step latency",
+    )
+
+    parser.add_argument(
+        "--recycle-rss-mb",
+        type=float,
+        metavar="MEGABYTES",
+        help="With --gc-policy, restart the sim process past this RSS",
+        default=None,
+    )
+
     args, _ = parser.parse_known_args()
 
     if args.test_random:
         test_policy(
-            render=args.render, log_iterations=args.log_iterations, policy=random_policy
+            render=args.render,
+            log_iterations=args.log_iterations,
+            policy=random_policy,
+            snapshot_cache=args.snapshot_cache,
         )
     elif args.test_exported:
         port = args.test_exported
@@ -620,6 +868,7 @@ if __name__ == "__main__":
             policy=trained_brain_policy,
             policy_name="exported",
             num_iterations=args.iteration_limit,
+            snapshot_cache=args.snapshot_cache,
         )
     else:
         main(
@@ -627,8 +876,17 @@ if __name__ == "__main__":
             simulator_name=args.sim_name,
             render=args.render,
             log_iterations=args.log_iterations,
+            log_async=args.log_async,
+            log_rotate_mb=args.log_rotate_mb,
+            log_rotate_episodes=args.log_rotate_episodes,
+            log_delta=args.log_delta,
+            snapshot_cache=args.snapshot_cache,
             sim_speed=args.sim_speed,
             sim_speed_variance=args.sim_speed_variance,
+            sim_speed_distribution=args.sim_speed_distribution,
+            keep_alive=args.keep_alive,
+            gc_policy=args.gc_policy,
+            recycle_rss_mb=args.recycle_rss_mb,
             env_file=args.env_file,
             workspace=args.workspace,
             accesskey=args.accesskey,
@@ -7,6 +7,8 @@ import math
 import random
 from collections import namedtuple
 
+import numpy as np
+
 
 # Constants that we might want to let people change
 DEFAULT_CART_MASS = 0.31  # kg
@@ -142,6 +144,160 @@ class CartPole:
             "pole_length": self._pole_length,
         }
 
+    def snapshot(self):
+        """Copy of the current state, for restore()."""
+        # all floats, so a shallow copy is independent of later steps
+        return dict(vars(self))
+
+    def restore(self, snapshot):
+        """Return to a state saved by snapshot()."""
+        vars(self).update(snapshot)
+
+
+class BatchCartPole:
+    """
+    N independent carts stepped together with one vectorized update.
+
+    Every state variable and parameter is a NumPy array of shape (N,), so
+    carts may have their own masses, pole lengths and force noise. The
+    dynamics are the same as `CartPole.step`, operation for operation.
+    """
+
+    _STATE_FIELDS = (
+        "cart_position",
+        "cart_velocity",
+        "pole_angle",
+        "pole_angular_velocity",
+        "pole_center_position",
+        "pole_center_velocity",
+        "target_pole_position",
+        "cart_mass",
+        "pole_mass",
+        "pole_length",
+    )
+
+    def __init__(self, n: int, seed=None):
+        if n <= 0:
+            raise ValueError("BatchCartPole needs at least one cart.")
+        self.n = n
+        self.x_threshold = TRACK_WIDTH / 2
+        self.rng = np.random.default_rng(seed)
+
+        self._cart_mass = np.full(n, DEFAULT_CART_MASS)
+        self._pole_mass = np.full(n, DEFAULT_POLE_MASS)
+        self._pole_length = np.full(n, DEFAULT_POLE_LENGTH)
+        self._force_noise = np.full(n, FORCE_NOISE)
+        self._cart_position = np.zeros(n)
+        self._cart_velocity = np.zeros(n)
+        self._pole_angle = np.zeros(n)
+        self._pole_angular_velocity = np.zeros(n)
+        self._target_pole_position = np.zeros(n)
+        self.reset(
+            initial_pole_angle=self.rng.uniform(-0.05, 0.05, n),
+            initial_angular_velocity=self.rng.uniform(-0.05, 0.05, n),
+        )
+
+    def reset(
+        self,
+        cart_mass=DEFAULT_CART_MASS,
+        pole_mass=DEFAULT_POLE_MASS,
+        pole_length=DEFAULT_POLE_LENGTH,
+        initial_cart_position=0,
+        initial_cart_velocity=0,
+        initial_pole_angle=0,
+        initial_angular_velocity=0,
+        target_pole_position=0,
+        force_noise=FORCE_NOISE,
+        index=None,
+    ):
+        """
+        Reset all carts, or only those selected by `index`.
+
+        Args:
+            every parameter of `CartPole.reset`, as a scalar or an array with
+                one value per selected cart.
+            force_noise: half-width of the uniform noise added to the force.
+            index: integer indices or boolean mask of the carts to reset,
+                by default all of them.
+        """
+        selected = np.arange(self.n) if index is None else np.arange(self.n)[index]
+
+        def assign(name, value):
+            # copy so arrays already handed out through `state` stay intact
+            array = getattr(self, name).copy()
+            array[selected] = value
+            setattr(self, name, array)
+
+        assign("_cart_mass", cart_mass)
+        assign("_pole_mass", pole_mass)
+        assign("_pole_length", pole_length)
+        assign("_force_noise", force_noise)
+        assign("_cart_position", initial_cart_position)
+        assign("_cart_velocity", initial_cart_velocity)
+        assign("_pole_angle", normalize_angle(np.asarray(initial_pole_angle, float)))
+        assign("_pole_angular_velocity", initial_angular_velocity)
+        assign("_target_pole_position", target_pole_position)
+        self._update_pole_center_state()
+
+    def _update_pole_center_state(self):
+        pole_half_length = self._pole_length / 2
+        self._pole_center_position = (
+            self._cart_position + np.sin(self._pole_angle) * pole_half_length
+        )
+        self._pole_center_velocity = (
+            self._cart_velocity
+            + np.sin(self._pole_angular_velocity) * pole_half_length
+        )
+
+    def step(self, action, noise=None):
+        """
+        Move every cart forward one time unit.
+
+        Args:
+            action: command between -1 and 1, a scalar or one per cart.
+            noise: force noise to use instead of sampling it, one per cart.
+        """
+        if noise is None:
+            noise = self.rng.uniform(-1.0, 1.0, self.n) * self._force_noise
+        force = FORCE_MAG * (action + noise)
+
+        total_mass = self._cart_mass + self._pole_mass
+        pole_half_length = self._pole_length / 2
+        pole_mass_length = self._pole_mass * pole_half_length
+
+        cosTheta = np.cos(self._pole_angle)
+        sinTheta = np.sin(self._pole_angle)
+
+        temp = (
+            force + pole_mass_length * self._pole_angular_velocity ** 2 * sinTheta
+        ) / total_mass
+        angularAccel = (GRAVITY * sinTheta - cosTheta * temp) / (
+            pole_half_length
+            * (4.0 / 3.0 - (self._pole_mass * cosTheta ** 2) / total_mass)
+        )
+        linearAccel = temp - (pole_mass_length * angularAccel * cosTheta) / total_mass
+
+        self._cart_position = self._cart_position + STEP_DURATION * self._cart_velocity
+        self._cart_velocity = self._cart_velocity + STEP_DURATION * linearAccel
+
+        self._pole_angle = normalize_angle(
+            self._pole_angle + STEP_DURATION * self._pole_angular_velocity
+        )
+        self._pole_angular_velocity = (
+            self._pole_angular_velocity + STEP_DURATION * angularAccel
+        )
+
+        self._update_pole_center_state()
+
+    @property
+    def state(self):
+        """Dict of (N,) arrays with the same keys as `CartPole.state`."""
+        return {name: getattr(self, "_" + name) for name in self._STATE_FIELDS}
+
+    def cart(self, i: int):
+        """State of cart `i` as plain floats, like `CartPole.state`."""
+        return {name: float(getattr(self, "_" + name)[i]) for name in self._STATE_FIELDS}
+
 
 def create_viewer(model):
     from render import Viewer
@@ -5,6 +5,8 @@ permalink: https://perma.cc/C9ZM-652R
 """
 
 import math
+import types
+
 import pyglet
 from pyglet.gl import (gl, glBegin, glBlendFunc, glClearColor, glColor4f, 
                        glEnable, glEnd, glLineWidth, glPopMatrix, glPushMatrix, 
@@ -96,6 +98,8 @@ class Viewer(pyglet.window.Window):
         super().__init__(width=width, height=height, display=display)
         
         self.model = None
+        # set by CartPoleRenderer: clicks are sent back to the sim process
+        self.feedback = None
 
         glEnable(GL_BLEND)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
@@ -132,4 +136,40 @@ class Viewer(pyglet.window.Window):
         world_width = self.model.x_threshold*2
         scale = world_width / self.width
         click_position = x * scale - self.model.x_threshold
-        self.model._target_pole_position = click_position
\ No newline at end of file
+        self.model._target_pole_position = click_position
+        if self.feedback is not None:
+            self.feedback[0] = click_position
+
+
+class CartPoleRenderer:
+    """Draws cart-pole snapshots in a `RenderProcess`.
+
+    The snapshot holds the `FIELDS` of a CartPole model; the target position
+    chosen by a mouse click is written to `feedback[0]`.
+    """
+
+    FIELDS = (
+        "_cart_position",
+        "_pole_angle",
+        "_pole_length",
+        "_target_pole_position",
+        "x_threshold",
+    )
+
+    def __init__(self, feedback):
+        self.viewer = Viewer()
+        self.viewer.model = types.SimpleNamespace(**{f: 0.0 for f in self.FIELDS})
+        self.viewer.model.x_threshold = 1.0
+        self.viewer.feedback = feedback
+
+    @classmethod
+    def snapshot(cls, model):
+        return [getattr(model, field) for field in cls.FIELDS]
+
+    def draw(self, snapshot):
+        for field, value in zip(self.FIELDS, snapshot):
+            setattr(self.viewer.model, field, float(value))
+
+    def poll(self):
+        self.viewer.update()
+        return not self.viewer.has_exit
\ No newline at end of file
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+import pytest
+
+from sim import cartpole
+from sim.cartpole import BatchCartPole, CartPole
+
+configs = [
+    {"cart_mass": 0.31, "pole_length": 0.4, "initial_pole_angle": 0.03},
+    {"cart_mass": 0.6, "pole_length": 0.8, "initial_cart_velocity": -0.2},
+    {"cart_mass": 0.2, "pole_mass": 0.1, "initial_angular_velocity": 0.04},
+]
+
+
+def test_matches_scalar_model(monkeypatch):
+    rng = np.random.default_rng(0)
+    steps = 300
+    noise = rng.uniform(-0.02, 0.02, (steps, len(configs)))
+    actions = rng.choice([-1.0, 1.0], (steps, len(configs)))
+
+    defaults = {
+        "cart_mass": cartpole.DEFAULT_CART_MASS,
+        "pole_mass": cartpole.DEFAULT_POLE_MASS,
+        "pole_length": cartpole.DEFAULT_POLE_LENGTH,
+        "initial_cart_velocity": 0,
+        "initial_pole_angle": 0,
+        "initial_angular_velocity": 0,
+    }
+    batch = BatchCartPole(len(configs))
+    batch.reset(**{k: [c.get(k, v) for c in configs] for k, v in defaults.items()})
+    carts = []
+    for config in configs:
+        model = CartPole()
+        model.reset(**config)
+        carts.append(model)
+
+    for t in range(steps):
+        batch.step(actions[t], noise=noise[t])
+        for i, model in enumerate(carts):
+            monkeypatch.setattr(random, "uniform", lambda a, b: noise[t, i])
+            model.step(actions[t, i])
+
+    for i, model in enumerate(carts):
+        expected = model.state
+        actual = batch.cart(i)
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            assert actual[key] == pytest.approx(expected[key], rel=1e-12, abs=1e-15)
+
+
+def test_partial_reset_and_noise():
+    batch = BatchCartPole(4, seed=1)
+    batch.reset(force_noise=[0.0, 0.0, 0.5, 0.5])
+    before = batch.state["cart_position"]
+    for _ in range(50):
+        batch.step(1.0)
+    velocity = batch.state["cart_velocity"]
+    assert velocity[0] == velocity[1]
+    assert velocity[2] != velocity[3]
+
+    batch.reset(initial_cart_position=0.5, index=[1, 3])
+    position = batch.state["cart_position"]
+    assert position[1] == position[3] == 0.5
+    assert position[0] != 0.5
+    assert (before == 0).all()
@@ -0,0 +1,73 @@
+"""
+Checks that the main loop handles an event received by a keep-alive
+heartbeat, with a stand-in for the platform. Runs locally, no brain needed:
+
+pytest tests/test_keepalive_loop.py
+"""
+
+import time
+from types import SimpleNamespace
+
+import main
+from microsoft_bonsai_api.simulator import keepalive
+
+
+class FakeSessions:
+    """session operations of a BonsaiClient, replying with scripted events"""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.sent = []
+        self.deleted = []
+
+    def create(self, workspace_name, body):
+        return SimpleNamespace(session_id="session")
+
+    def advance(self, workspace_name, session_id, body):
+        self.sent.append(body.sequence_id)
+        if not self.events:
+            raise KeyboardInterrupt
+        return self.events.pop(0)
+
+    def delete(self, workspace_name, session_id):
+        self.deleted.append(session_id)
+
+
+def test_event_received_during_step_is_handled(monkeypatch):
+    sessions = FakeSessions(
+        [
+            SimpleNamespace(type="EpisodeStart", sequence_id=2, episode_start=SimpleNamespace(config={})),
+            SimpleNamespace(type="EpisodeStep", sequence_id=3, episode_step=SimpleNamespace(action={"command": 1})),
+            # reply to the heartbeat sent while that step runs
+            SimpleNamespace(type="EpisodeFinish", sequence_id=4),
+        ]
+    )
+    config = SimpleNamespace(workspace="workspace", server="server", simulator_context=None)
+    monkeypatch.setattr(main, "BonsaiClientConfig", lambda: config)
+    monkeypatch.setattr(main, "BonsaiClient", lambda config: SimpleNamespace(session=sessions))
+    monkeypatch.setattr(keepalive, "heartbeat_interval", lambda timeout: 0.02)
+    monkeypatch.setenv("SIM_WORKSPACE", "workspace")
+    monkeypatch.setenv("SIM_ACCESS_KEY", "key")
+
+    episode_step = main.TemplateSimulatorSession.episode_step
+    finished = []
+    closed = []
+
+    def slow_step(self, action):
+        time.sleep(0.2)
+        episode_step(self, action)
+
+    monkeypatch.setattr(main.TemplateSimulatorSession, "episode_step", slow_step)
+    monkeypatch.setattr(
+        main.TemplateSimulatorSession, "episode_finish", lambda self: finished.append(True)
+    )
+    monkeypatch.setattr(keepalive.KeepAlive, "close", lambda self: closed.append(True))
+
+    main.main(keep_alive=True, workspace="workspace", accesskey="key")
+
+    # the EpisodeFinish is handled without another advance for the step,
+    # and the next state answers it
+    assert sessions.sent == [1, 2, 2, 4]
+    assert finished == [True]
+    assert closed == [True]
+    assert sessions.deleted == ["session"]
@@ -103,6 +103,77 @@ def test_logging():
     os.remove("logs/tmp.csv")
 
 
+def test_async_logging():
+
+    from main import (
+        TemplateSimulatorSession,
+        default_config,
+    )
+
+    sim = TemplateSimulatorSession(
+        render=False, log_data=True, log_async=True, log_file_name="tmp_async.csv"
+    )
+    for episode in range(2):
+        sim.episode_start(config=default_config)
+        for iteration in range(10):
+            action = policies.random_policy(sim.get_state())
+            sim.episode_step(action)
+            sim.log_iterations(sim.get_state(), action, episode, iteration)
+        sim.episode_finish()
+    sim.close()
+
+    assert sim.log_sink.stats()["written"] == 20
+    with open(sim.log_full_path) as fh:
+        assert len(fh.readlines()) == 21
+    os.remove("logs/tmp_async.csv")
+
+
+def test_rotating_logging():
+
+    from main import (
+        TemplateSimulatorSession,
+        default_config,
+    )
+
+    sim = TemplateSimulatorSession(
+        render=False,
+        log_data=True,
+        log_rotate_episodes=1,
+        log_file_name="tmp_rotate.csv",
+    )
+    for episode in range(3):
+        sim.episode_start(config=default_config)
+        for iteration in range(5):
+            action = policies.random_policy(sim.get_state())
+            sim.episode_step(action)
+            sim.log_iterations(sim.get_state(), action, episode, iteration)
+        sim.episode_finish()
+    sim.close()
+
+    segments = sim.log_sink.segments
+    assert [s["rows"] for s in segments] == [5, 5, 5]
+    assert all(s["compressed"] for s in segments)
+    for s in segments:
+        os.remove(os.path.join("logs", s["file"]))
+    os.remove(sim.log_sink.manifest_path)
+
+
+def test_snapshot_cache():
+
+    from main import TemplateSimulatorSession
+
+    sim = TemplateSimulatorSession(render=False, snapshot_cache=True)
+    sim.episode_start(large_config)
+    start_state = sim.get_state()
+    for _ in range(10):
+        sim.episode_step({"command": 1})
+    assert sim.get_state() != start_state
+
+    sim.episode_start(large_config)
+    assert sim.get_state() == start_state
+    assert (sim.snapshot_cache.hits, sim.snapshot_cache.misses) == (1, 1)
+
+
 def test_direction(sim, render: bool = False):
     """Test sim direction when applying constant right force"""
 
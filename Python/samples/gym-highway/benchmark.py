@@ -0,0 +1,54 @@
+"""
+Benchmark episode start latency with and without the environment pool.
+
+Usage:
+    python benchmark.py --episodes 50
+
+Every episode config names the environment, as assessment configs that
+switch environments do. Without reuse each episode start runs gym.make;
+with the pool only the first one does. No connection to the platform is made.
+"""
+
+import argparse
+import statistics
+import time
+
+from microsoft_bonsai_api.simulator.env_pool import EnvPool
+from main import TemplateSimulatorSession
+
+CONFIG = {
+    "env_name": "highway-v0",
+    "controlled_vehicles": 1,
+    "ego_spacing": 2,
+    "vehicles_count": 25,
+    "lanes_count": 4,
+}
+
+
+def episode_start_latency(episodes, reuse):
+    sim = TemplateSimulatorSession(env_pool=EnvPool(reuse=reuse))
+    latencies = []
+    for _ in range(episodes):
+        start = time.perf_counter()
+        sim.episode_start(CONFIG)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--episodes", type=int, default=50)
+    args = parser.parse_args()
+
+    print("{:<10} {:>12} {:>12}".format("", "median ms", "max ms"))
+    for name, reuse in (("gym.make", False), ("pooled", True)):
+        latencies = episode_start_latency(args.episodes, reuse)
+        print(
+            "{:<10} {:>12.2f} {:>12.2f}".format(
+                name, 1e3 * statistics.median(latencies), 1e3 * max(latencies)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -15,18 +15,23 @@ from microsoft_bonsai_api.simulator.generated.models import (
     SimulatorSessionResponse,
 )
 from azure.core.exceptions import HttpResponseError
+from microsoft_bonsai_api.simulator import assessment
 from policies import brain_policy
 import argparse
 import highway_env
 import gym
+import numpy as np
+from microsoft_bonsai_api.simulator.env_pool import EnvPool, scenario_env_names
 
 LOG_PATH = "logs"
 
+# environments used only for their action space
+policy_envs = EnvPool()
+
 
 def random_policy(sim_state):
 
-    env = gym.make("highway-v0")
-    env.reset()
+    env = policy_envs.get("highway-v0")
     return {"steer": env.action_space.sample()}
 
 
@@ -58,6 +63,7 @@ class TemplateSimulatorSession:
         log_file_name: str = None,
         env_name: str = "highway-v0",
         obs_type: str = "Kinematics",
+        env_pool: EnvPool = None,
     ):
         """Template Simulator Session for Highway environments. See API docs for more information: https://highway-env.readthedocs.io/en/latest/index.html
 
@@ -73,10 +79,18 @@ class TemplateSimulatorSession:
             the name of the simulator environment to create, by default "highway-v0"
         obs_type: str, optional
             the type of observations received from simulator. See allowable values: https://highway-env.readthedocs.io/en/latest/observations/index.html
+        env_pool: EnvPool, optional
+            environments reused across episodes, by default a new pool for this session
         """
 
-        self.simulator = gym.make(env_name)
-        self.state = self.simulator.reset().tolist()
+        self.env_pool = env_pool or EnvPool()
+        self.simulator = self.env_pool.get(env_name)
+        # the env is reset at every episode start; until the first one, the
+        # state is all zeros rather than the result of an extra reset
+        self.state = np.zeros(self.simulator.observation_space.shape).tolist()
+        # config of each pooled env as constructed, restored before every
+        # episode so settings of the previous one do not carry over
+        self._default_configs = {}
         self.reward = 0
         self.terminal = False
         self.env_name = env_name
@@ -121,17 +135,19 @@ class TemplateSimulatorSession:
         """
 
         self.config = config
-        # reset the environment if the env_name is in the SimConfig
-        if "env_name" in config.keys():
-            self.simulator = gym.make(config["env_name"])
-            self.state = self.simulator.reset().tolist()
-            self.reward = 0
-            self.terminal = False
+        # switch environments if the env_name is in the SimConfig
+        if config and "env_name" in config.keys():
+            self.simulator = self.env_pool.get(config["env_name"])
             self.env_name = config["env_name"]
 
+        env = self.simulator.unwrapped
+        defaults = self._default_configs.setdefault(self.env_name, dict(env.config))
+        env.config = dict(defaults)
+
         if config:
             for param, value in config.items():
-                self.simulator.config[param] = int(value)
+                if param != "env_name":
+                    self.simulator.config[param] = int(value)
 
         # use OccupancyGrid as default observation view, see allowable values: https://highway-env.readthedocs.io/en/latest/observations/index.html
         # BUG: doesn't appear to work with OccupancyGrid if grid_step not provided: error msg unsupported operand type(s) for /: 'float' and 'NoneType'
@@ -284,6 +300,7 @@ def test_policy(
     sim = TemplateSimulatorSession(
         render=render, log_data=log_iterations, log_file_name=log_file_name
     )
+    sim.env_pool.prewarm(scenario_env_names(scenario_file, default=sim.env_name))
     for episode in range(1, num_episodes):
         iteration = 1
         terminal = False
@@ -372,6 +389,7 @@ def main(
 
     # Grab standardized way to interact with sim API
     sim = TemplateSimulatorSession(render=render, log_data=log_iterations)
+    sim.env_pool.prewarm(scenario_env_names("test_scenarios.json", default=sim.env_name))
 
     # Configure client to interact with Bonsai service
     config_client = BonsaiClientConfig()
@@ -580,12 +598,27 @@ if __name__ == "__main__":
         help="Custom assess config json filename",
     )
 
+    assessment.add_arguments(parser)
+
     args, _ = parser.parse_known_args()
 
     if args.custom_assess:
         scenario_file = args.custom_assess
 
-    if args.test_random:
+    if args.workers and args.test_exported:
+        # the exported brain keeps one memory, reset between episodes, so its
+        # episodes cannot run concurrently
+        parser.error("--workers cannot be used with --test-exported")
+    if args.workers and args.test_random:
+        assessment.main(
+            partial(TemplateSimulatorSession, render=False, log_data=False),
+            random_policy,
+            args.custom_assess or "test_scenarios.json",
+            args.iteration_limit,
+            workers=args.workers,
+            output=args.assess_output,
+        )
+    elif args.test_random:
         test_policy(
             render=args.render, log_iterations=args.log_iterations, policy=random_policy
         )
@@ -5,7 +5,6 @@ Brain states and return Brain actions.
 
 import random
 from typing import Dict
-import requests
 
 
 def coast(state):
@@ -19,8 +18,6 @@ def coast(state):
 def brain_policy(
     state: Dict[str, float], exported_brain_url: str = "http://localhost:5000"
 ):
+    from microsoft_bonsai_api.simulator.exported_brain import shared_client
 
-    prediction_endpoint = f"{exported_brain_url}/v1/prediction"
-    response = requests.get(prediction_endpoint, json=state)
-
-    return response.json()
+    return shared_client(exported_brain_url).predict(state)
@@ -13,16 +13,46 @@ from typing import Any, Dict, Union
 
 from azure.core.exceptions import HttpResponseError
 from dotenv import load_dotenv, set_key
+from microsoft_bonsai_api.simulator import assessment
 from microsoft_bonsai_api.simulator.client import (BonsaiClient,
                                                    BonsaiClientConfig)
 from microsoft_bonsai_api.simulator.generated.models import (
     SimulatorInterface, SimulatorState)
 
-from policies import brain_policy, forget_memory, random_policy
+import numpy as np
+
+from policies import BATCH_POLICIES, brain_policy, forget_memory, random_policy
 from sim import house_simulator
 
 LOG_PATH = "logs"
 
+DEFAULT_CONFIG = {
+    "K": 0.5,
+    "C": 0.3,
+    "Qhvac": 9,
+    "Tin_initial": 25,
+    "Tout_median": 25,
+    "Tout_amplitude": 5,
+    "Tset_start": 25,
+    "Tset_stop": 20,
+    "Tset_transition": 144,
+    "timestep": 5,
+    "horizon": 288,
+}
+
+# config keys used to build a House
+HOUSE_PARAMETERS = (
+    "K",
+    "C",
+    "Qhvac",
+    "Tin_initial",
+    "Tout_median",
+    "Tout_amplitude",
+    "Tset_start",
+    "Tset_stop",
+    "Tset_transition",
+)
+
 def ensure_log_dir(log_full_path):
     """
     Ensure the directory for logs exists — create if needed.
@@ -47,6 +77,7 @@ class TemplateSimulatorSession:
         log_data: bool = False,
         log_file_name: str = None,
         env_name: str = "HouseEnergy",
+        snapshot_cache: bool = False,
     ):
         """Template for simulating sessions with microsoft_bonsai_api
 
@@ -58,26 +89,25 @@ class TemplateSimulatorSession:
             render the current iteration
         env_name: str, optional
             name of simulator environment, registered by SimulatorInterface 
+        snapshot_cache: bool, optional
+            restore the house built for a repeated episode config instead of
+            building it again, by default False
         """
 
         self.modeldir = modeldir
         self.env_name = env_name
-        self.default_config = {
-            "K": 0.5,
-            "C": 0.3,
-            "Qhvac": 9,
-            "Tin_initial": 25,
-            "Tout_median": 25,
-            "Tout_amplitude": 5,
-            "Tset_start": 25,
-            "Tset_stop": 20,
-            "Tset_transition": 144,
-            "timestep": 5,
-            "horizon": 288,
-        }
+        self.default_config = dict(DEFAULT_CONFIG)
+        self.snapshot_cache = None
+        if snapshot_cache:
+            from microsoft_bonsai_api.simulator.snapshot import SnapshotCache
+
+            # about 10 kB per house, room for large assessment files
+            self.snapshot_cache = SnapshotCache(maxsize=1024)
+        self.simulator = None
         self._reset()
         self.terminal = False
         self.render = render
+        self.renderer = None
         self.log_data = log_data
         if not log_file_name:
             current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
@@ -112,18 +142,14 @@ class TemplateSimulatorSession:
         else:
             self.sim_config = self.default_config
 
-        self.simulator = house_simulator.House(
-            K=self.sim_config["K"],
-            C=self.sim_config["C"],
-            Qhvac=self.sim_config["Qhvac"],
-            Tin_initial=self.sim_config["Tin_initial"],
-            Tout_median=self.sim_config["Tout_median"],
-            Tout_amplitude=self.sim_config["Tout_amplitude"],
-            Tset_start=self.sim_config["Tset_start"],
-            Tset_stop=self.sim_config["Tset_stop"],
-            Tset_transition=self.sim_config["Tset_transition"],
-        )
-        self.simulator.build_schedule()
+        cache = self.snapshot_cache
+        if cache is None or not cache.restore(self.simulator, self.sim_config):
+            self.simulator = house_simulator.House(
+                **{key: self.sim_config[key] for key in HOUSE_PARAMETERS}
+            )
+            self.simulator.build_schedule()
+            if cache is not None:
+                cache.save(self.simulator, self.sim_config)
 
     def episode_start(self, config: Dict[str, Any] = None):
         """Method invoked at the start of each episode with a given 
@@ -154,7 +180,16 @@ class TemplateSimulatorSession:
     def sim_render(self):
 
         if self.render:
-            self.simulator.show()
+            # a new House is built every episode, keep one plot window for all
+            if self.renderer is None:
+                self.renderer = house_simulator.HistoryPlot.start(self.simulator)
+            self.simulator.show(self.renderer)
+
+    def close(self):
+        """Stop the plot process, if one was started."""
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
 
     def halted(self) -> bool:
         """Should return True if the simulator cannot continue"""
@@ -223,7 +258,39 @@ class TemplateSimulatorSession:
         else:
             print('Something else went wrong with logs')
             exit()
-            
+
+
+class BatchHouseSession:
+    """Runs many episodes in lockstep on a BatchHouse.
+
+    Batch counterpart of TemplateSimulatorSession for local assessment, with
+    the same states, actions and episode configs.
+    """
+
+    state_fields = ("Tset", "Tin", "Tout", "power")
+    action_fields = ("hvacON",)
+
+    def __init__(self, n: int = 1):
+        self.n = n
+        self.simulator = None
+        self.terminal = None
+
+    def episode_start(self, configs):
+        configs = [{**DEFAULT_CONFIG, **(config or {})} for config in configs]
+        self.simulator = house_simulator.BatchHouse(
+            len(configs),
+            **{key: np.array([c[key] for c in configs]) for key in HOUSE_PARAMETERS},
+        )
+        # houses never end an episode early
+        self.terminal = np.zeros(len(configs), dtype=bool)
+
+    def get_states(self):
+        sim = self.simulator
+        return np.stack([sim.Tset, sim.Tin, sim.Tout, sim.get_Power()], axis=1)
+
+    def episode_step(self, actions):
+        self.simulator.step(actions[:, 0])
+
 def env_setup():
     """Helper function to setup connection with Project Bonsai
 
@@ -261,6 +328,7 @@ def test_policy(
     policy=random_policy,
     policy_name: str = "random",
     scenario_file: str="assess_config.json",
+    snapshot_cache: bool=False,
 ):
     """Test a policy using random actions over a fixed number of episodes
 
@@ -268,6 +336,8 @@ def test_policy(
     ----------
     render : bool, optional
         Flag to turn visualization on
+    snapshot_cache : bool, optional
+        restore cached houses for repeated episode configs
     """
     
     # Use custom assessment scenario configs
@@ -279,7 +349,10 @@ def test_policy(
     current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
     log_file_name = current_time + "_" + policy_name + "_log.csv"
     sim = TemplateSimulatorSession(
-        render=render, log_data=log_iterations, log_file_name=log_file_name
+        render=render,
+        log_data=log_iterations,
+        log_file_name=log_file_name,
+        snapshot_cache=snapshot_cache,
     )
     for episode in range(1, num_episodes):
         iteration = 1
@@ -290,8 +363,7 @@ def test_policy(
         if policy_name != 'random':
             if any('exported_brain_url' in key for key in policy.keywords):
                 # Reset the Memory vector because exported brains don't understand episodes 
-                url = '{}/v1'.format(policy.keywords['exported_brain_url'])
-                forget_memory(url)
+                forget_memory(policy.keywords['exported_brain_url'])
 
         if log_iterations:
             sim.log_iterations(sim_state, {}, episode, iteration)
@@ -317,6 +389,7 @@ def main(
     env_file: Union[str, bool]=".env",
     workspace: str=None,
     accesskey: str=None,
+    snapshot_cache: bool=False,
 ):
     """Main entrypoint for running simulator connections
 
@@ -334,6 +407,8 @@ def main(
         optional flag from CLI for workspace to override
     accesskey: str, optional
         optional flag from CLI for accesskey to override
+    snapshot_cache: bool, optional
+        restore cached houses for repeated episode configs
     """
 
     # check if workspace or access-key passed in CLI
@@ -371,7 +446,9 @@ def main(
             )
 
     # Grab standardized way to interact with sim API
-    sim = TemplateSimulatorSession(render=render, log_data=log_iterations)
+    sim = TemplateSimulatorSession(
+        render=render, log_data=log_iterations, snapshot_cache=snapshot_cache
+    )
 
     # Configure client to interact with Bonsai service
     config_client = BonsaiClientConfig()
@@ -504,6 +581,7 @@ def main(
             workspace_name=config_client.workspace,
             session_id=registered_session.session_id,
         )
+        sim.close()
         print("Unregistered simulator.")
     except Exception as err:
         # Gracefully unregister for any other exceptions
@@ -511,6 +589,7 @@ def main(
             workspace_name=config_client.workspace,
             session_id=registered_session.session_id,
         )
+        sim.close()
         print("Unregistered simulator because: {}".format(err))
 
 if __name__ == "__main__":
@@ -527,6 +606,12 @@ if __name__ == "__main__":
         default=False,
         help="Log iterations during training",
     )
+    parser.add_argument(
+        "--snapshot-cache",
+        action="store_true",
+        default=False,
+        help="Restore cached houses when an episode config repeats",
+    )
     parser.add_argument(
         "--config-setup",
         action="store_true",
@@ -586,15 +671,36 @@ if __name__ == "__main__":
         help="Custom assess config json filename",
     )
 
+    assessment.add_arguments(parser)
+
     args, _ = parser.parse_known_args()
     
     scenario_file = 'assess_config.json'
     if args.custom_assess:
         scenario_file = args.custom_assess
 
-    if args.test_random:
+    if args.workers and args.test_exported:
+        # the exported brain keeps one memory, reset between episodes, so its
+        # episodes cannot run concurrently
+        parser.error("--workers cannot be used with --test-exported")
+    if args.workers and args.test_random:
+        assessment.main(
+            partial(TemplateSimulatorSession, render=False, log_data=False),
+            random_policy,
+            scenario_file,
+            args.iteration_limit,
+            workers=args.workers,
+            output=args.assess_output,
+            make_batch_sim=BatchHouseSession,
+            batch_policies=BATCH_POLICIES,
+        )
+    elif args.test_random:
         test_policy(
-            render=args.render, log_iterations=args.log_iterations, policy=random_policy, scenario_file=scenario_file
+            render=args.render,
+            log_iterations=args.log_iterations,
+            policy=random_policy,
+            scenario_file=scenario_file,
+            snapshot_cache=args.snapshot_cache,
         )
     elif args.test_exported:
         port = args.test_exported
@@ -608,6 +714,7 @@ if __name__ == "__main__":
             policy_name="exported",
             num_iterations=args.iteration_limit,
             scenario_file=scenario_file,
+            snapshot_cache=args.snapshot_cache,
         )
     else:
         main(
@@ -617,4 +724,5 @@ if __name__ == "__main__":
             env_file=args.env_file,
             workspace=args.workspace,
             accesskey=args.accesskey,
+            snapshot_cache=args.snapshot_cache,
         )
@@ -1,5 +1,33 @@
 import numpy as np
-import matplotlib.pyplot as plt
+
+
+class RingBuffer():
+    """Fixed-size history: keeps the last `capacity` rows of `width` floats."""
+
+    def __init__(self, capacity: int, width: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = np.empty((capacity, width))
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def clear(self):
+        self._count = 0
+
+    def append(self, row):
+        self._data[self._count % self.capacity] = row
+        self._count += 1
+
+    def values(self):
+        """Stored rows, oldest first."""
+        if self._count <= self.capacity:
+            return self._data[:self._count]
+        start = self._count % self.capacity
+        return np.concatenate((self._data[start:], self._data[:start]))
+
 
 class House():
     def __init__(self, 
@@ -15,7 +43,8 @@ class House():
                 Tset_stop: int = 20,
                 Tset_transition: float = 144,
                 timestep: float=5, 
-                horizon: float=288,):
+                horizon: float=288,
+                plot_history: int=None,):
 
         self.K = K # thermal conductivity
         self.C = C # thermal capacity
@@ -33,10 +62,13 @@ class House():
         self.Tset_stop = Tset_stop # step temperature set point
         self.Tset_transition = Tset_transition # time (in hours) to switch from day to night Tset
         self.horizon = horizon # length of episode in timestep (default=5min) intervals
-        self.build_schedule()
 
-        plt.close()
-        self.fig, self.ax = plt.subplots(1, 1)
+        # For plotting only: the last `plot_history` steps (default one episode).
+        # matplotlib is not touched until show() is called.
+        self._history = RingBuffer(plot_history or horizon + 1, 4)
+        self.renderer = None
+
+        self.build_schedule()
 
     def build_schedule(self):
         """ define the Tset_schedule, Tout_schedule, the length of schedule, timestep
@@ -54,10 +86,8 @@ class House():
         self.Tout = self.Tout_schedule[0] # Initial outside temperature
 
         # For plotting only
-        self.time_to_plot = [0]
-        self.Tin_to_plot = [self.Tin]
-        self.Tset_to_plot = [self.Tset]
-        self.Tout_to_plot = [self.Tout]
+        self._history.clear()
+        self._history.append((0, self.Tin, self.Tset, self.Tout))
 
         self.__iter__()
 
@@ -81,26 +111,64 @@ class House():
         self.Tin = self.Tin - (self.timestep/60) / self.C * (self.K * (self.Tin - self.Tout) + self.Qhvac * self.hvacON)
         
         self.__next__()
-        self.Tset_to_plot.append(self.Tset)
-        self.Tin_to_plot.append(self.Tin)
-        self.Tout_to_plot.append(self.Tout)
-        self.time_to_plot.append(self.iteration * 5)
+        self._history.append((self.iteration * 5, self.Tin, self.Tset, self.Tout))
+
+    @property
+    def time_to_plot(self):
+        return self._history.values()[:, 0]
+
+    @property
+    def Tin_to_plot(self):
+        return self._history.values()[:, 1]
+
+    @property
+    def Tset_to_plot(self):
+        return self._history.values()[:, 2]
+
+    @property
+    def Tout_to_plot(self):
+        return self._history.values()[:, 3]
 
     def get_Power(self):
         COP = 3
         Power = self.Phvac * self.hvacON * COP 
         return Power
 
-    def show(self):
+    def snapshot(self):
+        """Copy of the house, schedules and plot history, for restore().
 
-        self.ax.clear()
-        self.ax.plot(self.time_to_plot, self.Tin_to_plot, label='Tin')
-        self.ax.plot(self.time_to_plot, self.Tset_to_plot, label='Tset')
-        self.ax.plot(self.time_to_plot, self.Tout_to_plot, label='Tout')
-        self.ax.set_xlabel('Time [min]')
-        self.ax.set_ylabel(r'Temperature [$^\circ$C]')
-        plt.legend()
-        plt.pause(np.finfo(np.float32).eps)
+        The schedules are shared with the snapshot, they are never modified
+        in place.
+        """
+        snapshot = {key: value for key, value in vars(self).items()
+                    if key not in ("_history", "renderer")}
+        snapshot["_history"] = (self._history._data.copy(), self._history._count)
+        return snapshot
+
+    def restore(self, snapshot):
+        """Return to a state saved by snapshot()."""
+        data, count = snapshot["_history"]
+        vars(self).update({key: value for key, value in snapshot.items()
+                           if key != "_history"})
+        if self._history._data.shape != data.shape:
+            self._history = RingBuffer(*data.shape)
+        self._history._data[:] = data
+        self._history._count = count
+
+    def show(self, renderer=None):
+        """Send the history to a plot drawn by another process.
+
+        Pass `renderer` to keep one plot window across House instances,
+        otherwise the House starts its own.
+        """
+        if renderer is None:
+            if self.renderer is None:
+                self.renderer = HistoryPlot.start(self)
+            renderer = self.renderer
+        if renderer.closed:
+            return
+        history = self._history.values()
+        renderer.publish(np.concatenate(([len(history)], history.ravel())))
         
  # print the object nicely   
     def __str__(self):
@@ -126,6 +194,168 @@ class House():
             StopIteration
 
 
+class HistoryPlot():
+    """Plots House histories in a `RenderProcess`.
+
+    A snapshot is the number of rows followed by (time, Tin, Tset, Tout) rows.
+    """
+
+    def __init__(self, feedback):
+        import matplotlib.pyplot as plt
+
+        self.plt = plt
+        self.fig, self.ax = plt.subplots(1, 1)
+
+    @classmethod
+    def start(cls, house, fps: float=10):
+        """Start a plot process sized for the history of `house`."""
+        from microsoft_bonsai_api.simulator.render_process import RenderProcess
+
+        return RenderProcess(cls, 1 + 4 * house._history.capacity, fps=fps)
+
+    def draw(self, snapshot):
+        rows = int(snapshot[0])
+        time, Tin, Tset, Tout = snapshot[1:1 + 4 * rows].reshape(rows, 4).T
+        self.ax.clear()
+        self.ax.plot(time, Tin, label='Tin')
+        self.ax.plot(time, Tset, label='Tset')
+        self.ax.plot(time, Tout, label='Tout')
+        self.ax.set_xlabel('Time [min]')
+        self.ax.set_ylabel(r'Temperature [$^\circ$C]')
+        self.ax.legend()
+
+    def poll(self):
+        # runs the GUI event loop briefly and redraws
+        self.plt.pause(np.finfo(np.float32).eps)
+        return self.plt.fignum_exists(self.fig.number)
+
+
+def _linear_rollout(r, b, x0):
+    """Solve x[t+1] = r * x[t] + b[:, t] for every row at once.
+
+    Within a block of L steps the solution is
+    x[j+1] = r**(j+1) * (x0 + cumsum(b[:, k] / r**(k+1))[j]),
+    so each block is a handful of array operations. L is chosen so that the
+    powers of r stay far from overflow; the error stays at rounding level
+    because every partial sum is scaled back by r**(j+1).
+    """
+    n, steps = b.shape
+    x = np.empty((n, steps + 1))
+    x[:, 0] = x0
+    if np.any(r == 0):
+        block = 1
+    else:
+        # keep |r|**L and |r|**-L within 1e100
+        worst = np.abs(np.log10(np.abs(r))).max()
+        block = steps if worst == 0 else max(1, int(100 / worst))
+
+    for start in range(0, steps, block):
+        chunk = b[:, start:start + block]
+        if block == 1:
+            x[:, start + 1] = r * x[:, start] + chunk[:, 0]
+            continue
+        powers = np.cumprod(np.broadcast_to(r[:, None], chunk.shape), axis=1)
+        x[:, start + 1:start + 1 + chunk.shape[1]] = powers * (
+            x[:, start:start + 1] + np.cumsum(chunk / powers, axis=1)
+        )
+    return x
+
+
+class BatchHouse():
+    """N houses with the thermal model of `House`, as NumPy arrays.
+
+    K, C, Qhvac, Tin_initial and the schedule parameters may be scalars or
+    arrays of shape (N,). Tout_schedule / Tset_schedule may also be given
+    directly as (N, horizon + 1) arrays instead of the default sine and step
+    profiles.
+    """
+
+    def __init__(self,
+                n: int,
+                K=0.5,
+                C=0.3,
+                Qhvac=9,
+                Tin_initial=25,
+                Tout_median=25,
+                Tout_amplitude=5,
+                Tset_start=25,
+                Tset_stop=20,
+                Tset_transition=144,
+                timestep: float = 5,
+                horizon: int = 288,
+                Tout_schedule=None,
+                Tset_schedule=None,):
+
+        self.n = n
+        self.K = np.broadcast_to(np.asarray(K, dtype=float), (n,))
+        self.C = np.broadcast_to(np.asarray(C, dtype=float), (n,))
+        self.Qhvac = np.broadcast_to(np.asarray(Qhvac, dtype=float), (n,))
+        self.Phvac = self.Qhvac
+        self.Tin_initial = np.broadcast_to(np.asarray(Tin_initial, dtype=float), (n,))
+        self.timestep = timestep
+        self.horizon = horizon
+
+        if Tout_schedule is None:
+            wave = np.sin(np.linspace(0, 2*np.pi, horizon + 1))
+            Tout_schedule = (np.asarray(Tout_amplitude, dtype=float)[..., None] * wave
+                             + np.asarray(Tout_median, dtype=float)[..., None])
+        if Tset_schedule is None:
+            after = np.arange(horizon + 1) >= np.asarray(Tset_transition)[..., None]
+            Tset_schedule = np.where(after, np.asarray(Tset_stop)[..., None],
+                                     np.asarray(Tset_start)[..., None])
+        self.Tout_schedule = np.broadcast_to(np.asarray(Tout_schedule, dtype=float), (n, horizon + 1))
+        self.Tset_schedule = np.broadcast_to(np.asarray(Tset_schedule, dtype=float), (n, horizon + 1))
+
+        # House.__next__ stops advancing the schedules at this iteration
+        self._last_iteration = max(horizon - 4, 0)
+        self.reset()
+
+    def reset(self):
+        self.iteration = 0
+        self.Tin = self.Tin_initial.copy()
+        self.hvacON = np.zeros(self.n)
+        self.Tset = self.Tset_schedule[:, 0]
+        self.Tout = self.Tout_schedule[:, 0]
+
+    def _coefficients(self, hvacON, Tout):
+        # Tin[t+1] = r * Tin[t] + b[t], the update of House.update_Tin
+        a = (self.timestep/60) / self.C
+        r = 1 - a * self.K
+        b = (a * self.K)[:, None] * Tout - (a * self.Qhvac)[:, None] * hvacON
+        return r, b
+
+    def step(self, hvacON):
+        """Advance every house one timestep; hvacON is a scalar or (N,)."""
+        self.hvacON = np.broadcast_to(np.asarray(hvacON, dtype=float), (self.n,))
+        r, b = self._coefficients(self.hvacON[:, None], self.Tout[:, None])
+        self.Tin = r * self.Tin + b[:, 0]
+        if self.iteration < self._last_iteration:
+            self.iteration += 1
+            self.Tset = self.Tset_schedule[:, self.iteration]
+            self.Tout = self.Tout_schedule[:, self.iteration]
+        return self.Tin
+
+    def rollout(self, hvacON):
+        """Inside temperatures for a whole action sequence, from the current
+        state, without stepping through Python per timestep. The batch itself
+        is not advanced.
+
+        hvacON: (T,) sequence applied to every house, or (N, T).
+
+        Returns an (N, T + 1) array whose first column is the current Tin.
+        """
+        hvacON = np.asarray(hvacON, dtype=float)
+        steps = hvacON.shape[-1]
+        hvacON = np.broadcast_to(hvacON, (self.n, steps))
+        index = np.minimum(self.iteration + np.arange(steps), self._last_iteration)
+        r, b = self._coefficients(hvacON, self.Tout_schedule[:, index])
+        return _linear_rollout(r, b, self.Tin)
+
+    def get_Power(self):
+        COP = 3
+        return self.Phvac * self.hvacON * COP
+
+
 if __name__ == '__main__':
     import random
     house = House()
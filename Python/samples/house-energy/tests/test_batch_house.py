@@ -0,0 +1,69 @@
+"""
+Checks BatchHouse and its closed-form rollout against the scalar House.
+Runs locally, no brain needed:
+
+pytest tests/test_batch_house.py
+"""
+
+import numpy as np
+import pytest
+
+from sim.house_simulator import BatchHouse, House, _linear_rollout
+
+params = [
+    {"K": 0.5, "C": 0.3, "Qhvac": 9, "Tin_initial": 25},
+    {"K": 0.8, "C": 0.25, "Qhvac": 6, "Tin_initial": 30, "Tout_amplitude": 8},
+    {"K": 0.3, "C": 0.5, "Qhvac": 12, "Tin_initial": 18, "Tset_transition": 60},
+]
+
+
+def scalar_run(config, actions):
+    house = House(**config)
+    Tin = [house.Tin]
+    for hvacON in actions:
+        house.update_hvacON(hvacON)
+        house.update_Tin()
+        Tin.append(house.Tin)
+    return np.array(Tin)
+
+
+def batch():
+    defaults = {"Tout_amplitude": 5, "Tset_transition": 144}
+    keys = {k for p in params for k in p}
+    columns = {k: [p.get(k, defaults.get(k)) for p in params] for k in keys}
+    return BatchHouse(len(params), **columns)
+
+
+def test_step_matches_scalar_model():
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 2, (288, len(params))).astype(float)
+    expected = np.array([scalar_run(p, actions[:, i]) for i, p in enumerate(params)])
+
+    houses = batch()
+    Tin = [houses.Tin.copy()]
+    for hvacON in actions:
+        Tin.append(houses.step(hvacON).copy())
+    np.testing.assert_allclose(np.array(Tin).T, expected, rtol=1e-13, atol=1e-13)
+
+
+def test_rollout_matches_scalar_model():
+    rng = np.random.default_rng(1)
+    actions = rng.integers(0, 2, (len(params), 288)).astype(float)
+    expected = np.array([scalar_run(p, actions[i]) for i, p in enumerate(params)])
+
+    np.testing.assert_allclose(batch().rollout(actions), expected, rtol=1e-13, atol=1e-13)
+
+
+@pytest.mark.parametrize("r", [0.0, 0.05, 0.9, 1.0, 1.7])
+def test_linear_rollout_matches_recurrence(r):
+    rng = np.random.default_rng(2)
+    r = np.array([r, 0.5])
+    b = rng.normal(size=(2, 400))
+    expected = np.empty((2, 401))
+    expected[:, 0] = [1.0, -2.0]
+    for t in range(400):
+        expected[:, t + 1] = r * expected[:, t] + b[:, t]
+
+    actual = _linear_rollout(r, b, expected[:, 0])
+    scale = np.abs(expected).max(axis=1, keepdims=True)
+    np.testing.assert_allclose(actual / scale, expected / scale, rtol=0, atol=1e-12)
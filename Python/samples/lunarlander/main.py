@@ -15,6 +15,9 @@ from microsoft_bonsai_api.simulator.generated.models import (
     SimulatorSessionResponse,
 )
 from azure.core.exceptions import HttpResponseError
+from microsoft_bonsai_api.simulator import assessment
+from microsoft_bonsai_api.simulator.env_pool import EnvPool, scenario_env_names
+from sim.LunarLander import LunarLander
 from sim.simulator_model import SimulatorModel
 import gym
 
@@ -23,10 +26,12 @@ import argparse
 
 LOG_PATH = "logs"
 
+# environments used only for their action space
+policy_envs = EnvPool()
+
 def random_policy(sim_state):
 
-    env = gym.make("LunarLanderContinuous-v2") #TOREMOVE:("highway-v0")
-    env.reset()
+    env = policy_envs.get("LunarLanderContinuous-v2")
     action = env.action_space.sample()
     return {"engine1": action[0], "engine2": action[1]}
 
@@ -80,6 +85,9 @@ def test_policy(
         log_data=log_iterations,
         debug=debug
     )
+    sim_session.sim.env_pool.prewarm(
+        scenario_env_names(scenario_file, default=sim_session.sim.env_name)
+    )
     # Define terminal function if exists in simulation, otherwise always False.
     terminal_f = lambda: False
     if hasattr(sim_session.sim, "terminal"):
@@ -142,6 +150,9 @@ def main(
         log_data=log_iterations,
         debug=debug
     )
+    sim_model.sim.env_pool.prewarm(
+        scenario_env_names("test_scenarios.json", default=sim_model.sim.env_name)
+    )
 
     # Configure client to interact with Bonsai service
     config_client = BonsaiClientConfig()
@@ -327,12 +338,31 @@ if __name__ == "__main__":
         help="Custom assess config json filename",
     )
 
+    assessment.add_arguments(parser)
+
     args, _ = parser.parse_known_args()
 
     if args.custom_assess:
         scenario_file = args.custom_assess
 
-    if args.test_random:
+    if args.workers and args.test_exported:
+        # the exported brain keeps one memory, reset between episodes, so its
+        # episodes cannot run concurrently
+        parser.error("--workers cannot be used with --test-exported")
+    if args.workers and (args.test_random or args.test_policy):
+        if args.test_random:
+            policy = random_policy
+        else:
+            policy = partial(chosen_policy, policy_name=args.test_policy)
+        assessment.main(
+            partial(LunarLander, render=False, log_data=False, debug=False),
+            policy,
+            args.custom_assess or "test_scenarios.json",
+            args.iteration_limit,
+            workers=args.workers,
+            output=args.assess_output,
+        )
+    elif args.test_random:
         test_policy(
             render=args.render,
             log_iterations=args.log_iterations,
@@ -12,6 +12,7 @@ import gym
 import numpy as np
 import copy
 
+from microsoft_bonsai_api.simulator.env_pool import EnvPool
 from sim.log_feature import SimLogger
 
 
@@ -23,6 +24,7 @@ class LunarLander:
         env_name: str = "LunarLanderContinuous-v2",
         obs_type: str = "Kinematics", # TODO: Review if Kinematics is needed (config-related)
         debug: bool = True,
+        env_pool: EnvPool = None,
     ):
         """Lunar Lander simulation using the gym environment. See API docs for more information:
             https://www.gymlibrary.ml/environments/box2d/lunar_lander/
@@ -38,10 +40,15 @@ class LunarLander:
             the name of the simulator environment to create, by default "highway-v0"
         obs_type: str, optional
             the type of observations received from simulator.
+        env_pool: EnvPool, optional
+            environments reused across episodes, by default a new pool for this instance
         """
 
-        self.simulator = gym.make(env_name)
-        self.state = self.simulator.reset().tolist()
+        self.env_pool = env_pool or EnvPool()
+        self.simulator = self.env_pool.get(env_name)
+        # the env is reset at every episode start; until the first one, the
+        # state is all zeros rather than the result of an extra reset
+        self.state = np.zeros(self.simulator.observation_space.shape).tolist()
         self.state_prev = np.copy(self.state)
         self.reward = 0
         self.terminal = False
@@ -123,11 +130,7 @@ class LunarLander:
         if config:
             # reset the environment if the env_name is in the SimConfig
             if "env_name" in config.keys():
-                self.simulator = gym.make(config["env_name"])
-                self.state = self.simulator.reset().tolist()
-                self.state_prev = np.copy(self.state)
-                self.reward = 0
-                self.terminal = False
+                self.simulator = self.env_pool.get(config["env_name"])
                 self.env_name = config["env_name"]
 
             # Store MT configuration, whenever provided.
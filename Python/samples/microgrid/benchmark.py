@@ -0,0 +1,52 @@
+"""
+Compare MicrogridSim.restore with episode_start.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmark.py --repeats 500
+
+Times an episode start for one config, and restoring the snapshot taken right
+after it, which is what the session does with --snapshot-cache when a config
+repeats. Also checks that both give the same state. Needs pymgrid.
+"""
+
+import argparse
+import time
+
+from sim.microgrid_sim import MicrogridSim
+
+
+def per_call_us(func, repeats):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeats", type=int, default=500)
+    parser.add_argument("--starting-time-step", type=int, default=1000)
+    args = parser.parse_args()
+
+    sim = MicrogridSim()
+    config = {"starting_time_step": args.starting_time_step, "episode_length": 48}
+    start_us = per_call_us(lambda: sim.episode_start(config), args.repeats)
+    snapshot = sim.snapshot()
+    snapshot_us = per_call_us(sim.snapshot, args.repeats)
+    restore_us = per_call_us(lambda: sim.restore(snapshot), args.repeats)
+
+    sim.episode_start(config)
+    started = sim.get_state()
+    sim.restore(snapshot)
+    restored = sim.get_state()
+
+    print("episode_start {:8.1f} us".format(start_us))
+    print("snapshot      {:8.1f} us".format(snapshot_us))
+    print("restore       {:8.1f} us".format(restore_us))
+    print("same state: {}".format(started == restored))
+
+
+if __name__ == "__main__":
+    main()
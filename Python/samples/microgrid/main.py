@@ -61,6 +61,7 @@ class TemplateSimulatorSession:
         env_name: str = "Microgrid",
         log_data: bool = False,
         log_file_name: str = None,
+        snapshot_cache: bool = False,
     ):
         """Simulator Interface with the Bonsai Platform
 
@@ -74,8 +75,17 @@ class TemplateSimulatorSession:
             Whether to log data, by default False
         log_file_name : str, optional
             where to log data, by default None. If not specified, will generate a name.
+        snapshot_cache : bool, optional
+            Restore the microgrid state after a reset from a cache keyed by the
+            episode config, instead of rewinding it again, when a config
+            repeats. By default False.
         """
         self.sim = microgrid_sim.MicrogridSim()
+        self.snapshot_cache = None
+        if snapshot_cache:
+            from microsoft_bonsai_api.simulator.snapshot import SnapshotCache
+
+            self.snapshot_cache = SnapshotCache()
         self.count_view = False
         self.env_name = env_name
         self.render = render
@@ -126,7 +136,12 @@ class TemplateSimulatorSession:
             config = default_config
         # Keep the config around so we can log it later
         self.config = config
-        self.sim.episode_start(config)
+
+        cache = self.snapshot_cache
+        if cache is None or not cache.restore(self.sim, config):
+            self.sim.episode_start(config)
+            if cache is not None:
+                cache.save(self.sim, config)
 
     def log_iterations(self, state, action, episode: int = 0, iteration: int = 1):
         """Log iterations during training to a CSV.
@@ -212,6 +227,7 @@ def test_policy(
     log_iterations: bool = False,
     policy=random_policy,
     policy_name: str = "random",
+    snapshot_cache: bool = False,
 ):
     """Test a policy using random actions over a fixed number of episodes
 
@@ -219,12 +235,17 @@ def test_policy(
     ----------
     num_episodes : int, optional
         number of iterations to run, by default 10
+    snapshot_cache : bool, optional
+        restore cached post-reset states for repeated episode configs
     """
 
     current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
     log_file_name = current_time + "_" + policy_name + "_log.csv"
     sim = TemplateSimulatorSession(
-        render=render, log_data=log_iterations, log_file_name=log_file_name
+        render=render,
+        log_data=log_iterations,
+        log_file_name=log_file_name,
+        snapshot_cache=snapshot_cache,
     )
 
     import numpy as np
@@ -256,7 +277,10 @@ def test_policy(
 
 
 def main(
-    render: bool = False, log_iterations: bool = False, config_setup: bool = False
+    render: bool = False,
+    log_iterations: bool = False,
+    config_setup: bool = False,
+    snapshot_cache: bool = False,
 ):
     """Main entrypoint for running simulator connections
 
@@ -266,6 +290,8 @@ def main(
         visualize steps in environment, by default True, by default False
     log_iterations: bool, optional
         log iterations during training to a CSV file
+    snapshot_cache: bool, optional
+        restore cached post-reset states for repeated episode configs
     """
 
     # workspace environment variables
@@ -274,7 +300,9 @@ def main(
         load_dotenv(verbose=True, override=True)
 
     # Grab standardized way to interact with sim API
-    sim = TemplateSimulatorSession(render=render, log_data=log_iterations)
+    sim = TemplateSimulatorSession(
+        render=render, log_data=log_iterations, snapshot_cache=snapshot_cache
+    )
 
     # Configure client to interact with Bonsai service
     config_client = BonsaiClientConfig()
@@ -437,6 +465,12 @@ if __name__ == "__main__":
         default=False,
         help="Use a local environment file to setup access keys and workspace ids",
     )
+    parser.add_argument(
+        "--snapshot-cache",
+        action="store_true",
+        default=False,
+        help="Restore cached post-reset states when an episode config repeats",
+    )
 
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
@@ -472,11 +506,17 @@ if __name__ == "__main__":
 
     if args.test_random:
         test_policy(
-            render=args.render, log_iterations=args.log_iterations, policy=random_policy
+            render=args.render,
+            log_iterations=args.log_iterations,
+            policy=random_policy,
+            snapshot_cache=args.snapshot_cache,
         )
     elif args.test_rule_based:
         test_policy(
-            render=args.render, log_iterations=args.log_iterations, policy=rule_based
+            render=args.render,
+            log_iterations=args.log_iterations,
+            policy=rule_based,
+            snapshot_cache=args.snapshot_cache,
         )
     elif args.test_exported:
         port = args.test_exported
@@ -489,10 +529,12 @@ if __name__ == "__main__":
             policy=trained_brain_policy,
             policy_name="exported",
             num_iterations=args.iteration_limit,
+            snapshot_cache=args.snapshot_cache,
         )
     else:
         main(
             config_setup=args.config_setup,
             render=args.render,
             log_iterations=args.log_iterations,
+            snapshot_cache=args.snapshot_cache,
         )
@@ -5,7 +5,6 @@ Brain states and return Brain actions.
 
 import random
 from typing import Dict
-import requests
 
 
 # These max levels are specific to the microgrid we are working with in the sample
@@ -54,8 +53,6 @@ def rule_based(state):
 def brain_policy(
     state: Dict[str, float], exported_brain_url: str = "http://localhost:5000"
 ):
+    from microsoft_bonsai_api.simulator.exported_brain import shared_client
 
-    prediction_endpoint = f"{exported_brain_url}/v1/prediction"
-    response = requests.get(prediction_endpoint, json=state)
-    action = response.json()
-    return action
+    return shared_client(exported_brain_url).predict(state)
@@ -0,0 +1,135 @@
+"""
+On-disk cache of the pymgrid microgrid used by MicrogridSim.
+
+Loading the pymgrid25 benchmark builds all 25 microgrids, although the sim
+only uses one. The first process to start saves the selected microgrid to a
+cache directory: every numeric time series (load, pv, prices, co2, grid
+status, ...) as its own .npy file, and the rest of the object, without those
+series, as a small pickle. Later processes unpickle the small object and
+memory-map the series copy-on-write, so their pages are shared through the OS
+page cache instead of being copied into every worker. pymgrid may still
+write to a series in place; the worker doing so gets a private copy of the
+pages it changes and the files are never modified.
+
+The cache directory defaults to `.cache/<name>` next to this package and can
+be moved with the MICROGRID_CACHE_DIR environment variable; setting it to
+"off" disables the cache. Each CACHE_VERSION is saved to its own
+subdirectory, `v<version>`, so a new version is built next to an old one that
+running workers may still have mapped, and nothing is ever deleted while in
+use. Old versions can be removed by hand once no worker uses them.
+"""
+
+import copy
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+OBJECT_FILE = "microgrid.pkl"
+
+
+def cache_dir(name):
+    """Directory of the cache called `name`, or None if caching is off."""
+    root = os.environ.get("MICROGRID_CACHE_DIR")
+    if root == "off":
+        return None
+    if not root:
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".cache")
+    return os.path.join(root, name)
+
+
+def time_series(mg):
+    """Attributes of `mg` that can be stored as plain arrays."""
+    length = len(mg._load_ts)
+    for name, value in vars(mg).items():
+        if not isinstance(value, (pd.DataFrame, pd.Series)) or len(value) != length:
+            continue
+        if not value.index.equals(pd.RangeIndex(length)):
+            continue
+        dtypes = set(value.dtypes) if isinstance(value, pd.DataFrame) else {value.dtype}
+        if len(dtypes) != 1 or not np.issubdtype(dtypes.pop(), np.number):
+            continue
+        labels = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        try:
+            json.dumps(labels)
+        except TypeError:
+            continue
+        yield name, value, labels
+
+
+def save_microgrid(mg, path):
+    """Write `mg` to the cache directory `path`.
+
+    The directory is assembled under a temporary name and renamed into place,
+    so concurrent workers never see a partial cache; if another process wins
+    the race, its copy is kept.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".building-")
+    try:
+        manifest = {"version": CACHE_VERSION, "series": {}}
+        # shallow copy, so the caller's microgrid keeps its series
+        stripped = copy.copy(mg)
+        for name, value, labels in time_series(mg):
+            np.save(os.path.join(tmp, name + ".npy"), value.to_numpy(), allow_pickle=False)
+            manifest["series"][name] = {
+                "kind": "frame" if isinstance(value, pd.DataFrame) else "series",
+                "labels": labels,
+            }
+            setattr(stripped, name, None)
+
+        with open(os.path.join(tmp, OBJECT_FILE), "wb") as fh:
+            pickle.dump(stripped, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(tmp, MANIFEST_FILE), "w") as fh:
+            json.dump(manifest, fh, indent=1)
+        os.rename(tmp, path)
+    except OSError:
+        if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_microgrid(path):
+    """Load a microgrid saved by `save_microgrid`, memory-mapping its series
+    copy-on-write."""
+    with open(os.path.join(path, MANIFEST_FILE)) as fh:
+        manifest = json.load(fh)
+    with open(os.path.join(path, OBJECT_FILE), "rb") as fh:
+        mg = pickle.load(fh)
+
+    for name, info in manifest["series"].items():
+        data = np.load(os.path.join(path, name + ".npy"), mmap_mode="c")
+        if info["kind"] == "frame":
+            value = pd.DataFrame(data, columns=info["labels"], copy=False)
+        else:
+            value = pd.Series(data, name=info["labels"][0], copy=False)
+        setattr(mg, name, value)
+    return mg
+
+
+def is_cached(path):
+    manifest = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest):
+        return False
+    with open(manifest) as fh:
+        return json.load(fh).get("version") == CACHE_VERSION
+
+
+def cached_microgrid(name, build):
+    """Return the cached microgrid `name`, building and saving it first with
+    `build()` if the current CACHE_VERSION is not cached yet."""
+    path = cache_dir(name)
+    if path is None:
+        return build()
+    path = os.path.join(path, "v{}".format(CACHE_VERSION))
+    if not is_cached(path):
+        save_microgrid(build(), path)
+    return load_microgrid(path)
@@ -1,17 +1,36 @@
+import copy
 import csv
+
+import numpy as np
 from pymgrid import MicrogridGenerator
 
+from sim.dataset_cache import cached_microgrid, time_series
+
+# name of the on-disk cache of the microgrid below, see sim/dataset_cache.py
+MICROGRID_CACHE_NAME = "pymgrid25-4"
+
+# microgrid attributes set when it is built and never changed by an episode,
+# shared by snapshots like the time series
+STATIC_ATTRIBUTES = ("parameters", "architecture", "control_dict")
+
+
+def build_microgrid():
+    # we will use the 4th microgrid architecture in pymgrid25 benchmark set
+    # with PV, battery, load and grid
+    generator = MicrogridGenerator.MicrogridGenerator(nb_microgrid=25)
+    pymgrid25 = generator.load('pymgrid25')
+    mg = pymgrid25.microgrids[4]
+    mg._grid_price_import[mg._grid_price_import == 0.11] = 0.2 # increase the high grid price value
+    return mg
+
+
 class MicrogridSim:
     """
     Model to simulate a microgrid.
     """
     def __init__(self):
-        # we will use the 4th microgrid architecture in pymgrid25 benchmark set
-        # with PV, battery, load and grid
-        generator = MicrogridGenerator.MicrogridGenerator(nb_microgrid=25)
-        pymgrid25 = generator.load('pymgrid25')
-        self.mg = pymgrid25.microgrids[4]
-        self.mg._grid_price_import[self.mg._grid_price_import == 0.11] = 0.2 # increase the high grid price value
+        # built once per machine, then memory-mapped from the cache
+        self.mg = cached_microgrid(MICROGRID_CACHE_NAME, build_microgrid)
         self.prev_state = {}
         self.state = {}
         self.control_dict = {}
@@ -22,7 +41,19 @@ class MicrogridSim:
         self.episode_length = 24*2
         self.load_ts = None
         self.pv_ts = None
+        self.sum_load = None
         self.starting_time_step = None
+
+        # full series as flat arrays (views of the cached data) and prefix
+        # sums, so episode slices and their totals are O(1) lookups
+        self._load = np.asarray(self.mg._load_ts.to_numpy(), dtype=float).ravel()
+        self._pv = np.asarray(self.mg._pv_ts.to_numpy(), dtype=float).ravel()
+        self._load_prefix_sum = np.concatenate(([0.0], np.cumsum(self._load)))
+
+        # shared by snapshots of the microgrid instead of copied
+        shared = [value for _, value, _ in time_series(self.mg)]
+        shared += [getattr(self.mg, name) for name in STATIC_ATTRIBUTES if hasattr(self.mg, name)]
+        self._shared = {id(value): value for value in shared}
     
     def get_state(self):
         """
@@ -46,8 +77,8 @@ class MicrogridSim:
         state["prev_grid_co2"] = self.prev_state.get("grid_co2", 0)
         state["prev_action_grid_import"] = self.control_dict.get("grid_import", 0)
         state["cost_co2"] = self.cost_co2
-        if self.load_ts is not None:
-            state["sum_load"] = self.load_ts.sum()
+        if self.sum_load is not None:
+            state["sum_load"] = self.sum_load
         else:
             state["sum_load"] = 1
         self.state = state
@@ -89,8 +120,42 @@ class MicrogridSim:
         self.mg._df_record_state["grid_price_import"] = [self.mg.grid.price_import]
         self.mg._df_record_state["grid_price_export"] = [self.mg.grid.price_export]
 
-        self.load_ts = self.mg._load_ts.iloc[self.mg._tracking_timestep:self.mg._tracking_timestep + self.episode_length].values.flatten()
-        self.pv_ts = self.mg._pv_ts.iloc[self.mg._tracking_timestep:self.mg._tracking_timestep + self.episode_length].values.flatten()
+        start = self.mg._tracking_timestep
+        stop = min(start + self.episode_length, len(self._load))
+        self.load_ts = self._load[start:stop]
+        self.pv_ts = self._pv[start:stop]
+        self.sum_load = float(self._load_prefix_sum[stop] - self._load_prefix_sum[start])
+
+    def snapshot(self):
+        """Copy of the episode state and the microgrid, for restore().
+
+        The microgrid's time series and static configuration are shared
+        rather than copied, so a snapshot costs about as much as the
+        microgrid's per-episode records.
+        """
+        return {
+            "mg": copy.deepcopy(self.mg, dict(self._shared)),
+            "prev_state": dict(self.prev_state),
+            "state": dict(self.state),
+            "control_dict": dict(self.control_dict),
+            "cost_loss_load": self.cost_loss_load,
+            "cost_overgeneration": self.cost_overgeneration,
+            "cost_battery": self.cost_battery,
+            "cost_co2": self.cost_co2,
+            "episode_length": self.episode_length,
+            "load_ts": self.load_ts,
+            "pv_ts": self.pv_ts,
+            "sum_load": self.sum_load,
+            "starting_time_step": self.starting_time_step,
+        }
+
+    def restore(self, snapshot):
+        """Return to a state saved by snapshot(); replaces episode_start."""
+        vars(self).update(snapshot)
+        self.mg = copy.deepcopy(snapshot["mg"], dict(self._shared))
+        self.prev_state = dict(snapshot["prev_state"])
+        self.state = dict(snapshot["state"])
+        self.control_dict = dict(snapshot["control_dict"])
 
     def episode_step(self, action):
         control_dict = {"battery_charge": 0,
@@ -195,7 +260,7 @@ class MicrogridSim:
             + (self.control_dict["battery_charge"] + self.control_dict["battery_discharge"]) * cost_battery \
             + cost_co2 * self.control_dict["grid_import"] * self.prev_state["grid_co2"]
         
-        normalized_cost = (cost - self.grid_cost_without_battery()) / self.load_ts.sum()
+        normalized_cost = (cost - self.grid_cost_without_battery()) / self.sum_load
         return cost, normalized_cost
 
     def grid_cost_without_battery(self):
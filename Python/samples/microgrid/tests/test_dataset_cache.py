@@ -0,0 +1,87 @@
+"""
+Checks the on-disk microgrid cache with a stand-in for the pymgrid object.
+Runs locally, without pymgrid:
+
+pytest tests/test_dataset_cache.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from sim import dataset_cache
+
+
+class StandIn:
+    """Has the attributes dataset_cache looks at on a pymgrid microgrid."""
+
+    def __init__(self, steps=48):
+        hours = np.arange(steps, dtype=float)
+        self._load_ts = pd.DataFrame({"load": 10 + np.sin(hours)})
+        self._pv_ts = pd.DataFrame({"GH": np.maximum(0, np.cos(hours))})
+        self._grid_price_import = pd.Series(0.2 + hours / 100, name="price")
+        self._grid_status_ts = pd.DataFrame({"grid_status": np.ones(steps)})
+        self.architecture = {"PV": 1, "battery": 1, "genset": 0, "grid": 1}
+        self.labels = pd.Series(["a", "b"])
+        self.horizon = 24
+
+
+def test_save_and_load(tmp_path):
+    mg = StandIn()
+    path = str(tmp_path / "grid")
+    dataset_cache.save_microgrid(mg, path)
+    assert dataset_cache.is_cached(path)
+
+    loaded = dataset_cache.load_microgrid(path)
+    pd.testing.assert_frame_equal(loaded._load_ts, mg._load_ts, check_index_type=False)
+    pd.testing.assert_series_equal(
+        loaded._grid_price_import, mg._grid_price_import, check_index_type=False
+    )
+    assert loaded.architecture == mg.architecture
+    # not stored as an array: kept in the pickle
+    assert list(loaded.labels) == ["a", "b"]
+    # the caller's object keeps its series
+    assert isinstance(mg._pv_ts, pd.DataFrame)
+
+
+def test_loaded_series_can_be_written_without_changing_the_cache(tmp_path):
+    path = str(tmp_path / "grid")
+    dataset_cache.save_microgrid(StandIn(), path)
+
+    first = dataset_cache.load_microgrid(path)
+    first._load_ts.iloc[0, 0] = -1.0
+    first._grid_price_import.iloc[:] = 0.0
+    assert first._load_ts.iloc[0, 0] == -1.0
+
+    second = dataset_cache.load_microgrid(path)
+    assert second._load_ts.iloc[0, 0] == StandIn()._load_ts.iloc[0, 0]
+    assert second._grid_price_import.iloc[-1] > 0
+
+
+def test_version_change_builds_next_to_the_old_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("MICROGRID_CACHE_DIR", str(tmp_path))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return StandIn()
+
+    monkeypatch.setattr(dataset_cache, "CACHE_VERSION", 1)
+    old = dataset_cache.cached_microgrid("grid", build)
+    dataset_cache.cached_microgrid("grid", build)
+    assert len(builds) == 1
+
+    monkeypatch.setattr(dataset_cache, "CACHE_VERSION", 2)
+    dataset_cache.cached_microgrid("grid", build)
+    assert len(builds) == 2
+    assert sorted(os.listdir(str(tmp_path / "grid"))) == ["v1", "v2"]
+    # the old version is left in place for processes that still map it
+    assert dataset_cache.is_cached(str(tmp_path / "grid" / "v1")) is False
+    assert old._load_ts.iloc[3, 0] == StandIn()._load_ts.iloc[3, 0]
+
+
+def test_cache_off(monkeypatch):
+    monkeypatch.setenv("MICROGRID_CACHE_DIR", "off")
+    mg = StandIn()
+    assert dataset_cache.cached_microgrid("grid", lambda: mg) is mg
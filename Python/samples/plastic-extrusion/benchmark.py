@@ -0,0 +1,98 @@
+"""
+Benchmark ExtruderSimulation.step with each temperature_change implementation.
+
+Usage:
+    python benchmark.py --steps 20000
+
+  - rebuild: a new scipy interp1d on every call (the original implementation)
+  - cached:  one interp1d built at import (temperature_change_exact)
+  - lookup:  dense lookup table with linear interpolation (temperature_change)
+
+It then compares operating points evaluated per second by ExtrusionModel,
+one at a time, and by BatchExtrusionModel for --points at once.
+
+The simulation is stepped locally; no connection to the platform is made.
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+from scipy import interpolate
+
+from main import ExtruderSimulation
+from sim import extrusion_model as em
+from sim import temperature, units
+
+
+def temperature_change_rebuild(Δω):
+    f = interpolate.interp1d(
+        x=temperature.DATA_SPEED_CHANGE,
+        y=temperature.DATA_TEMPERATURE_CHANGE,
+        kind="quadratic",
+        fill_value="extrapolate",
+    )
+    return f(np.abs(Δω)) * np.sign(Δω)
+
+
+IMPLEMENTATIONS = {
+    "rebuild": temperature_change_rebuild,
+    "cached": temperature.temperature_change_exact,
+    "lookup": temperature.temperature_change,
+}
+
+
+def steps_per_second(steps):
+    random.seed(0)
+    # skip SimulatorSession.__init__, which needs platform credentials
+    sim = ExtruderSimulation.__new__(ExtruderSimulation)
+    sim.reset(ω0_s=10.0, f0_c=1.0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        sim.Δω_s = random.uniform(-0.5, 0.5)
+        sim.Δf_c = random.uniform(-0.05, 0.05)
+        sim.step()
+    return steps / (time.perf_counter() - start)
+
+
+def operating_points_per_second(points):
+    rng = np.random.default_rng(0)
+    ω = rng.uniform(0.5, 30, points)
+    Δω = rng.uniform(-3, 3, points)
+    f_c = rng.uniform(0.1, 10, points)
+    T = units.celsius_to_kelvin(rng.uniform(170, 210, points))
+
+    start = time.perf_counter()
+    for i in range(points):
+        em.ExtrusionModel(ω=ω[i], Δω=Δω[i], f_c=f_c[i], T=T[i])
+    scalar = points / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    em.BatchExtrusionModel(ω=ω, Δω=Δω, f_c=f_c, T=T)
+    batch = points / (time.perf_counter() - start)
+    return scalar, batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--points", type=int, default=10000)
+    args = parser.parse_args()
+
+    original = temperature.temperature_change
+    try:
+        for name, implementation in IMPLEMENTATIONS.items():
+            temperature.temperature_change = implementation
+            print("{:<10} {:>12,.0f} steps/s".format(name, steps_per_second(args.steps)))
+    finally:
+        temperature.temperature_change = original
+
+    scalar, batch = operating_points_per_second(args.points)
+    print()
+    print("{:<20} {:>12,.0f} points/s".format("ExtrusionModel", scalar))
+    print("{:<20} {:>12,.0f} points/s".format("BatchExtrusionModel", batch))
+
+
+if __name__ == "__main__":
+    main()
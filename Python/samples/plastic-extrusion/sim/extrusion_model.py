@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 import math
 
+import numpy as np
+
 from sim import temperature as tm
 from sim import units
 
@@ -159,3 +161,29 @@ class ExtrusionModel:
             self.yield_ = parts_per_iteration
         else:
             self.yield_ = 0
+
+
+class BatchExtrusionModel(ExtrusionModel):
+    """
+    ExtrusionModel evaluated for many operating points at once.
+
+    The operating point `ω`, `Δω`, `f_c` and `T` may be NumPy arrays of any
+    shapes that broadcast together, e.g. `ω[:, None]` and `f_c[None, :]` for
+    a grid. Every derived quantity (`Q_op`, `L`, `yield_`, ...) then has the
+    broadcast shape. Screw, die and material parameters stay scalars.
+    """
+
+    def __post_init__(self):
+
+        self.ω, self.Δω, self.f_c, self.T = np.broadcast_arrays(
+            *(np.asarray(x, dtype=float) for x in (self.ω, self.Δω, self.f_c, self.T))
+        )
+        super().__post_init__()
+
+    def length_within_tolerance(self):
+        return np.abs(self.L - self.L0) < self.ε
+
+    def production_efficiency(self):
+
+        parts_per_iteration = self.f_c * self.Δt
+        self.yield_ = np.where(self.length_within_tolerance(), parts_per_iteration, 0.0)
@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 from scipy import interpolate
 
@@ -14,31 +16,77 @@ DATA_SPEED_CHANGE = DATA_SPEED_CHANGE_RPM * units.RADIANS_PER_REVOLUTION / 60
 DATA_TEMPERATURE_CHANGE = (5 / 9) * DATA_TEMPERATURE_CHANGE_FAHRENHEIT
 
 
+# quadratic interpolation through the data, built once
+_INTERPOLATOR = interpolate.interp1d(
+    x=DATA_SPEED_CHANGE,
+    y=DATA_TEMPERATURE_CHANGE,
+    kind="quadratic",
+    fill_value="extrapolate",
+)
+
+# dense samples of _INTERPOLATOR over the data range; linear interpolation
+# between them stays within ~1e-6 degrees of the quadratic
+LOOKUP_POINTS = 4097
+LOOKUP_SPEED_CHANGE = np.linspace(0, DATA_SPEED_CHANGE[-1], LOOKUP_POINTS)
+LOOKUP_TEMPERATURE_CHANGE = _INTERPOLATOR(LOOKUP_SPEED_CHANGE)
+
+# plain Python copies for the scalar path, which skips NumPy call overhead
+_LOOKUP_STEP = float(LOOKUP_SPEED_CHANGE[1])
+_LOOKUP_MAX = float(LOOKUP_SPEED_CHANGE[-1])
+_LOOKUP_VALUES = LOOKUP_TEMPERATURE_CHANGE.tolist()
+
+
+def temperature_change_exact(Δω):
+    """
+    Same as `temperature_change`, evaluating the quadratic interpolation
+    directly instead of the lookup table.
+    """
+
+    # NOTE: the interpolation is only well-behaved for non-negative inputs,
+    # so we force it to be symmetric
+    ΔT = _INTERPOLATOR(np.abs(Δω)) * np.sign(Δω)
+    return ΔT
+
+
 def temperature_change(Δω):
     """
     Changing the screw speed causes a corresponding change in material temperature.
 
     Parameters
     ----------
-    Δω : float
+    Δω : float or array_like
         Change in screw angular speed (radians / second^2).
 
     Returns
     -------
-    ΔT : float
+    ΔT : float or ndarray
         Temperature change induced by the change in screw angular speed.
     """
 
-    f = interpolate.interp1d(
-        x=DATA_SPEED_CHANGE,
-        y=DATA_TEMPERATURE_CHANGE,
-        kind="quadratic",
-        fill_value="extrapolate",
-    )
-    # NOTE: the interpolation is only well-behaved for non-negative inputs,
-    # so we force it to be symmetric
-    ΔT = f(np.abs(Δω)) * np.sign(Δω)
-    return ΔT
+    if isinstance(Δω, (int, float)):
+        return _temperature_change_scalar(Δω)
+
+    magnitude = np.abs(Δω)
+    ΔT = np.interp(magnitude, LOOKUP_SPEED_CHANGE, LOOKUP_TEMPERATURE_CHANGE)
+    # outside the data the quadratic is extrapolated, as before
+    outside = magnitude > LOOKUP_SPEED_CHANGE[-1]
+    if np.any(outside):
+        ΔT = np.where(outside, _INTERPOLATOR(magnitude), ΔT)
+    return ΔT * np.sign(Δω)
+
+
+def _temperature_change_scalar(Δω):
+    magnitude = abs(Δω)
+    # NaN and infinity take the exact path, which returns NaN for them
+    if magnitude > _LOOKUP_MAX or not math.isfinite(magnitude):
+        return float(temperature_change_exact(Δω))
+
+    # the table is uniformly spaced, so the segment is found by division
+    position = magnitude / _LOOKUP_STEP
+    i = min(int(position), LOOKUP_POINTS - 2)
+    lower, upper = _LOOKUP_VALUES[i], _LOOKUP_VALUES[i + 1]
+    ΔT = lower + (position - i) * (upper - lower)
+    return ΔT if Δω >= 0 else -ΔT
 
 
 # https://en.wikipedia.org/wiki/Gas_constant
@@ -54,17 +102,17 @@ def arrhenius(T1, T2, Ea=Ea_PVC):
 
     Parameters
     ----------
-    T1 : float
+    T1 : float or array_like
         Temperature at previous time step (Kelvin).
-    T2 : float
+    T2 : float or array_like
         Temperature at current time step (Kelvin).
-    Ea : float, optional
+    Ea : float or array_like, optional
         Activation energy (J / mol).
 
     Returns
     -------
-    h_T : float
-        Temperature adjustment.
+    h_T : float or ndarray
+        Temperature adjustment, elementwise for array inputs.
     
     References
     ----------
@@ -0,0 +1,48 @@
+"""
+Checks BatchExtrusionModel against ExtrusionModel, one operating point at a
+time. Runs locally, no brain needed:
+
+pytest tests/test_extrusion_model.py
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from sim import units
+from sim.extrusion_model import BatchExtrusionModel, ExtrusionModel
+
+QUANTITIES = ["ΔT", "η_s", "η_d", "P_op", "Q_op", "L", "yield_"]
+
+
+def test_matches_scalar_model_on_a_grid():
+    ω = np.linspace(5, 40, 7) * units.RADIANS_PER_REVOLUTION / 60
+    Δω = np.array([-3.0, -0.1, 0.0, 0.05, 0.9, 2.6, 4.0])
+    f_c = np.linspace(0.5, 9.5, 5)
+    T = np.array([440.0, 460.0, 480.0])
+
+    batch = BatchExtrusionModel(
+        ω=ω[:, None, None, None],
+        Δω=Δω[None, :, None, None],
+        f_c=f_c[None, None, :, None],
+        T=T[None, None, None, :],
+    )
+    assert batch.L.shape == (len(ω), len(Δω), len(f_c), len(T))
+
+    for index in itertools.product(*map(range, batch.L.shape)):
+        a, b, c, d = index
+        model = ExtrusionModel(ω=ω[a], Δω=Δω[b], f_c=f_c[c], T=T[d])
+        for name in QUANTITIES:
+            assert getattr(batch, name)[index] == pytest.approx(
+                getattr(model, name), rel=1e-12, abs=1e-15
+            ), name
+
+
+def test_yield_follows_tolerance():
+    ω = 20 * units.RADIANS_PER_REVOLUTION / 60
+    reference = ExtrusionModel(ω=ω, Δω=0, f_c=1, T=460)
+    # the cutter frequency that cuts parts of exactly L0
+    f_c = reference.v / reference.L0
+    batch = BatchExtrusionModel(ω=ω, Δω=0, f_c=np.array([f_c, 2 * f_c]), T=460)
+    np.testing.assert_array_equal(batch.yield_, [f_c, 0.0])
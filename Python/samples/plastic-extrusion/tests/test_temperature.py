@@ -0,0 +1,35 @@
+"""
+Checks the lookup-table temperature change against the quadratic
+interpolation it replaces. Runs locally, no brain needed:
+
+pytest tests/test_temperature.py
+"""
+
+import math
+
+import numpy as np
+
+from sim import temperature as tm
+
+SPEED_CHANGES = [
+    0.0, -0.0, 1e-9, 0.3, -0.3, 1.234, -2.5,
+    tm.DATA_SPEED_CHANGE[-1], -tm.DATA_SPEED_CHANGE[-1],
+    2.7, -4.0, 50.0,
+    math.nan, math.inf, -math.inf,
+]
+
+
+def test_scalar_matches_array():
+    array = tm.temperature_change(np.array(SPEED_CHANGES))
+    scalar = [tm.temperature_change(Δω) for Δω in SPEED_CHANGES]
+    assert all(isinstance(ΔT, float) for ΔT in scalar)
+    np.testing.assert_allclose(scalar, array, rtol=1e-15, atol=0)
+
+
+def test_matches_exact_interpolation():
+    Δω = np.array(SPEED_CHANGES)
+    exact = tm.temperature_change_exact(Δω)
+    np.testing.assert_allclose(tm.temperature_change(Δω), exact, rtol=0, atol=1e-5)
+    for value, expected in zip(SPEED_CHANGES, exact):
+        np.testing.assert_allclose(tm.temperature_change(value), expected, rtol=0, atol=1e-5)
+    assert math.isnan(tm.temperature_change(math.nan))
@@ -0,0 +1,92 @@
+"""
+Compare the Qube integrators for accuracy and throughput.
+Copyright 2021 Microsoft
+
+Usage:
+    python benchmark.py --seconds 5 --sizes 1 100 1000
+
+Accuracy: every integrator is driven with the same random voltage sequence
+from the same initial state, and the largest deviation from odeint over the
+run is reported per state variable.
+Throughput: control steps per wall second (instances x steps for batches).
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from sim.qube_simulator import BatchQubeSimulator, QubeSimulator
+
+LABELS = ("theta", "alpha", "theta_dot", "alpha_dot")
+
+
+def angle_error(a, b):
+    return np.abs(((a - b + np.pi) % (2 * np.pi)) - np.pi)
+
+
+def trajectory(sim, initial, voltages):
+    sim.state = np.array(initial)
+    states = []
+    for Vm in voltages:
+        states.append(np.array(sim.step(Vm), dtype=float))
+    return np.array(states)
+
+
+def accuracy(seconds, substeps):
+    rng = np.random.default_rng(0)
+    frequency = 80
+    voltages = rng.uniform(-3.0, 3.0, int(seconds * frequency))
+    initial = [0.1, np.pi - 0.05, 0.0, 0.0]
+    reference = trajectory(QubeSimulator(frequency), initial, voltages)
+
+    print("max deviation from odeint over {:.0f} s at {} Hz".format(seconds, frequency))
+    print("{:<12}".format("rk4 substeps") + "".join("{:>12}".format(l) for l in LABELS))
+    for n in substeps:
+        states = trajectory(QubeSimulator(frequency, "rk4", n), initial, voltages)
+        errors = [
+            angle_error(states[:, 0], reference[:, 0]).max(),
+            angle_error(states[:, 1], reference[:, 1]).max(),
+            np.abs(states[:, 2] - reference[:, 2]).max(),
+            np.abs(states[:, 3] - reference[:, 3]).max(),
+        ]
+        print("{:<12}".format(n) + "".join("{:>12.2e}".format(e) for e in errors))
+
+
+def rate(step, count, seconds):
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        step()
+        steps += 1
+    return count * steps / (time.perf_counter() - start)
+
+
+def throughput(sizes, substeps, seconds):
+    print()
+    print("{:<28} {:>14}".format("integrator", "steps/s"))
+    for integrator in ("odeint", "rk4"):
+        sim = QubeSimulator(integrator=integrator, substeps=substeps)
+        name = "QubeSimulator {}".format(integrator)
+        print("{:<28} {:>14,.0f}".format(name, rate(lambda: sim.step(1.0), 1, seconds)))
+    for n in sizes:
+        batch = BatchQubeSimulator(n, substeps=substeps, seed=0)
+        actions = np.random.default_rng(0).uniform(-3, 3, n)
+        name = "BatchQubeSimulator N={}".format(n)
+        print("{:<28} {:>14,.0f}".format(name, rate(lambda: batch.step(actions), n, seconds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0, help="simulated time")
+    parser.add_argument("--substeps", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--timing", type=float, default=1.0, help="wall time per case")
+    args = parser.parse_args()
+
+    accuracy(args.seconds, args.substeps)
+    throughput(args.sizes, 4, args.timing)
+
+
+if __name__ == "__main__":
+    main()
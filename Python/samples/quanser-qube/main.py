@@ -25,6 +25,7 @@ from dotenv import load_dotenv, set_key
 import datetime
 from typing import Dict, Any, Union
 from microsoft_bonsai_api.simulator.client import BonsaiClientConfig, BonsaiClient
+from microsoft_bonsai_api.simulator import assessment
 from microsoft_bonsai_api.simulator.generated.models import (
     SimulatorState,
     SimulatorInterface,
@@ -32,8 +33,9 @@ from microsoft_bonsai_api.simulator.generated.models import (
 )
 from azure.core.exceptions import HttpResponseError
 import argparse
-from sim.qube_simulator import QubeSimulator
-from policies import random_policy, brain_policy, forget_memory
+import numpy as np
+from sim.qube_simulator import INITIAL_STATE_KEYS, BatchQubeSimulator, QubeSimulator
+from policies import BATCH_POLICIES, random_policy, brain_policy, forget_memory
 import pdb
 
 LOG_PATH = "logs"
@@ -62,9 +64,19 @@ class TemplateSimulatorSession:
         log_data: bool = False,
         log_file_name: str = None,
         env_name: str = "QuanserQube",
+        integrator: str = "odeint",
+        snapshot_cache: bool = False,
     ):
         ## Initialize python api for simulator
-        self.simulator = QubeSimulator()
+        ## integrator "rk4" trades odeint's adaptive solve for a faster fixed-step one
+        self.simulator = QubeSimulator(integrator=integrator)
+        ## snapshot_cache restores the post-reset state of repeated configs
+        ## that set the whole initial state, instead of resetting again
+        self.snapshot_cache = None
+        if snapshot_cache:
+            from microsoft_bonsai_api.simulator.snapshot import SnapshotCache
+
+            self.snapshot_cache = SnapshotCache()
         self.env_name = env_name
         self.render = render
         self.log_data = log_data
@@ -89,7 +101,14 @@ class TemplateSimulatorSession:
         """ Called at the start of each episode """
         ## Add simulator reset api here using config from desired lesson in inkling
         self.config = config
-        self.simulator.reset(config)
+        cache = self.snapshot_cache
+        # without the whole initial state in the config, reset draws it at random
+        if not config or not all(key in config for key in INITIAL_STATE_KEYS):
+            cache = None
+        if cache is None or not cache.restore(self.simulator, config):
+            self.simulator.reset(config)
+            if cache is not None:
+                cache.save(self.simulator, config)
 
     def episode_step(self, action: Dict[str, Any]):
         """ Called for each step of the episode """
@@ -99,6 +118,10 @@ class TemplateSimulatorSession:
         if self.render:
             self.simulator.view()
 
+    def close(self):
+        """Stop the renderer process, if one was started."""
+        self.simulator.close()
+
     def halted(self) -> bool:
         """
         Should return True if the simulator cannot continue for some reason
@@ -169,6 +192,40 @@ class TemplateSimulatorSession:
             exit()
 
 
+class BatchQubeSession:
+    """Runs many episodes in lockstep on a BatchQubeSimulator.
+
+    Batch counterpart of TemplateSimulatorSession with the "rk4" integrator,
+    for local assessment, with the same states, actions, episode configs and
+    halting rule.
+    """
+
+    state_fields = ("theta", "alpha", "theta_dot", "alpha_dot")
+    action_fields = ("Vm",)
+
+    def __init__(self, n: int = 1):
+        self.n = n
+        self.simulator = None
+        self.terminal = None
+
+    def episode_start(self, configs):
+        frequencies = {(config or {}).get("frequency", 80) for config in configs}
+        if len(frequencies) > 1:
+            raise ValueError("Episodes of one batch must share their frequency.")
+        self.simulator = BatchQubeSimulator(len(configs), frequency=frequencies.pop())
+        for i, config in enumerate(configs):
+            self.simulator.reset(config, index=[i])
+        self.terminal = np.zeros(len(configs), dtype=bool)
+
+    def get_states(self):
+        return self.simulator.state
+
+    def episode_step(self, actions):
+        self.simulator.step(actions[:, 0])
+        # the arm hit the rails, as in TemplateSimulatorSession.halted
+        self.terminal = np.abs(self.simulator.state[:, 0]) >= math.pi / 2
+
+
 def env_setup(env_file: str = ".env"):
     """Helper function to setup connection with Project Bonsai
 
@@ -207,6 +264,8 @@ def test_policy(
     policy=random_policy,
     policy_name: str = "random",
     scenario_file: str="assess_config.json",
+    integrator: str="odeint",
+    snapshot_cache: bool=False,
 ):
     """Test a policy using random actions over a fixed number of episodes
 
@@ -214,6 +273,10 @@ def test_policy(
     ----------
     render : bool, optional
         Flag to turn visualization on
+    integrator : str, optional
+        "odeint" or "rk4", see QubeSimulator
+    snapshot_cache : bool, optional
+        restore cached post-reset states for repeated episode configs
     """
     
     # Use custom assessment scenario configs
@@ -225,7 +288,11 @@ def test_policy(
     current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
     log_file_name = current_time + "_" + policy_name + "_log.csv"
     sim = TemplateSimulatorSession(
-        render=render, log_data=log_iterations, log_file_name=log_file_name
+        render=render,
+        log_data=log_iterations,
+        log_file_name=log_file_name,
+        integrator=integrator,
+        snapshot_cache=snapshot_cache,
     )
     for episode in range(1, num_episodes):
         iteration = 1
@@ -236,8 +303,7 @@ def test_policy(
         if policy_name != 'random':
             if any('exported_brain_url' in key for key in policy.keywords):
                 # Reset the Memory vector because exported brains don't understand episodes 
-                url = '{}/v1'.format(policy.keywords['exported_brain_url'])
-                forget_memory(url)
+                forget_memory(policy.keywords['exported_brain_url'])
 
         if log_iterations:
             sim.log_iterations(sim_state, {}, episode, iteration)
@@ -264,6 +330,8 @@ def main(
     env_file: Union[str, bool]=".env",
     workspace: str=None,
     accesskey: str=None,
+    integrator: str="odeint",
+    snapshot_cache: bool=False,
 ):
     """Main entrypoint for running simulator connections
 
@@ -281,6 +349,10 @@ def main(
         optional flag from CLI for workspace to override
     accesskey: str, optional
         optional flag from CLI for accesskey to override
+    integrator: str, optional
+        "odeint" or "rk4", see QubeSimulator
+    snapshot_cache: bool, optional
+        restore cached post-reset states for repeated episode configs
     """
 
     # check if workspace or access-key passed in CLI
@@ -318,7 +390,12 @@ def main(
             )
 
     # Grab standardized way to interact with sim API
-    sim = TemplateSimulatorSession(render=render, log_data=log_iterations)
+    sim = TemplateSimulatorSession(
+        render=render,
+        log_data=log_iterations,
+        integrator=integrator,
+        snapshot_cache=snapshot_cache,
+    )
 
     # Configure client to interact with Bonsai service
     config_client = BonsaiClientConfig()
@@ -456,6 +533,7 @@ def main(
             workspace_name=config_client.workspace,
             session_id=registered_session.session_id,
         )
+        sim.close()
         print("Unregistered simulator.")
     except Exception as err:
         # Gracefully unregister for any other exceptions
@@ -463,6 +541,7 @@ def main(
             workspace_name=config_client.workspace,
             session_id=registered_session.session_id,
         )
+        sim.close()
         print("Unregistered simulator because: {}".format(err))
 
 
@@ -480,6 +559,18 @@ if __name__ == "__main__":
         default=False,
         help="Log iterations during training",
     )
+    parser.add_argument(
+        "--integrator",
+        choices=["odeint", "rk4"],
+        default="odeint",
+        help="ODE integrator: adaptive odeint, or fixed-step rk4 (faster)",
+    )
+    parser.add_argument(
+        "--snapshot-cache",
+        action="store_true",
+        default=False,
+        help="Restore cached post-reset states when an episode config repeats",
+    )
     parser.add_argument(
         "--config-setup",
         action="store_true",
@@ -539,15 +630,41 @@ if __name__ == "__main__":
         help="Custom assess config json filename",
     )
 
+    assessment.add_arguments(parser)
+
     args, _ = parser.parse_known_args()
     
     scenario_file = 'assess_config.json'
     if args.custom_assess:
         scenario_file = args.custom_assess
 
-    if args.test_random:
+    if args.workers and args.test_exported:
+        # the exported brain keeps one memory, reset between episodes, so its
+        # episodes cannot run concurrently
+        parser.error("--workers cannot be used with --test-exported")
+    if args.workers and args.test_random:
+        assessment.main(
+            partial(
+                TemplateSimulatorSession,
+                render=False,
+                log_data=False,
+                integrator=args.integrator,
+            ),
+            random_policy,
+            scenario_file,
+            args.iteration_limit,
+            workers=args.workers,
+            output=args.assess_output,
+            make_batch_sim=BatchQubeSession if args.integrator == "rk4" else None,
+            batch_policies=BATCH_POLICIES,
+        )
+    elif args.test_random:
         test_policy(
-            render=args.render, log_iterations=args.log_iterations, policy=random_policy
+            render=args.render,
+            log_iterations=args.log_iterations,
+            policy=random_policy,
+            integrator=args.integrator,
+            snapshot_cache=args.snapshot_cache,
         )
     elif args.test_exported:
         port = args.test_exported
@@ -561,6 +678,8 @@ if __name__ == "__main__":
             policy_name="exported",
             num_iterations=args.iteration_limit,
             scenario_file=scenario_file,
+            integrator=args.integrator,
+            snapshot_cache=args.snapshot_cache,
         )
     else:
         main(
@@ -570,4 +689,6 @@ if __name__ == "__main__":
             env_file=args.env_file,
             workspace=args.workspace,
             accesskey=args.accesskey,
+            integrator=args.integrator,
+            snapshot_cache=args.snapshot_cache,
         )
@@ -5,7 +5,8 @@ Brain states and return Brain actions.
 
 import random
 from typing import Dict
-import requests
+
+import numpy as np
 
 def random_policy(state):
     """
@@ -15,21 +16,32 @@ def random_policy(state):
     return action
 
 
+def random_policy_batch(states):
+    """
+    random_policy for an (N, 4) array of (theta, alpha, theta_dot, alpha_dot) states.
+    """
+    return np.random.uniform(-3, 3, size=(len(states), 1))
+
+# vectorized versions of the policies above, used by --workers assessments
+BATCH_POLICIES = {
+    random_policy: random_policy_batch,
+}
+
+
 def brain_policy(
     state: Dict[str, float], exported_brain_url: str = "http://localhost:5000"
 ):
+    from microsoft_bonsai_api.simulator.exported_brain import shared_client
 
-    prediction_endpoint = f"{exported_brain_url}/v1/prediction"
-    response = requests.get(prediction_endpoint, json=state)
-
-    return response.json()
+    return shared_client(exported_brain_url).predict(state)
 
 def forget_memory(
-    url: str = "http://localhost:5000/v1"
+    url: str = "http://localhost:5000"
 ):
+    from microsoft_bonsai_api.simulator.exported_brain import shared_client
+
     # Reset the Memory vector because exported brains don't understand episodes 
-    response = requests.delete(url)
-    if response.status_code == 204:
+    if shared_client(url).forget_memory():
         print('Resetting Memory vector in exported brain...')
     else:
-       print('Error: {}'.format(response.status_code)) 
+       print('Error: exported brain did not reset its memory')
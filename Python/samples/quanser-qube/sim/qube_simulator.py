@@ -8,15 +8,92 @@ import numpy as np
 import random
 from scipy.integrate import odeint
  
-from .render_qube import QubeRendererVpython
-# uncomment to test sim using if __name__=='__main__'
-#from render_qube import QubeRendererVpython
+# integrators accepted by QubeSimulator
+ODEINT = "odeint"
+RK4 = "rk4"
+
+# physical parameters and their defaults, see QubeSimulator.__init__
+DEFAULT_PARAMS = {
+    "Rm": 8.4,
+    "kt": 0.042,
+    "km": 0.042,
+    "mr": 0.095,
+    "Lr": 0.085,
+    "Dr": 0.00027,
+    "mp": 0.024,
+    "Lp": 0.129,
+    "Dp": 0.00005,
+}
+
+# config keys of the initial state, QubeSimulator.reset draws missing ones at random
+INITIAL_STATE_KEYS = ("initial_theta", "initial_alpha", "initial_theta_dot", "initial_alpha_dot")
+
+
+# frames per second drawn by QubeSimulator.view
+RENDER_FPS = 30
+
+
+def _vpython_renderer(feedback):
+    """Renderer for a RenderProcess, vpython is only imported by that process."""
+    from .render_qube import QubeRenderer
+    # uncomment to test sim using if __name__=='__main__'
+    #from render_qube import QubeRenderer
+
+    return QubeRenderer()
+
+
+def _qube_derivatives(p, theta, alpha, theta_dot, alpha_dot, Vm):
+    """Time derivative of the Qube state for parameters `p`.
+
+    Works elementwise, so the state, voltage and parameters may be scalars or
+    arrays of the same shape.
+    """
+    tau = -(p.km * (Vm - p.km * theta_dot)) / p.Rm  # torque
+
+    # fmt: off
+    # From Rotary Pendulum Workbook
+    theta_dot_dot = (-p.Lp*p.Lr*p.mp*(-8.0*p.Dp*alpha_dot + p.Lp**2*p.mp*theta_dot**2*np.sin(2.0*alpha) + 4.0*p.Lp*p.g*p.mp*np.sin(alpha))*np.cos(alpha) + (4.0*p.Jp + p.Lp**2*p.mp)*(4.0*p.Dr*theta_dot + p.Lp**2*alpha_dot*p.mp*theta_dot*np.sin(2.0*alpha) + 2.0*p.Lp*p.Lr*alpha_dot**2*p.mp*np.sin(alpha) - 4.0*tau))/(4.0*p.Lp**2*p.Lr**2*p.mp**2*np.cos(alpha)**2 - (4.0*p.Jp + p.Lp**2*p.mp)*(4.0*p.Jr + p.Lp**2*p.mp*np.sin(alpha)**2 + 4.0*p.Lr**2*p.mp))
+    alpha_dot_dot = (2.0*p.Lp*p.Lr*p.mp*(4.0*p.Dr*theta_dot + p.Lp**2*alpha_dot*p.mp*theta_dot*np.sin(2.0*alpha) + 2.0*p.Lp*p.Lr*alpha_dot**2*p.mp*np.sin(alpha) - 4.0*tau)*np.cos(alpha) - 0.5*(4.0*p.Jr + p.Lp**2*p.mp*np.sin(alpha)**2 + 4.0*p.Lr**2*p.mp)*(-8.0*p.Dp*alpha_dot + p.Lp**2*p.mp*theta_dot**2*np.sin(2.0*alpha) + 4.0*p.Lp*p.g*p.mp*np.sin(alpha)))/(4.0*p.Lp**2*p.Lr**2*p.mp**2*np.cos(alpha)**2 - (4.0*p.Jp + p.Lp**2*p.mp)*(4.0*p.Jr + p.Lp**2*p.mp*np.sin(alpha)**2 + 4.0*p.Lr**2*p.mp))
+    # fmt: on
+
+    return theta_dot, alpha_dot, theta_dot_dot, alpha_dot_dot
+
+
+def _rk4(p, state, Vm, dt, substeps):
+    """Advance `state` (theta, alpha, theta_dot, alpha_dot) by `dt` with
+    `substeps` classic Runge-Kutta steps, holding the voltage constant."""
+    h = dt / substeps
+    for _ in range(substeps):
+        k1 = _qube_derivatives(p, *state, Vm)
+        k2 = _qube_derivatives(p, *[s + 0.5 * h * k for s, k in zip(state, k1)], Vm)
+        k3 = _qube_derivatives(p, *[s + 0.5 * h * k for s, k in zip(state, k2)], Vm)
+        k4 = _qube_derivatives(p, *[s + h * k for s, k in zip(state, k3)], Vm)
+        state = [
+            s + h / 6.0 * (a + 2.0 * b + 2.0 * c + d)
+            for s, a, b, c, d in zip(state, k1, k2, k3, k4)
+        ]
+    return state
+
+
+def _wrap(angle):
+    return ((angle + np.pi) % (2 * np.pi)) - np.pi
+
 
 class QubeSimulator(object):
     """Simulation for the Quanser Qube Inverted Pendulum."""
 
-    def __init__(self, frequency=80):
+    def __init__(self, frequency=80, integrator=ODEINT, substeps=4):
+        """
+        frequency: control steps per second.
+        integrator: "odeint" (adaptive LSODA solve per step) or "rk4" (fixed
+            step Runge-Kutta, several times faster).
+        substeps: RK4 steps per control step.
+        """
+        if integrator not in (ODEINT, RK4):
+            raise ValueError("integrator must be '{}' or '{}'".format(ODEINT, RK4))
         self.frequency = frequency
+        self.integrator = integrator
+        self.substeps = substeps
         self._dt = 1.0 / self.frequency
         self._max_voltage = 3.0
 
@@ -48,9 +125,12 @@ class QubeSimulator(object):
 
     def step(self, action):
         action = np.clip(action, -self._max_voltage, self._max_voltage)
-        self.state = self._forward_model_ode(
-            *self.state, action, self._dt
-        )
+        if self.integrator == RK4:
+            self.state = self._forward_model_rk4(*self.state, action, self._dt)
+        else:
+            self.state = self._forward_model_ode(
+                *self.state, action, self._dt
+            )
         return self.state
 
     def reset(self, config=None):
@@ -82,34 +162,44 @@ class QubeSimulator(object):
             ])
         return self.state
 
+    def snapshot(self):
+        """Copy of the state and parameters, for restore(). The viewer is
+        not part of it."""
+        snapshot = {
+            key: value for key, value in vars(self).items()
+            if key not in ("viewer", "count_view")
+        }
+        snapshot["state"] = np.array(self.state, dtype=np.float64)
+        return snapshot
+
+    def restore(self, snapshot):
+        """Return to a state saved by snapshot()."""
+        vars(self).update(snapshot)
+        self.state = snapshot["state"].copy()
+
     def view(self):
         if self.count_view == False:
-            self.viewer = QubeRendererVpython(
-                self.state[0], 
-                self.state[1],
-                self.frequency
-            )
+            # drawn by another process, stepping is not paced by the display
+            from microsoft_bonsai_api.simulator.render_process import RenderProcess
+
+            self.viewer = RenderProcess(_vpython_renderer, 2, fps=RENDER_FPS)
             self.count_view = True
-        self.viewer.render(self.state[0], self.state[1])
+        self.viewer.publish(self.state[:2])
+
+    def close(self):
+        """Stop the renderer process started by view(), if any."""
+        if self.count_view:
+            self.viewer.close()
+            self.count_view = False
 
     def _diff_forward_model_ode(self, state, t, action, dt):
         theta, alpha, theta_dot, alpha_dot = state
-        Vm = action
-        tau = -(self.km * (Vm - self.km * theta_dot)) / self.Rm  # torque
-
-        # fmt: off
-        # From Rotary Pendulum Workbook
-        theta_dot_dot = (-self.Lp*self.Lr*self.mp*(-8.0*self.Dp*alpha_dot + self.Lp**2*self.mp*theta_dot**2*np.sin(2.0*alpha) + 4.0*self.Lp*self.g*self.mp*np.sin(alpha))*np.cos(alpha) + (4.0*self.Jp + self.Lp**2*self.mp)*(4.0*self.Dr*theta_dot + self.Lp**2*alpha_dot*self.mp*theta_dot*np.sin(2.0*alpha) + 2.0*self.Lp*self.Lr*alpha_dot**2*self.mp*np.sin(alpha) - 4.0*tau))/(4.0*self.Lp**2*self.Lr**2*self.mp**2*np.cos(alpha)**2 - (4.0*self.Jp + self.Lp**2*self.mp)*(4.0*self.Jr + self.Lp**2*self.mp*np.sin(alpha)**2 + 4.0*self.Lr**2*self.mp))
-        alpha_dot_dot = (2.0*self.Lp*self.Lr*self.mp*(4.0*self.Dr*theta_dot + self.Lp**2*alpha_dot*self.mp*theta_dot*np.sin(2.0*alpha) + 2.0*self.Lp*self.Lr*alpha_dot**2*self.mp*np.sin(alpha) - 4.0*tau)*np.cos(alpha) - 0.5*(4.0*self.Jr + self.Lp**2*self.mp*np.sin(alpha)**2 + 4.0*self.Lr**2*self.mp)*(-8.0*self.Dp*alpha_dot + self.Lp**2*self.mp*theta_dot**2*np.sin(2.0*alpha) + 4.0*self.Lp*self.g*self.mp*np.sin(alpha)))/(4.0*self.Lp**2*self.Lr**2*self.mp**2*np.cos(alpha)**2 - (4.0*self.Jp + self.Lp**2*self.mp)*(4.0*self.Jr + self.Lp**2*self.mp*np.sin(alpha)**2 + 4.0*self.Lr**2*self.mp))
-        # fmt: on
-
-        diff_state = np.array([theta_dot, alpha_dot, theta_dot_dot, alpha_dot_dot]).reshape(
-            (4,)
-        )
+        diff_state = np.array(
+            _qube_derivatives(self, theta, alpha, theta_dot, alpha_dot, action)
+        ).reshape((4,))
         diff_state = np.array(diff_state, dtype="float64")
         return diff_state
 
-
     def _forward_model_ode(self, theta, alpha, theta_dot, alpha_dot, Vm, dt):
         t = np.linspace(0.0, dt, 2)
 
@@ -122,6 +212,85 @@ class QubeSimulator(object):
 
         return theta, alpha, theta_dot, alpha_dot
 
+    def _forward_model_rk4(self, theta, alpha, theta_dot, alpha_dot, Vm, dt):
+        theta, alpha, theta_dot, alpha_dot = _rk4(
+            self, (theta, alpha, theta_dot, alpha_dot), Vm, dt, self.substeps
+        )
+        return _wrap(theta), _wrap(alpha), theta_dot, alpha_dot
+
+
+class BatchQubeSimulator(object):
+    """N Qube instances integrated together with vectorized RK4.
+
+    Each parameter of `DEFAULT_PARAMS` is an array of shape (N,), so every
+    instance can have its own Lp, mp, Rm, ... . `state` has shape (N, 4)
+    with the columns theta, alpha, theta_dot, alpha_dot.
+    """
+
+    def __init__(self, n, frequency=80, substeps=4, seed=None):
+        self.n = n
+        self.frequency = frequency
+        self.substeps = substeps
+        self._dt = 1.0 / self.frequency
+        self._max_voltage = 3.0
+        self.g = 9.81
+        self.rng = np.random.default_rng(seed)
+
+        for name, value in DEFAULT_PARAMS.items():
+            setattr(self, name, np.full(n, value))
+        self._update_inertia()
+        self.state = np.zeros((n, 4))
+        self.reset()
+
+    def _update_inertia(self):
+        self.Jp = self.mp * self.Lp ** 2 / 12
+        self.Jr = self.mr * self.Lr ** 2 / 12
+
+    def reset(self, config=None, index=None):
+        """Reset all instances, or those selected by `index`.
+
+        config: same keys as QubeSimulator.reset, each a scalar or an array
+            with one value per selected instance. Parameters that are left
+            out return to their defaults; "frequency" is fixed per batch.
+        index: integer indices or boolean mask, by default every instance.
+        """
+        config = config or {}
+        selected = np.arange(self.n) if index is None else np.arange(self.n)[index]
+        k = len(selected)
+
+        for name, default in DEFAULT_PARAMS.items():
+            values = getattr(self, name).copy()
+            values[selected] = config.get(name, default)
+            setattr(self, name, values)
+        self._update_inertia()
+
+        state = self.state.copy()
+        state[selected, 0] = config.get(
+            "initial_theta", self.rng.uniform(-0.27, 0.27, k)
+        )
+        state[selected, 1] = config.get(
+            "initial_alpha", np.pi + self.rng.uniform(-0.05, 0.05, k)
+        )
+        state[selected, 2] = config.get(
+            "initial_theta_dot", self.rng.uniform(-0.05, 0.05, k)
+        )
+        state[selected, 3] = config.get(
+            "initial_alpha_dot", self.rng.uniform(-0.05, 0.05, k)
+        )
+        self.state = state
+        return self.state
+
+    def step(self, action):
+        """Apply one voltage per instance (or one for all) for 1/frequency s."""
+        action = np.clip(action, -self._max_voltage, self._max_voltage)
+        theta, alpha, theta_dot, alpha_dot = _rk4(
+            self, self.state.T, action, self._dt, self.substeps
+        )
+        self.state = np.stack(
+            [_wrap(theta), _wrap(alpha), theta_dot, alpha_dot], axis=1
+        )
+        return self.state
+
 '''
 # Need to comment out in order to call from script in another file
 if __name__ == '__main__':
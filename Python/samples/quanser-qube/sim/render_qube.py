@@ -4,8 +4,7 @@ import sys
 
 
 class QubeRendererVpython:
-    def __init__(self, theta, alpha, frequency):
-        self.frequency = frequency
+    def __init__(self, theta, alpha):
         vp.scene.width, vp.scene.height = 1000, 600
         vp.scene.range = 0.25
         vp.scene.title = "QubeServo2-USB rotary pendulum"
@@ -93,7 +92,22 @@ class QubeRendererVpython:
             axis=self.pendulum_axis(theta),
             origin=self.pendulum_origin(theta),
         )
-        vp.rate(self.frequency)
 
     def close(self):
-        vp.no_notebook.stop_server()
\ No newline at end of file
+        vp.no_notebook.stop_server()
+
+
+class QubeRenderer:
+    """Draws (theta, alpha) snapshots in a `RenderProcess`."""
+
+    def __init__(self):
+        self.viewer = None
+
+    def draw(self, snapshot):
+        theta, alpha = snapshot
+        if self.viewer is None:
+            self.viewer = QubeRendererVpython(theta, alpha)
+        self.viewer.render(theta, alpha)
+
+    def poll(self):
+        return True
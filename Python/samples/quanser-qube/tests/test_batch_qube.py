@@ -0,0 +1,50 @@
+"""
+Checks BatchQubeSession against TemplateSimulatorSession with the rk4
+integrator, through the assessment runner. Runs locally, no brain needed:
+
+pytest tests/test_batch_qube.py
+"""
+
+import json
+from functools import partial
+
+import numpy as np
+import pytest
+
+from main import BatchQubeSession, TemplateSimulatorSession
+from microsoft_bonsai_api.simulator.assessment import run_assessment
+from microsoft_bonsai_api.simulator.batch import VectorizedPolicy
+
+
+def push(states):
+    # drives the arm into the rails at different times per episode
+    return 3.0 + states[:, 2:3]
+
+
+def configs():
+    with open("assess_config.json") as fh:
+        return json.load(fh)["episodeConfigurations"][:6]
+
+
+def test_batch_session_matches_scalar_session():
+    policy = VectorizedPolicy(push, BatchQubeSession.state_fields, BatchQubeSession.action_fields)
+    make_sim = partial(TemplateSimulatorSession, log_data=False, integrator="rk4")
+    scalar = run_assessment(make_sim, policy, configs(), num_iterations=80, workers=1)
+    batched = run_assessment(
+        make_sim,
+        policy,
+        configs(),
+        num_iterations=80,
+        workers=1,
+        make_batch_sim=BatchQubeSession,
+    )
+    assert list(batched) == list(scalar)
+    for name in scalar:
+        np.testing.assert_allclose(batched[name], scalar[name], rtol=1e-9, atol=1e-9)
+    # episodes halt at different iterations
+    assert len(np.unique(np.bincount(scalar["episode"].astype(int))[1:])) > 1
+
+
+def test_batch_needs_one_frequency():
+    with pytest.raises(ValueError):
+        BatchQubeSession().episode_start([{"frequency": 80}, {"frequency": 100}])
@@ -0,0 +1,58 @@
+"""
+Checks the fixed-step RK4 integrator and the batch simulator against the
+odeint reference. Runs locally, no brain needed:
+
+pytest tests/test_integrator.py
+"""
+
+import numpy as np
+import pytest
+
+from sim.qube_simulator import BatchQubeSimulator, QubeSimulator
+
+initial = [0.1, np.pi - 0.05, 0.0, 0.0]
+
+
+def run(sim, voltages):
+    sim.state = np.array(initial)
+    for Vm in voltages:
+        sim.step(Vm)
+    return np.array(sim.state, dtype=float)
+
+
+def test_rk4_close_to_odeint():
+    voltages = np.random.default_rng(0).uniform(-3, 3, 160)
+    reference = run(QubeSimulator(), voltages)
+    state = run(QubeSimulator(integrator="rk4", substeps=4), voltages)
+    assert np.abs(state - reference).max() < 1e-4
+
+
+def test_batch_matches_scalar_rk4():
+    configs = [{"Lp": 0.129, "mp": 0.024, "Rm": 8.4}, {"Lp": 0.2, "mp": 0.05, "Rm": 6.0}]
+    voltages = np.random.default_rng(1).uniform(-3, 3, 80)
+
+    batch = BatchQubeSimulator(len(configs))
+    batch.reset(
+        {
+            "Lp": [c["Lp"] for c in configs],
+            "mp": [c["mp"] for c in configs],
+            "Rm": [c["Rm"] for c in configs],
+            "initial_theta": initial[0],
+            "initial_alpha": initial[1],
+            "initial_theta_dot": initial[2],
+            "initial_alpha_dot": initial[3],
+        }
+    )
+    for Vm in voltages:
+        batch.step(Vm)
+
+    for i, config in enumerate(configs):
+        sim = QubeSimulator(integrator="rk4")
+        sim.reset(config)
+        expected = run(sim, voltages)
+        np.testing.assert_allclose(batch.state[i], expected, rtol=1e-12, atol=1e-12)
+
+
+def test_unknown_integrator():
+    with pytest.raises(ValueError):
+        QubeSimulator(integrator="euler")
@@ -0,0 +1,37 @@
+"""
+Checks that QubeSimulator.restore returns to the state of a snapshot, and
+that a snapshot can be restored more than once:
+
+pytest tests/test_snapshot.py
+"""
+
+import numpy as np
+
+from sim.qube_simulator import QubeSimulator
+
+config = {
+    "Lp": 0.2,
+    "mp": 0.05,
+    "initial_theta": 0.1,
+    "initial_alpha": np.pi - 0.05,
+    "initial_theta_dot": 0.0,
+    "initial_alpha_dot": 0.0,
+}
+
+
+def test_restore_repeats_episode():
+    voltages = np.random.default_rng(0).uniform(-3, 3, 40)
+    sim = QubeSimulator(integrator="rk4")
+    sim.reset(config)
+    start = sim.snapshot()
+
+    runs = []
+    for _ in range(2):
+        sim.restore(start)
+        for Vm in voltages:
+            sim.step(Vm)
+        runs.append(np.array(sim.state, dtype=float))
+
+    np.testing.assert_array_equal(runs[0], runs[1])
+    assert sim.Lp == 0.2
+    np.testing.assert_array_equal(start["state"], [0.1, np.pi - 0.05, 0.0, 0.0])
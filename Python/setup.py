@@ -32,6 +32,12 @@ setup(
         "msrest>=0.6.0",
         "azure-core<2.0.0,>=1.2.0"
     ],
+    extras_require={
+        # assessment, batch, bridge, gc_policy, latency and render_process
+        "sim-tools": ["numpy>=1.15.1"],
+        # readers for logged trajectories return numpy arrays
+        "trajectory": ["numpy>=1.15.1", "pandas>=1.0.0"],
+    },
     test_suite="pytest",
     tests_require=["pytest>=5.4.2"],
 )
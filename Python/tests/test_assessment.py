@@ -0,0 +1,222 @@
+"""
+Tests for parallel policy assessment
+Copyright 2021 Microsoft
+"""
+
+import argparse
+import json
+import random
+
+import numpy as np
+import pytest
+
+from microsoft_bonsai_api.simulator import assessment
+from microsoft_bonsai_api.simulator.assessment import (
+    episode_seed,
+    load_episode_configs,
+    run_assessment,
+    run_batch_assessment,
+)
+from microsoft_bonsai_api.simulator.batch import DictPolicyAdapter, VectorizedPolicy
+
+
+class NoisySim:
+    """Random walk that ends once it leaves [-limit, limit]."""
+
+    def __init__(self, limit=5.0):
+        self.limit = limit
+
+    def episode_start(self, config):
+        self.position = config.get("start", 0.0) + random.uniform(-0.1, 0.1)
+        self.terminal = False
+
+    def get_state(self):
+        return {"position": self.position, "pair": [self.position, -self.position]}
+
+    def episode_step(self, action):
+        self.position += action["step"] + np.random.normal()
+        self.terminal = abs(self.position) > self.limit
+
+
+def random_step(state):
+    return {"step": random.choice([-0.5, 0.5])}
+
+
+CONFIGS = [{"start": float(i % 4)} for i in range(12)]
+
+
+def test_results_do_not_depend_on_workers():
+    single = run_assessment(NoisySim, random_step, CONFIGS, num_iterations=50, workers=1)
+    parallel = run_assessment(NoisySim, random_step, CONFIGS, num_iterations=50, workers=3)
+    assert list(single) == list(parallel)
+    for name in single:
+        np.testing.assert_array_equal(single[name], parallel[name])
+
+    other_seed = run_assessment(
+        NoisySim, random_step, CONFIGS, num_iterations=50, workers=1, seed=1
+    )
+    assert not np.array_equal(single["state_position"][:5], other_seed["state_position"][:5])
+
+
+def test_columns():
+    columns = run_assessment(NoisySim, random_step, CONFIGS[:3], num_iterations=20, workers=1)
+    assert list(columns) == [
+        "episode",
+        "iteration",
+        "state_position",
+        "state_pair_0",
+        "state_pair_1",
+        "action_step",
+    ]
+    episodes = columns["episode"]
+    assert list(np.unique(episodes)) == [1, 2, 3]
+    for episode in (1, 2, 3):
+        iterations = columns["iteration"][episodes == episode]
+        assert iterations[0] == 0
+        assert 1 <= iterations[-1] <= 20
+        np.testing.assert_array_equal(iterations, np.arange(len(iterations)))
+    # the initial state has no action
+    assert np.isnan(columns["action_step"][0])
+
+
+def test_terminal_ends_episode():
+    columns = run_assessment(
+        lambda: NoisySim(limit=0.0), random_step, [{}], num_iterations=100, workers=1
+    )
+    assert list(columns["iteration"]) == [0, 1]
+
+
+def test_output_files(tmp_path):
+    npz = str(tmp_path / "result.npz")
+    csv_path = str(tmp_path / "result.csv")
+    columns = run_assessment(
+        NoisySim, random_step, CONFIGS[:2], num_iterations=10, workers=1, output=npz
+    )
+    with np.load(npz) as stored:
+        np.testing.assert_array_equal(stored["state_position"], columns["state_position"])
+
+    run_assessment(NoisySim, random_step, CONFIGS[:2], num_iterations=10, workers=1, output=csv_path)
+    with open(csv_path) as fh:
+        assert fh.readline().strip().split(",")[:2] == ["episode", "iteration"]
+        assert len(fh.readlines()) == len(columns["episode"])
+
+    with pytest.raises(ValueError):
+        run_assessment(NoisySim, random_step, [{}], 1, workers=1, output="result.parquet")
+
+
+def test_episode_configs_and_seeds(tmp_path):
+    path = tmp_path / "assess_config.json"
+    path.write_text(json.dumps({"version": "1.0.0", "episodeConfigurations": CONFIGS}))
+    assert load_episode_configs(str(path)) == CONFIGS
+    assert episode_seed(0, 1) == episode_seed(0, 1)
+    assert len({episode_seed(0, e) for e in range(100)}) == 100
+
+
+class Drift:
+    """Deterministic sim whose episodes end at different iterations."""
+
+    def episode_start(self, config):
+        self.position = config["start"]
+        self.terminal = False
+
+    def get_state(self):
+        return {"position": self.position, "speed": config_speed(self.position)}
+
+    def episode_step(self, action):
+        self.position += action["push"]
+        self.terminal = self.position > 3
+
+
+class BatchDrift:
+    state_fields = ("position", "speed")
+    action_fields = ("push",)
+
+    def __init__(self, n):
+        self.n = n
+
+    def episode_start(self, configs):
+        self.position = np.array([config["start"] for config in configs])
+        self.terminal = np.zeros(len(configs), dtype=bool)
+
+    def get_states(self):
+        return np.stack([self.position, config_speed(self.position)], axis=1)
+
+    def episode_step(self, actions):
+        self.position = self.position + actions[:, 0]
+        self.terminal = self.position > 3
+
+
+def config_speed(position):
+    return position * 0.5
+
+
+def push(states):
+    return 0.25 + 0.1 * states[:, :1]
+
+
+DRIFT_CONFIGS = [{"start": 0.1 * i} for i in range(25)]
+
+
+def test_batch_assessment_matches_scalar():
+    policy = VectorizedPolicy(push, BatchDrift.state_fields, BatchDrift.action_fields)
+    scalar = run_assessment(Drift, policy, DRIFT_CONFIGS, num_iterations=12, workers=1)
+    for batch_size, workers in ((1, 1), (7, 1), (7, 2), (100, 1)):
+        batched = run_assessment(
+            Drift,
+            policy,
+            DRIFT_CONFIGS,
+            num_iterations=12,
+            workers=workers,
+            make_batch_sim=BatchDrift,
+            batch_size=batch_size,
+        )
+        assert list(batched) == list(scalar)
+        for name in scalar:
+            np.testing.assert_allclose(batched[name], scalar[name])
+    # episodes end at different iterations
+    assert len(np.unique(np.bincount(scalar["episode"].astype(int))[1:])) > 1
+
+
+def test_batch_sim_with_dict_policy_runs_episode_by_episode():
+    def dict_push(state):
+        return {"push": 0.25 + 0.1 * state["position"]}
+
+    columns = run_assessment(
+        Drift, dict_push, DRIFT_CONFIGS[:3], num_iterations=5, workers=1, make_batch_sim=BatchDrift
+    )
+    assert columns["iteration"].max() == 5
+
+    lifted = DictPolicyAdapter(dict_push, BatchDrift.state_fields, BatchDrift.action_fields)
+    batched = run_batch_assessment(BatchDrift, lifted, DRIFT_CONFIGS[:3], num_iterations=5)
+    np.testing.assert_allclose(batched["state_position"], columns["state_position"])
+
+    with pytest.raises(ValueError):
+        run_batch_assessment(BatchDrift, dict_push, DRIFT_CONFIGS, num_iterations=5)
+
+
+def scalar_push(state):
+    return {"push": 0.25 + 0.1 * state["position"]}
+
+
+def test_main(tmp_path, capsys):
+    parser = argparse.ArgumentParser()
+    assessment.add_arguments(parser)
+    output = str(tmp_path / "out.npz")
+    args = parser.parse_args(["--workers", "1", "--assess-output", output])
+    scenario_file = tmp_path / "scenarios.json"
+    scenario_file.write_text(json.dumps({"episodeConfigurations": DRIFT_CONFIGS[:4]}))
+
+    columns = assessment.main(
+        Drift,
+        scalar_push,
+        str(scenario_file),
+        5,
+        workers=args.workers,
+        output=args.assess_output,
+        make_batch_sim=BatchDrift,
+        batch_policies={scalar_push: push},
+    )
+    assert "Assessed 4 episodes" in capsys.readouterr().out
+    np.testing.assert_allclose(np.load(output)["state_position"], columns["state_position"])
+    scalar = run_assessment(Drift, scalar_push, DRIFT_CONFIGS[:4], num_iterations=5, workers=1)
+    np.testing.assert_allclose(columns["state_position"], scalar["state_position"])
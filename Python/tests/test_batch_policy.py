@@ -0,0 +1,54 @@
+"""
+Tests for batch policies
+Copyright 2021 Microsoft
+"""
+
+import sys
+
+import numpy as np
+import pytest
+
+from microsoft_bonsai_api.simulator.batch import (
+    DictPolicyAdapter,
+    VectorizedPolicy,
+    as_batch_policy,
+    is_batch_policy,
+)
+
+STATE_FIELDS = ("Tset", "Tin")
+ACTION_FIELDS = ("hvacON",)
+
+
+def p_controller(state):
+    return {"hvacON": int(0.2 * (state["Tset"] - state["Tin"]) < 0)}
+
+
+def p_controller_batch(states):
+    return (0.2 * (states[:, 0] - states[:, 1]) < 0).astype(float)
+
+
+def test_vectorized_policy():
+    policy = VectorizedPolicy(p_controller_batch, STATE_FIELDS, ACTION_FIELDS)
+    states = np.array([[20.0, 25.0], [25.0, 20.0], [22.0, 22.5]])
+    np.testing.assert_array_equal(policy.act(states), [[1.0], [0.0], [1.0]])
+    assert policy({"Tset": 20, "Tin": 25, "Tout": 30}) == {"hvacON": 1.0}
+    assert is_batch_policy(policy)
+    assert as_batch_policy(policy, STATE_FIELDS, ACTION_FIELDS) is policy
+
+
+def test_dict_policy_adapter_matches_vectorized():
+    rng = np.random.default_rng(0)
+    states = rng.uniform(18, 30, (200, 2))
+    lifted = as_batch_policy(p_controller, STATE_FIELDS, ACTION_FIELDS)
+    assert isinstance(lifted, DictPolicyAdapter)
+    assert not is_batch_policy(p_controller)
+    vectorized = VectorizedPolicy(p_controller_batch, STATE_FIELDS, ACTION_FIELDS)
+    np.testing.assert_array_equal(lifted.act(states), vectorized.act(states))
+    assert lifted({"Tset": 25, "Tin": 20}) == {"hvacON": 0}
+
+
+def test_missing_numpy_names_the_extra(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    policy = VectorizedPolicy(p_controller_batch, STATE_FIELDS, ACTION_FIELDS)
+    with pytest.raises(ImportError, match=r"microsoft-bonsai-api\[sim-tools\]"):
+        policy({"Tset": 20.0, "Tin": 25.0})
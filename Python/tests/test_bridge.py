@@ -0,0 +1,154 @@
+"""
+Tests for the shared-memory simulator bridge
+Copyright 2021 Microsoft
+"""
+
+import logging
+import multiprocessing
+import sys
+import time
+from multiprocessing import resource_tracker
+
+import pytest
+
+from microsoft_bonsai_api.simulator import bridge as bridge_module
+from microsoft_bonsai_api.simulator.bridge import BridgeLayout, SharedMemoryBridge, serve
+from microsoft_bonsai_api.simulator.description import numeric_fields, numeric_paths
+
+NUMBER = {"category": "Number"}
+DESCRIPTION = {
+    "state": {
+        "category": "Struct",
+        "fields": [
+            {"name": "position", "type": {"category": "Array", "length": 2, "type": NUMBER}},
+            {"name": "label", "type": {"category": "String"}},
+            {"name": "speed", "type": NUMBER},
+        ],
+    },
+    "action": {"category": "Struct", "fields": [{"name": "push", "type": NUMBER}]},
+    "config": {
+        "category": "Struct",
+        "fields": [{"name": "start", "type": NUMBER}, {"name": "speed", "type": NUMBER}],
+    },
+}
+
+
+class Walker:
+    def __init__(self):
+        self.position = [0.0, 0.0]
+        self.speed = 1.0
+
+    def episode_start(self, config):
+        self.position = [config.get("start", 0.0), 0.0]
+        self.speed = config.get("speed", 1.0)
+
+    def episode_step(self, action):
+        if action["push"] < 0:
+            raise ValueError("negative push")
+        self.position[0] += self.speed * action["push"]
+        self.position[1] += 1
+
+    def get_state(self):
+        return {"position": self.position, "label": "walker", "speed": self.speed}
+
+    def halted(self):
+        return self.position[1] >= 3
+
+
+class SlowWalker(Walker):
+    def episode_step(self, action):
+        time.sleep(1.0)
+        super().episode_step(action)
+
+
+def run_walker(name, sim=Walker):
+    serve(sim(), BridgeLayout.from_description(DESCRIPTION), name, poll_timeout=10)
+
+
+@pytest.fixture
+def bridge():
+    bridge = SharedMemoryBridge(BridgeLayout.from_description(DESCRIPTION), timeout=10)
+    process = multiprocessing.Process(target=run_walker, args=(bridge.name,), daemon=True)
+    process.start()
+    yield bridge
+    bridge.close()
+    process.join(5)
+
+
+def test_numeric_paths_match_fields():
+    for section in ("state", "action", "config"):
+        paths = numeric_paths(DESCRIPTION[section])
+        names = ["_".join(str(key) for key in path) for path in paths]
+        assert names == numeric_fields(DESCRIPTION[section])
+    assert numeric_paths(DESCRIPTION["state"]) == [("position", 0), ("position", 1), ("speed",)]
+
+
+def test_bridge_round_trip(bridge):
+    assert bridge.get_state() == {"position": [0.0, 0.0], "speed": 1.0}
+
+    # config leaves that are not given keep the simulator's defaults
+    bridge.episode_start({"start": 2.0})
+    assert bridge.get_state() == {"position": [2.0, 0.0], "speed": 1.0}
+
+    bridge.episode_step({"push": 0.5})
+    assert bridge.get_state() == {"position": [2.5, 1.0], "speed": 1.0}
+    assert bridge.states.tolist() == [2.5, 1.0, 1.0]
+    assert not bridge.halted()
+
+    bridge.episode_step({"push": 1.0})
+    bridge.episode_step({"push": 1.0})
+    assert bridge.halted()
+    bridge.episode_finish()
+
+
+def test_simulator_error_is_reported(bridge):
+    bridge.episode_start({"start": 0.0, "speed": 2.0})
+    with pytest.raises(RuntimeError):
+        bridge.episode_step({"push": -1.0})
+
+
+def test_simulator_slower_than_timeout():
+    bridge = SharedMemoryBridge(BridgeLayout.from_description(DESCRIPTION), timeout=0.2)
+    process = multiprocessing.Process(
+        target=run_walker, args=(bridge.name, SlowWalker), daemon=True
+    )
+    process.start()
+    try:
+        bridge.wait_ready(timeout=10)
+        with pytest.raises(TimeoutError):
+            bridge.episode_step({"push": 1.0})
+        # the step is still running, the bridge refuses further commands
+        with pytest.raises(RuntimeError):
+            bridge.episode_step({"push": 1.0})
+    finally:
+        bridge.close()
+    # the simulator finds CLOSE once the step returns, well before poll_timeout
+    process.join(5)
+    assert process.exitcode == 0
+
+
+@pytest.mark.skipif(
+    sys.version_info >= (3, 13) or sys.platform == "win32",
+    reason="attaches with track=False, or without a resource tracker",
+)
+@pytest.mark.parametrize("parent, unregistered", [(None, True), (object(), False)])
+def test_attach_unregisters_only_from_its_own_tracker(monkeypatch, parent, unregistered):
+    calls = []
+    monkeypatch.setattr(multiprocessing, "parent_process", lambda: parent)
+    monkeypatch.setattr(resource_tracker, "unregister", lambda *args: calls.append(args))
+    bridge = SharedMemoryBridge(BridgeLayout.from_description(DESCRIPTION))
+    try:
+        shm = bridge_module._attach(bridge.name)
+        shm.close()
+    finally:
+        monkeypatch.undo()
+        bridge.close()
+    assert calls == ([("/" + bridge.name, "shared_memory")] if unregistered else [])
+
+
+def test_warns_without_store_order(monkeypatch, caplog):
+    monkeypatch.setattr(bridge_module.platform, "machine", lambda: "arm64")
+    with caplog.at_level(logging.WARNING, logger=bridge_module.__name__):
+        bridge = SharedMemoryBridge(BridgeLayout.from_description(DESCRIPTION))
+        bridge.close()
+    assert "store ordering" in caplog.text
@@ -0,0 +1,56 @@
+"""
+Tests for EnvPool
+Copyright 2021 Microsoft
+"""
+
+import json
+
+from microsoft_bonsai_api.simulator.env_pool import EnvPool, scenario_env_names
+
+
+class FakeEnv:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_reuses_one_env_per_name():
+    made = []
+    pool = EnvPool(make=lambda name: made.append(name) or FakeEnv(name))
+    first = pool.get("a")
+    assert pool.get("a") is first
+    pool.prewarm(["a", "b", "b"])
+    assert made == ["a", "b"]
+
+    pool.close()
+    assert first.closed and not pool.envs
+
+
+def test_without_reuse_closes_the_replaced_env():
+    with EnvPool(make=FakeEnv, reuse=False) as pool:
+        first = pool.get("a")
+        second = pool.get("a")
+        assert second is not first
+        assert first.closed and not second.closed
+    assert second.closed
+
+
+def test_scenario_env_names(tmp_path):
+    scenarios = tmp_path / "scenarios.json"
+    scenarios.write_text(
+        json.dumps(
+            {
+                "episodeConfigurations": [
+                    {"env_name": "b"},
+                    {},
+                    {"env_name": "c"},
+                    {"env_name": "b"},
+                ]
+            }
+        )
+    )
+    assert scenario_env_names(str(scenarios), default="a") == ["a", "b", "c"]
+    assert scenario_env_names(str(tmp_path / "missing.json"), default="a") == ["a"]
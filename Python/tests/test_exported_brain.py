@@ -0,0 +1,85 @@
+"""
+Tests for the exported brain clients
+Copyright 2021 Microsoft
+"""
+
+import asyncio
+
+import pytest
+import requests
+
+from microsoft_bonsai_api.simulator.exported_brain import (
+    ExportedBrainClient,
+    ExportedBrainClientAsync,
+    shared_client,
+)
+
+URL = "http://127.0.0.1:9000"
+
+
+def connections():
+    return requests.get(URL + "/stub/connections").json()["count"]
+
+
+def test_predict_reuses_connection():
+    before = connections()
+    with ExportedBrainClient(URL) as client:
+        for i in range(50):
+            assert client.predict({"cart_position": i}) == {"command": -i}
+        assert client({"cart_position": 1.5}) == {"command": -1.5}
+    assert connections() - before == 1
+
+
+def test_predict_many_keeps_order():
+    states = [{"cart_position": i} for i in range(40)]
+    with ExportedBrainClient(URL, pool_size=4) as client:
+        actions = client.predict_many(states)
+    assert actions == [{"command": -i} for i in range(40)]
+
+
+def test_predict_many_one_session_per_thread():
+    states = [{"cart_position": i} for i in range(40)]
+    before = connections()
+    with ExportedBrainClient(URL, pool_size=4) as client:
+        for _ in range(3):
+            assert client.predict_many(states) == [{"command": -i} for i in range(40)]
+        assert len(client._sessions) <= 4
+        assert len(set(map(id, client._sessions))) == len(client._sessions)
+    assert connections() - before <= 4
+
+
+def test_shared_client():
+    client = shared_client(URL + "/")
+    assert shared_client(URL) is client
+    assert client.predict({"cart_position": 3}) == {"command": -3}
+
+
+def test_forget_memory():
+    with ExportedBrainClient(URL) as client:
+        assert client.forget_memory()
+
+
+def test_http_error():
+    with ExportedBrainClient(URL) as client:
+        with pytest.raises(requests.HTTPError):
+            client.predict({"fail": 1})
+
+
+def test_async_predict_many():
+    async def run():
+        async with ExportedBrainClientAsync(URL, pool_size=8) as client:
+            assert await client.forget_memory()
+            first = await client.predict({"cart_position": 2})
+            states = [{"cart_position": i} for i in range(100)]
+            return first, await client.predict_many(states)
+
+    first, actions = asyncio.run(run())
+    assert first == {"command": -2}
+    assert actions == [{"command": -i} for i in range(100)]
+
+
+def test_invalid_pool_size():
+    with pytest.raises(ValueError):
+        ExportedBrainClient(URL, pool_size=0)
+    with pytest.raises(ValueError):
+        ExportedBrainClientAsync(URL, pool_size=0)
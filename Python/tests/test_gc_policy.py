@@ -0,0 +1,82 @@
+"""
+Tests for the simulator loop's garbage-collection policy
+Copyright 2021 Microsoft
+"""
+
+import gc
+
+import pytest
+
+from microsoft_bonsai_api.simulator.gc_policy import GCPolicy, rss_mb
+
+
+@pytest.fixture
+def policy():
+    policy = GCPolicy(rss_limit_mb=None)
+    yield policy
+    policy.close()
+    gc.unfreeze()
+
+
+def make_cycles(count):
+    for _ in range(count):
+        node = {}
+        node["self"] = node
+
+
+def test_collection_is_deferred_to_episode_end(policy):
+    policy.after_registration()
+    assert gc.get_freeze_count() > 0
+    assert policy.collections == [0, 0, 0]
+
+    policy.on_event("EpisodeStart")
+    assert not gc.isenabled()
+    for _ in range(10):
+        policy.on_event("EpisodeStep")
+        make_cycles(2000)
+    assert policy.collections == [0, 0, 0]
+
+    policy.on_event("EpisodeFinish")
+    assert gc.isenabled()
+    assert policy.collections[2] == 1
+
+    # nothing was deferred, so idling does not collect again
+    policy.on_event("Idle")
+    assert policy.collections[2] == 1
+
+
+def test_max_deferred_steps():
+    policy = GCPolicy(max_deferred_steps=3)
+    try:
+        policy.on_event("EpisodeStart")
+        for _ in range(7):
+            policy.on_event("EpisodeStep")
+        assert policy.collections[0] == 2
+        assert not gc.isenabled()
+    finally:
+        policy.close()
+    assert gc.isenabled()
+
+
+def test_disabled_policy_leaves_gc_alone():
+    policy = GCPolicy(defer=False)
+    try:
+        policy.on_event("EpisodeStart")
+        assert gc.isenabled()
+    finally:
+        policy.close()
+
+
+def test_report_and_recycle(policy):
+    for ms in range(1, 101):
+        policy.record_step(ms / 1e3)
+    report = policy.report()
+    assert report["steps"] == 100
+    assert report["p50_ms"] == pytest.approx(50.5)
+    assert report["p99_ms"] == pytest.approx(99.01)
+    assert report["max_ms"] == pytest.approx(100)
+
+    assert rss_mb() > 0
+    assert not policy.should_recycle()
+    policy.rss_limit_mb = 1
+    assert policy.should_recycle()
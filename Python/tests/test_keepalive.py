@@ -0,0 +1,115 @@
+"""
+Tests for the session keep-alive
+Copyright 2021 Microsoft
+"""
+
+import threading
+import time
+
+import pytest
+from azure.core.exceptions import (
+    HttpResponseError,
+    ServiceRequestError,
+    ServiceResponseError,
+)
+
+from microsoft_bonsai_api.simulator.generated.models import Event, SimulatorState
+from microsoft_bonsai_api.simulator.keepalive import KeepAlive, heartbeat_interval
+
+
+class FakeSession:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.sent = []
+        self.threads = set()
+
+    def advance(self, workspace_name, session_id, body):
+        self.sent.append((session_id, body))
+        self.threads.add(threading.get_ident())
+        reply = self.replies.pop(0) if self.replies else idle()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+class FakeClient:
+    def __init__(self, replies=()):
+        self.session = FakeSession(replies)
+
+
+STATE = SimulatorState(sequence_id=4, state={"value": 1}, halted=False)
+PENDING = Event(type="EpisodeStep", session_id="s", sequence_id=5)
+
+
+def idle():
+    return Event(type="Idle", session_id="s", sequence_id=5)
+
+
+def slow_step(seconds):
+    def step():
+        time.sleep(seconds)
+        return "stepped"
+
+    return step
+
+
+def test_fast_step_sends_no_heartbeat():
+    client = FakeClient()
+    with KeepAlive(client, "ws", interval=0.5) as keepalive:
+        result, interrupt = keepalive.run(lambda: 42, "s", STATE, PENDING)
+    assert result == 42 and interrupt is None
+    assert client.session.sent == []
+
+
+def test_slow_step_resends_last_state():
+    client = FakeClient([idle(), PENDING, idle()])
+    with KeepAlive(client, "ws", interval=0.02) as keepalive:
+        result, interrupt = keepalive.run(slow_step(0.15), "s", STATE, PENDING)
+    assert result == "stepped" and interrupt is None
+    assert keepalive.heartbeats >= 3
+    assert all(sent == ("s", STATE) for sent in client.session.sent)
+    # heartbeats come from the calling thread, never the step's
+    assert client.session.threads == {threading.get_ident()}
+
+
+def test_unexpected_reply_stops_heartbeats():
+    unregister = Event(type="Unregister", session_id="s", sequence_id=6)
+    client = FakeClient([idle(), unregister])
+    with KeepAlive(client, "ws", interval=0.02) as keepalive:
+        result, interrupt = keepalive.run(slow_step(0.2), "s", STATE, PENDING)
+    assert result == "stepped"
+    assert interrupt is unregister
+    assert len(client.session.sent) == 2
+
+
+def test_failed_heartbeat_is_retried():
+    client = FakeClient([HttpResponseError("gateway"), idle()])
+    with KeepAlive(client, "ws", interval=0.02) as keepalive:
+        _, interrupt = keepalive.run(slow_step(0.1), "s", STATE, PENDING)
+    assert interrupt is None
+    assert len(client.session.sent) >= 2
+
+
+def test_connection_error_is_retried():
+    client = FakeClient(
+        [ServiceRequestError("refused"), ServiceResponseError("reset"), idle()]
+    )
+    with KeepAlive(client, "ws", interval=0.02) as keepalive:
+        result, interrupt = keepalive.run(slow_step(0.15), "s", STATE, PENDING)
+    assert result == "stepped" and interrupt is None
+    assert len(client.session.sent) >= 3
+
+
+def test_step_exception_is_raised():
+    def step():
+        raise RuntimeError("diverged")
+
+    with KeepAlive(FakeClient(), "ws", interval=0.02) as keepalive:
+        with pytest.raises(RuntimeError, match="diverged"):
+            keepalive.run(step, "s", STATE, PENDING)
+
+
+def test_interval():
+    assert heartbeat_interval(60) == 20
+    with pytest.raises(ValueError):
+        KeepAlive(FakeClient(), "ws", interval=0)
@@ -0,0 +1,87 @@
+"""
+Tests for simulator latency injection
+Copyright 2021 Microsoft
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from microsoft_bonsai_api.simulator.latency import (
+    DISTRIBUTIONS,
+    LatencyInjector,
+    sample_delays,
+)
+
+
+@pytest.mark.parametrize("distribution", DISTRIBUTIONS)
+def test_sample_delays_mean(distribution):
+    rng = np.random.default_rng(0)
+    delays = sample_delays(rng, distribution, 0.5, 0.1, 20000)
+    assert delays.shape == (20000,)
+    assert delays.min() >= 0
+    assert delays.mean() == pytest.approx(0.5, rel=0.02)
+
+
+def test_truncnorm_bounds():
+    rng = np.random.default_rng(0)
+    delays = sample_delays(rng, "truncnorm", 3.0, 1.0, 20000)
+    assert delays.min() >= 0.0 and delays.max() <= 6.0
+    assert delays.std() == pytest.approx(1.0, rel=0.05)
+
+    # the lower bound is clipped at zero rather than piling up there
+    delays = sample_delays(rng, "truncnorm", 0.1, 0.1, 20000)
+    assert delays.min() > 0.0 and delays.max() <= 0.4
+
+
+def test_next_delay_refills_blocks():
+    latency = LatencyInjector(1.0, 0.2, block_size=8, seed=1)
+    first = [latency.next_delay() for _ in range(20)]
+    again = LatencyInjector(1.0, 0.2, block_size=8, seed=1)
+    assert [again.next_delay() for _ in range(20)] == first
+    assert len(set(first)) == 20
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        LatencyInjector(-1.0)
+    with pytest.raises(ValueError):
+        LatencyInjector(1.0, distribution="gamma")
+    with pytest.raises(ValueError):
+        LatencyInjector(1.0, block_size=0)
+
+
+def test_zero_mean_does_not_sleep():
+    latency = LatencyInjector(0.0)
+    assert latency.sleep() == 0.0
+    assert latency.stats()["count"] == 0
+
+
+def test_sleep_records_applied_delays():
+    latency = LatencyInjector(0.002, 0.001, seed=0, history=4)
+    delays = [latency.sleep() for _ in range(6)]
+    np.testing.assert_array_equal(latency.applied, delays[-4:])
+    stats = latency.stats()
+    assert stats["count"] == 6
+    assert stats["total"] == pytest.approx(sum(delays))
+    # overshoot is carried into later sleeps
+    assert stats["slept"] < sum(delays) + 0.02
+
+
+def test_sleep_async_does_not_block_the_loop():
+    latency = LatencyInjector(0.05, distribution="constant")
+    ticks = []
+
+    async def ticker():
+        for _ in range(3):
+            ticks.append(1)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        return await asyncio.gather(latency.sleep_async(), ticker())
+
+    delay, _ = asyncio.run(run())
+    assert delay == 0.05
+    assert len(ticks) == 3
+    assert latency.stats()["slept"] >= 0.05
@@ -0,0 +1,54 @@
+"""
+Tests for RenderProcess
+Copyright 2021 Microsoft
+"""
+
+import time
+
+from microsoft_bonsai_api.simulator.render_process import RenderProcess
+
+
+class CountingRenderer:
+    """Reports frames drawn and the last value seen through `feedback`."""
+
+    def __init__(self, feedback):
+        self.feedback = feedback
+        self.feedback[:] = 0
+
+    def draw(self, snapshot):
+        self.feedback[0] += 1
+        self.feedback[1] = snapshot[0]
+        # snapshots are never torn
+        assert snapshot[1] == -snapshot[0]
+
+    def poll(self):
+        return self.feedback[1] >= 0
+
+
+def test_intermediate_snapshots_are_dropped():
+    renderer = RenderProcess(CountingRenderer, 2, fps=50, feedback=2)
+    try:
+        published = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.5:
+            published += 1
+            renderer.publish([published, -published])
+        renderer.publish([published, -published])
+        time.sleep(0.2)
+        frames, last = renderer.feedback
+        assert last == published
+        assert 1 <= frames <= 40
+        assert frames < published
+        assert not renderer.closed
+    finally:
+        renderer.close()
+
+
+def test_closed_when_renderer_stops():
+    renderer = RenderProcess(CountingRenderer, 2, fps=50, feedback=2)
+    renderer.publish([-1, 1])
+    deadline = time.perf_counter() + 5
+    while not renderer.closed and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert renderer.closed
+    renderer.close()
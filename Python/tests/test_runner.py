@@ -0,0 +1,182 @@
+"""
+Tests for the asyncio session runner
+Copyright 2021 Microsoft
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from microsoft_bonsai_api.simulator.client import BonsaiClientAsync, BonsaiClientConfig
+from microsoft_bonsai_api.simulator.generated.models import SimulatorInterface
+from microsoft_bonsai_api.simulator.runner import (
+    SyncSimulatorAdapter,
+    as_async_simulator,
+    run_simulator,
+    run_simulators,
+)
+
+WAIT = 0.05
+
+
+class ExternalSolverSim:
+    """Stands in for a sim awaiting an external process on every step."""
+
+    def __init__(self):
+        self.steps = 0
+        self.episodes = 0
+
+    async def episode_start(self, config):
+        self.episodes += 1
+
+    async def episode_step(self, action):
+        await asyncio.sleep(WAIT)
+        self.steps += 1
+
+    def get_state(self):
+        return {"steps": self.steps}
+
+
+class BlockingSim:
+    def __init__(self):
+        self.steps = 0
+        self.threads = set()
+
+    def episode_start(self, config):
+        pass
+
+    def episode_step(self, action):
+        self.threads.add(threading.get_ident())
+        time.sleep(WAIT)
+        self.steps += 1
+
+    def get_state(self):
+        return {"steps": self.steps}
+
+    def halted(self):
+        return False
+
+
+def make_client():
+    config = BonsaiClientConfig()
+    config.server = "http://127.0.0.1:9000"
+    config.workspace = "runner"
+    config.access_key = "111"
+    return BonsaiClientAsync(config)
+
+
+def run(sims, max_events):
+    async def main():
+        async with make_client() as client:
+            interface = SimulatorInterface(name="a", timeout=1)
+            return await run_simulators(
+                client, "runner", interface, sims, max_events=max_events
+            )
+
+    start = time.perf_counter()
+    counts = asyncio.run(main())
+    return counts, time.perf_counter() - start
+
+
+def test_adapter_selection():
+    sim = ExternalSolverSim()
+    assert as_async_simulator(sim) is sim
+    assert isinstance(as_async_simulator(BlockingSim()), SyncSimulatorAdapter)
+
+
+def test_async_sims_overlap_their_waits():
+    sims = [ExternalSolverSim() for _ in range(4)]
+    counts, elapsed = run(sims, max_events=11)
+    assert all(sum(c.values()) == 11 for c in counts)
+    steps = sum(sim.steps for sim in sims)
+    assert steps == sum(c.get("EpisodeStep", 0) for c in counts)
+    assert elapsed < steps * WAIT
+
+
+def test_sync_sims_run_on_the_thread_pool():
+    sims = [BlockingSim() for _ in range(3)]
+    counts, elapsed = run(sims, max_events=6)
+    steps = sum(sim.steps for sim in sims)
+    assert steps == sum(c.get("EpisodeStep", 0) for c in counts)
+    assert all(threading.get_ident() not in sim.threads for sim in sims)
+    assert elapsed < steps * WAIT
+
+
+class FakeSessions:
+    """Session operations of a BonsaiClientAsync, without a server."""
+
+    def __init__(self, failing_advances=(), failing_delete=False):
+        self.failing_advances = set(failing_advances)
+        self.failing_delete = failing_delete
+        self.created = 0
+        self.advances = 0
+        self.deleted = []
+
+    async def create(self, workspace_name, interface):
+        self.created += 1
+        return SimpleNamespace(session_id="session-{}".format(self.created))
+
+    async def advance(self, workspace_name, session_id, body):
+        self.advances += 1
+        await asyncio.sleep(0)
+        if self.advances in self.failing_advances:
+            raise HttpResponseError(message="Service Unavailable")
+        if body.sequence_id == 1:
+            return SimpleNamespace(
+                type="EpisodeStart", sequence_id=2, episode_start=SimpleNamespace(config={})
+            )
+        return SimpleNamespace(
+            type="EpisodeStep",
+            sequence_id=body.sequence_id + 1,
+            episode_step=SimpleNamespace(action={}),
+        )
+
+    async def delete(self, workspace_name, session_id):
+        self.deleted.append(session_id)
+        if self.failing_delete:
+            raise HttpResponseError(message="Service Unavailable")
+
+
+class FailingSim(ExternalSolverSim):
+    async def episode_step(self, action):
+        raise ValueError("solver diverged")
+
+
+def run_fake(sessions, sims, max_events=None):
+    client = SimpleNamespace(session=sessions)
+    interface = SimulatorInterface(name="a", timeout=1)
+    return asyncio.run(run_simulators(client, "runner", interface, sims, max_events))
+
+
+def test_failed_advance_registers_again():
+    sessions = FakeSessions(failing_advances=[3])
+    counts = run_fake(sessions, [ExternalSolverSim()], max_events=5)
+    assert sessions.created == 2
+    # the failed advance is not an event; the new session starts over
+    assert counts == [{"EpisodeStart": 2, "EpisodeStep": 3}]
+    # the session of the failed advance is not left registered
+    assert sessions.deleted == ["session-1", "session-2"]
+
+
+def test_delete_error_does_not_replace_the_sim_error():
+    sessions = FakeSessions(failing_delete=True)
+    client = SimpleNamespace(session=sessions)
+    interface = SimulatorInterface(name="a", timeout=1)
+    with pytest.raises(ValueError, match="solver diverged"):
+        asyncio.run(run_simulator(client, "runner", interface, FailingSim()))
+    assert sessions.deleted == ["session-1"]
+
+
+def test_error_cancels_the_other_sessions():
+    sessions = FakeSessions()
+    sims = [ExternalSolverSim(), FailingSim(), ExternalSolverSim()]
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="solver diverged"):
+        # without the cancellation the other sessions would run forever
+        run_fake(sessions, sims)
+    assert time.perf_counter() - start < 10 * WAIT
+    assert sorted(sessions.deleted) == ["session-1", "session-2", "session-3"]
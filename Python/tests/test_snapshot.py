@@ -0,0 +1,75 @@
+"""
+Tests for simulator snapshots
+Copyright 2021 Microsoft
+"""
+
+import pytest
+
+from microsoft_bonsai_api.simulator.snapshot import (
+    SnapshotCache,
+    config_key,
+    supports_snapshots,
+)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.resets = 0
+
+    def reset(self, config):
+        self.resets += 1
+        self.value = config["start"]
+
+    def step(self):
+        self.value += 1
+
+    def snapshot(self):
+        return {"value": self.value}
+
+    def restore(self, snapshot):
+        self.value = snapshot["value"]
+
+
+def start(cache, sim, config):
+    if not cache.restore(sim, config):
+        sim.reset(config)
+        cache.save(sim, config)
+
+
+def test_cache_restores_post_reset_state():
+    sim = Counter()
+    cache = SnapshotCache()
+    assert supports_snapshots(sim)
+
+    start(cache, sim, {"start": 3})
+    sim.step()
+    sim.step()
+    start(cache, sim, {"start": 3})
+    assert sim.value == 3
+    assert sim.resets == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    start(cache, sim, {"start": 7})
+    assert sim.value == 7
+    assert sim.resets == 2
+    assert {"start": 3} in cache
+
+
+def test_cache_evicts_least_recently_used():
+    sim = Counter()
+    cache = SnapshotCache(maxsize=2)
+    for config in ({"start": 1}, {"start": 2}, {"start": 1}, {"start": 3}):
+        start(cache, sim, config)
+    assert len(cache) == 2
+    assert {"start": 1} in cache
+    assert {"start": 2} not in cache
+
+    with pytest.raises(ValueError):
+        SnapshotCache(maxsize=0)
+
+
+def test_config_key_ignores_key_order():
+    assert config_key({"a": 1, "b": 2.5}) == config_key({"b": 2.5, "a": 1})
+    assert config_key({"a": 1}) != config_key({"a": 2})
+    assert config_key(None) == config_key(None)
@@ -0,0 +1,183 @@
+"""
+Tests for the binary trajectory store
+Copyright 2021 Microsoft
+"""
+
+import csv
+import json
+import math
+import os
+
+import pytest
+
+from microsoft_bonsai_api.simulator.description import description_columns
+from microsoft_bonsai_api.simulator.trajectory import (
+    BinaryTrajectoryReader,
+    BinaryTrajectoryWriter,
+    binary_to_csv,
+    csv_to_binary,
+)
+
+np = pytest.importorskip("numpy")
+
+DESCRIPTION = {
+    "state": {
+        "category": "Struct",
+        "fields": [
+            {"name": "x", "type": {"category": "Number"}},
+            {
+                "name": "v",
+                "type": {
+                    "category": "Array",
+                    "length": 2,
+                    "type": {"category": "Number"},
+                },
+            },
+            {"name": "label", "type": {"category": "String"}},
+        ],
+    },
+    "action": {
+        "category": "Struct",
+        "fields": [{"name": "command", "type": {"category": "Number"}}],
+    },
+}
+
+
+def test_description_columns():
+    assert description_columns(DESCRIPTION) == [
+        "state_x",
+        "state_v_0",
+        "state_v_1",
+        "action_command",
+    ]
+
+
+def write_episodes(path, episodes, steps, chunk_rows=7):
+    interface = {"name": "test", "description": DESCRIPTION}
+    with BinaryTrajectoryWriter.from_interface(
+        path, interface, chunk_rows=chunk_rows
+    ) as writer:
+        for episode in range(1, episodes + 1):
+            for iteration in range(steps):
+                writer.append(
+                    {
+                        "state_x": episode * 100 + iteration,
+                        "state_v_0": 0.5,
+                        "action_command": None if iteration == 0 else -1,
+                        "episode": episode,
+                        "iteration": iteration,
+                    }
+                )
+    return writer
+
+
+def test_episode_slices(tmp_path):
+    path = str(tmp_path / "store")
+    write_episodes(path, episodes=20, steps=5)
+
+    with BinaryTrajectoryReader(path) as reader:
+        assert reader.num_rows == 100
+        assert len(reader) == 20
+        assert list(reader.episode_numbers[:3]) == [1, 2, 3]
+        episode = reader.episode(12)
+        assert episode.shape == (5, 6)
+        assert list(episode[:, reader.columns.index("state_x")]) == [
+            1300,
+            1301,
+            1302,
+            1303,
+            1304,
+        ]
+        assert math.isnan(episode[0, reader.columns.index("action_command")])
+        assert np.isnan(reader.column("state_v_1")).all()
+        with pytest.raises(IndexError):
+            reader.episode(20)
+
+
+def test_append_to_existing_store(tmp_path):
+    path = str(tmp_path / "store")
+    write_episodes(path, episodes=2, steps=3)
+    with BinaryTrajectoryWriter(path) as writer:
+        writer.start_episode()
+        writer.append({"state_x": 42, "iteration": 0})
+
+    with BinaryTrajectoryReader(path) as reader:
+        assert reader.num_rows == 7
+        assert list(reader.episode_numbers) == [1, 2, 3]
+        assert reader.episode(-1)[0, 0] == 42
+
+
+def test_uncommitted_rows_are_invisible(tmp_path):
+    path = str(tmp_path / "store")
+    writer = BinaryTrajectoryWriter(path, ["a", "episode"])
+    writer.append({"a": 1, "episode": 1})
+    writer.flush()
+    writer.append({"a": 2, "episode": 2})
+
+    with BinaryTrajectoryReader(path) as reader:
+        assert reader.num_rows == 1
+        assert reader.num_episodes == 1
+    writer.close()
+
+    with BinaryTrajectoryReader(path) as reader:
+        assert reader.num_rows == 2
+        assert reader.num_episodes == 2
+    assert os.path.getsize(os.path.join(path, "data.f64")) == 32 + 2 * 2 * 8
+
+
+def test_reopen_after_crash_drops_uncommitted_episodes(tmp_path):
+    path = str(tmp_path / "store")
+    writer = BinaryTrajectoryWriter(path, ["a", "episode"])
+    writer.append({"a": 1, "episode": 1})
+    writer.flush()
+    writer.append({"a": 2, "episode": 2})
+    writer.append({"a": 3, "episode": 3})
+    # crash: index entries reached the disk, the header commit did not
+    writer._index.flush()
+    writer._index.write(b"\x01\x02\x03")
+    writer._index.close()
+    writer._mm.close()
+    writer._data.close()
+
+    with BinaryTrajectoryWriter(path) as writer:
+        assert writer.num_rows == 1
+        assert writer.num_episodes == 1
+        writer.append({"a": 4, "episode": 4})
+
+    with BinaryTrajectoryReader(path) as reader:
+        assert list(reader.episode_numbers) == [1, 4]
+        assert reader.episode(1)[:, 0].tolist() == [4]
+    assert os.path.getsize(os.path.join(path, "episodes.idx")) == 2 * 16
+
+
+def test_csv_round_trip(tmp_path):
+    source = str(tmp_path / "log.csv")
+    with open(source, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["state_x", "state_ok", "action_command", "episode", "iteration"])
+        writer.writerow([0.25, "True", "", 1, 1])
+        writer.writerow([0.5, "False", -1, 1, 2])
+        writer.writerow([1e-17, "True", 1, 2, 1])
+
+    store = str(tmp_path / "store")
+    assert csv_to_binary(source, store) == 3
+    with BinaryTrajectoryReader(store) as reader:
+        assert reader.num_episodes == 2
+        assert reader.episode(1)[0, 0] == 1e-17
+
+    result = str(tmp_path / "out.csv")
+    assert binary_to_csv(store, result) == 3
+    with open(result, newline="") as fh:
+        rows = list(csv.reader(fh))
+    assert rows[0] == ["state_x", "state_ok", "action_command", "episode", "iteration"]
+    assert rows[1] == ["0.25", "1", "", "1", "1"]
+    assert rows[3] == ["1e-17", "1", "1", "2", "1"]
+
+
+def test_mismatched_columns_raise(tmp_path):
+    path = str(tmp_path / "store")
+    BinaryTrajectoryWriter(path, ["a"]).close()
+    with pytest.raises(ValueError):
+        BinaryTrajectoryWriter(path, ["b"])
+    with open(os.path.join(path, "meta.json")) as fh:
+        assert json.load(fh)["columns"] == ["a"]
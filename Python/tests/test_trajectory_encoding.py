@@ -0,0 +1,129 @@
+"""
+Tests for delta-encoded trajectory logs
+Copyright 2021 Microsoft
+"""
+
+import csv
+import os
+
+import pytest
+
+from microsoft_bonsai_api.simulator.trajectory import (
+    DELTA_MARKER,
+    AsyncTrajectorySink,
+    RotatingTrajectoryLog,
+    csv_to_binary,
+    csv_to_delta,
+    delta_to_csv,
+    is_delta_encoded,
+    iter_episodes,
+    read_episodes,
+)
+
+
+def cartpole_rows(episodes=4, iterations=50):
+    for episode in range(1, episodes + 1):
+        for i in range(iterations):
+            yield {
+                "episode": episode,
+                "iteration": i,
+                "state_cart_position": round(0.01 * i * episode, 6),
+                "state_pole_angle": round(-0.003 * i, 6),
+                "action_command": 1 if i % 7 < 3 else -1,
+                "config_cart_mass": 0.31 + 0.01 * episode,
+                "config_pole_length": 0.4,
+                "config_initial_cart_position": 0.05 * episode,
+                "halted": False,
+            }
+
+
+def write(path, rows, **kwargs):
+    with AsyncTrajectorySink(path, **kwargs) as sink:
+        for row in rows:
+            sink.log(row)
+
+
+def test_delta_smaller_and_marked(tmp_path):
+    plain, delta = str(tmp_path / "plain.csv"), str(tmp_path / "delta.csv")
+    write(plain, cartpole_rows())
+    write(delta, cartpole_rows(), encoding="delta")
+
+    assert not is_delta_encoded(plain)
+    assert is_delta_encoded(delta)
+    with open(delta) as fh:
+        assert fh.readline().strip() == DELTA_MARKER
+    assert os.path.getsize(delta) < 0.6 * os.path.getsize(plain)
+
+
+def test_delta_round_trip(tmp_path):
+    plain, delta = str(tmp_path / "plain.csv"), str(tmp_path / "delta.csv")
+    decoded = str(tmp_path / "decoded.csv")
+    write(plain, cartpole_rows())
+    assert csv_to_delta(plain, delta) == 200
+    assert delta_to_csv(delta, decoded) == 200
+
+    with open(plain) as a, open(decoded) as b:
+        assert a.read() == b.read()
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 65536])
+def test_iter_episodes_decodes(tmp_path, chunk_rows):
+    pytest.importorskip("pandas")
+    plain, delta = str(tmp_path / "plain.csv"), str(tmp_path / "delta.csv")
+    write(plain, cartpole_rows())
+    write(delta, cartpole_rows(), encoding="delta")
+
+    kwargs = dict(episodes={2, 4}, iterations=range(10, 40), chunk_rows=chunk_rows)
+    expected = list(iter_episodes(plain, **kwargs))
+    actual = list(iter_episodes(delta, **kwargs))
+    assert [b.episode for b in actual] == [2, 4]
+    for a, b in zip(expected, actual):
+        assert a.columns == b.columns
+        assert (a.data == b.data).all()
+
+
+def test_missing_values_are_not_repeats(tmp_path):
+    pytest.importorskip("pandas")
+    path = str(tmp_path / "delta.csv")
+    rows = [
+        {"episode": 1, "iteration": 0, "x": 1.5},
+        {"episode": 1, "iteration": 1},
+        {"episode": 1, "iteration": 2, "x": 1.5},
+    ]
+    write(path, rows, fieldnames=["episode", "iteration", "x"], encoding="delta")
+
+    (block,) = iter_episodes(path)
+    x = block.column("x")
+    assert x[0] == 1.5 and x[1] != x[1] and x[2] == 1.5
+
+
+def test_rotating_delta_segments(tmp_path):
+    pytest.importorskip("pandas")
+    with RotatingTrajectoryLog(str(tmp_path), max_episodes=1, encoding="delta") as log:
+        for row in cartpole_rows(episodes=3, iterations=5):
+            log.log(row)
+            if row["iteration"] == 4:
+                log.episode_finish()
+
+    blocks = list(read_episodes(log.manifest_path))
+    assert [b.episode for b in blocks] == [1, 2, 3]
+    assert blocks[2].column("config_pole_length").tolist() == [0.4] * 5
+
+
+def test_csv_to_binary_decodes(tmp_path):
+    pytest.importorskip("numpy")
+    from microsoft_bonsai_api.simulator.trajectory import BinaryTrajectoryReader
+
+    delta = str(tmp_path / "delta.csv")
+    write(delta, cartpole_rows(episodes=2, iterations=5), encoding="delta")
+    store = str(tmp_path / "store")
+    assert csv_to_binary(delta, store) == 10
+    with BinaryTrajectoryReader(store) as reader:
+        assert reader.column("config_pole_length").tolist() == [0.4] * 10
+
+
+def test_append_encoding_mismatch(tmp_path):
+    path = str(tmp_path / "plain.csv")
+    write(path, cartpole_rows(episodes=1, iterations=2))
+    with pytest.raises(ValueError):
+        AsyncTrajectorySink(path, append=True, encoding="delta")
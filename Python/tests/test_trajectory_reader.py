@@ -0,0 +1,114 @@
+"""
+Tests for the streaming trajectory readers
+Copyright 2021 Microsoft
+"""
+
+import csv
+
+import pytest
+
+pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from microsoft_bonsai_api.simulator.trajectory import (
+    iter_episodes,
+    map_episodes,
+    read_episodes,
+)
+
+
+def write_log(
+    path, episodes, steps, episode_column="episode", iteration_column="iteration"
+):
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(
+            ["Timestamp", "state_x", "Terminal", episode_column, iteration_column]
+        )
+        for episode in episodes:
+            for iteration in range(1, steps + 1):
+                writer.writerow(
+                    [
+                        "2022-08-02 15:52:27",
+                        episode * 1000 + iteration,
+                        iteration == steps,
+                        episode,
+                        iteration,
+                    ]
+                )
+    return str(path)
+
+
+def test_episodes_span_chunks(tmp_path):
+    path = write_log(tmp_path / "log.csv", range(1, 6), 7)
+    blocks = list(iter_episodes(path, chunk_rows=3))
+    assert [b.episode for b in blocks] == [1, 2, 3, 4, 5]
+    assert all(b.data.shape == (7, 5) for b in blocks)
+    assert list(blocks[2].column("state_x")) == list(range(3001, 3008))
+    assert np.isnan(blocks[0].column("Timestamp")).all()
+    assert blocks[0].column("Terminal")[-1] == 1
+
+
+def test_projection_and_predicates(tmp_path):
+    path = write_log(tmp_path / "log.csv", range(10), 5)
+    blocks = list(
+        iter_episodes(
+            path,
+            columns=["state_x"],
+            episodes=range(3, 6),
+            iterations={1, 5},
+            chunk_rows=4,
+        )
+    )
+    assert [b.episode for b in blocks] == [3, 4, 5]
+    assert blocks[0].columns == ["state_x"]
+    assert blocks[0].data.tolist() == [[3001], [3005]]
+
+
+def test_kql_columns_detected(tmp_path):
+    path = write_log(tmp_path / "kql.csv", [0, 1], 3, "EpisodeIndex", "IterationIndex")
+    blocks = list(iter_episodes(path, iterations=range(2, 4)))
+    assert [b.episode for b in blocks] == [0, 1]
+    assert blocks[1].column("IterationIndex").tolist() == [2, 3]
+
+
+def test_missing_column_raises(tmp_path):
+    path = write_log(tmp_path / "log.csv", [1], 1)
+    with pytest.raises(ValueError):
+        list(iter_episodes(path, columns=["state_y"]))
+
+
+def episode_length(block):
+    return block.episode, block.data.shape[0]
+
+
+def test_parallel_matches_serial(tmp_path):
+    paths = [
+        write_log(tmp_path / "a.csv", range(1, 4), 4),
+        write_log(tmp_path / "b.csv", range(4, 6), 6),
+    ]
+    kwargs = {"columns": ["state_x", "iteration"]}
+    serial = [(b.episode, b.data.tolist()) for b in read_episodes(paths, **kwargs)]
+    parallel = [
+        (b.episode, b.data.tolist()) for b in read_episodes(paths, processes=2, **kwargs)
+    ]
+    assert serial == parallel
+    assert map_episodes(episode_length, paths, processes=2) == [
+        (1, 4),
+        (2, 4),
+        (3, 4),
+        (4, 6),
+        (5, 6),
+    ]
+
+
+def test_parallel_streams_in_file_order_and_raises_worker_errors(tmp_path):
+    paths = [write_log(tmp_path / "{}.csv".format(i), [i], 3) for i in range(1, 5)]
+    blocks = read_episodes(paths, processes=2, prefetch=1, columns=["state_x"])
+    assert [b.episode for b in blocks] == [1, 2, 3, 4]
+
+    missing = paths[:1] + [str(tmp_path / "missing.csv")]
+    blocks = read_episodes(missing, processes=2, columns=["state_x"])
+    assert next(blocks).episode == 1
+    with pytest.raises(FileNotFoundError):
+        next(blocks)
@@ -0,0 +1,97 @@
+"""
+Tests for RotatingTrajectoryLog class
+Copyright 2021 Microsoft
+"""
+
+import gzip
+import os
+
+import pytest
+
+from microsoft_bonsai_api.simulator.trajectory import (
+    RotatingTrajectoryLog,
+    read_episodes,
+    segment_paths,
+)
+
+
+def write_episodes(log, episodes, iterations=10):
+    for episode in range(1, episodes + 1):
+        for i in range(iterations):
+            log.log({"episode": episode, "iteration": i, "x": episode * 100 + i})
+        log.episode_finish()
+
+
+def test_rotate_by_episode_count(tmp_path):
+    with RotatingTrajectoryLog(str(tmp_path), max_episodes=2) as log:
+        write_episodes(log, 5)
+
+    segments = log.segments
+    assert [s["index"] for s in segments] == [0, 1, 2]
+    assert [(s["first_episode"], s["last_episode"]) for s in segments] == [
+        (1, 2),
+        (3, 4),
+        (5, 5),
+    ]
+    assert all(s["compressed"] and not s["open"] for s in segments)
+    assert sorted(os.listdir(str(tmp_path))) == [
+        "log.00000.csv.gz",
+        "log.00001.csv.gz",
+        "log.00002.csv.gz",
+        "log.manifest.json",
+    ]
+    with gzip.open(str(tmp_path / "log.00000.csv.gz"), "rt") as fh:
+        assert fh.readline().strip() == "episode,iteration,x"
+
+
+def test_rotate_by_size(tmp_path):
+    with RotatingTrajectoryLog(str(tmp_path), max_bytes=100, compress=False) as log:
+        write_episodes(log, 3)
+
+    segments = log.segments
+    assert len(segments) == 4
+    assert sum(s["rows"] for s in segments) == 30
+    for s in segments:
+        assert s["bytes"] == os.path.getsize(str(tmp_path / s["file"]))
+        # a segment is closed by the first row that reaches the limit
+        assert s["bytes"] < 100 + 20
+
+
+def test_rotate_by_size_counts_bytes(tmp_path):
+    with RotatingTrajectoryLog(str(tmp_path), max_bytes=100, compress=False) as log:
+        for i in range(20):
+            log.log({"episode": 1, "iteration": i, "label": "\u00e9t\u00e9 \u2192 \u6771\u4eac"})
+
+    for s in log.segments:
+        assert s["bytes"] == os.path.getsize(str(tmp_path / s["file"]))
+
+
+def test_keep_segments(tmp_path):
+    with RotatingTrajectoryLog(str(tmp_path), max_episodes=1, keep_segments=2) as log:
+        write_episodes(log, 6)
+
+    assert [s["first_episode"] for s in log.segments] == [5, 6]
+    assert len(os.listdir(str(tmp_path))) == 3
+
+
+def test_read_manifest_in_order(tmp_path):
+    pytest.importorskip("pandas")
+    with RotatingTrajectoryLog(str(tmp_path), max_episodes=2) as log:
+        write_episodes(log, 5)
+
+    manifest = log.manifest_path
+    assert len(segment_paths(manifest)) == 3
+    blocks = list(read_episodes(manifest))
+    assert [b.episode for b in blocks] == [1, 2, 3, 4, 5]
+    assert blocks[2].column("x").tolist() == [300.0 + i for i in range(10)]
+
+
+def test_reopen_continues_numbering(tmp_path):
+    with RotatingTrajectoryLog(str(tmp_path), max_episodes=1) as log:
+        write_episodes(log, 2)
+    with RotatingTrajectoryLog(str(tmp_path), max_episodes=1) as log:
+        write_episodes(log, 1)
+
+    assert [s["index"] for s in log.segments] == [0, 1, 2]
+    with pytest.raises(RuntimeError):
+        log.log({"episode": 1})
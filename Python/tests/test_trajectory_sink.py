@@ -0,0 +1,155 @@
+"""
+Tests for AsyncTrajectorySink class
+Copyright 2021 Microsoft
+"""
+
+import csv
+import threading
+
+import pytest
+
+from microsoft_bonsai_api.simulator.trajectory import (
+    AsyncTrajectorySink,
+    OverflowPolicy,
+)
+from microsoft_bonsai_api.simulator.trajectory.sink import _FLUSH
+
+
+def read_rows(path):
+    with open(path, newline="") as fh:
+        return list(csv.DictReader(fh))
+
+
+def test_rows_written_in_order(tmp_path):
+    path = str(tmp_path / "log.csv")
+    with AsyncTrajectorySink(path) as sink:
+        for i in range(1000):
+            sink.log({"episode": 1, "iteration": i, "x": i * 0.5})
+
+    rows = read_rows(path)
+    assert len(rows) == 1000
+    assert [int(r["iteration"]) for r in rows] == list(range(1000))
+    assert sink.stats()["written"] == 1000
+    assert sink.stats()["dropped"] == 0
+
+
+def test_flush_on_episode_finish(tmp_path):
+    path = str(tmp_path / "log.csv")
+    sink = AsyncTrajectorySink(path, fieldnames=["episode", "iteration"])
+    sink.log({"episode": 1, "iteration": 1})
+    sink.log({"episode": 1, "iteration": 2, "unknown": 3})
+    sink.episode_finish()
+    assert sink.flush(timeout=5)
+
+    rows = read_rows(path)
+    assert len(rows) == 2
+    assert list(rows[0].keys()) == ["episode", "iteration"]
+    sink.close()
+
+
+class SlowSink(AsyncTrajectorySink):
+    """Writer thread held back until the test releases it."""
+
+    def __init__(self, *args, **kwargs):
+        self.release = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _run(self):
+        self.release.wait()
+        super()._run()
+
+
+def test_drop_oldest_keeps_newest_rows(tmp_path):
+    path = str(tmp_path / "log.csv")
+    sink = SlowSink(path, max_queue_size=10, overflow="drop_oldest")
+    for i in range(100):
+        assert sink.log({"iteration": i})
+    assert sink.stats()["dropped"] == 90
+    sink.release.set()
+    sink.close()
+
+    rows = read_rows(path)
+    assert [int(r["iteration"]) for r in rows] == list(range(90, 100))
+
+
+def test_sample_policy_drops_while_full(tmp_path):
+    path = str(tmp_path / "log.csv")
+    sink = SlowSink(
+        path, max_queue_size=10, overflow=OverflowPolicy.SAMPLE, sample_every=1000
+    )
+    accepted = sum(sink.log({"iteration": i}) for i in range(100))
+    assert accepted == 10
+    assert sink.stats()["dropped"] == 90
+    assert sink.stats()["max_queue_depth"] == 10
+    sink.release.set()
+    sink.close()
+    assert len(read_rows(path)) == 10
+
+
+def test_log_after_close_raises(tmp_path):
+    sink = AsyncTrajectorySink(str(tmp_path / "log.csv"))
+    sink.close()
+    with pytest.raises(RuntimeError):
+        sink.log({"iteration": 1})
+
+
+def test_invalid_policy(tmp_path):
+    with pytest.raises(ValueError):
+        AsyncTrajectorySink(str(tmp_path / "log.csv"), overflow="spill")
+
+
+def test_sample_policy_never_blocks(tmp_path):
+    path = str(tmp_path / "log.csv")
+    sink = SlowSink(path, max_queue_size=5, overflow="sample", sample_every=2)
+    # every second overflow row is sampled, but the queue stays full
+    accepted = sum(sink.log({"iteration": i}) for i in range(50))
+    assert accepted == 5
+    assert sink.stats()["dropped"] == 45
+    sink.release.set()
+    sink.close()
+
+
+def test_drop_oldest_keeps_markers_in_place(tmp_path):
+    path = str(tmp_path / "log.csv")
+    sink = SlowSink(path, max_queue_size=4, overflow="drop_oldest")
+    sink.log({"iteration": 0})
+    sink.episode_finish()
+    for i in range(1, 10):
+        assert sink.log({"iteration": i})
+    # the flush marker is still first, ahead of the rows that replaced row 0
+    assert sink._queue.queue[0] is _FLUSH
+    assert [row["iteration"] for row in list(sink._queue.queue)[1:]] == [7, 8, 9]
+    sink.release.set()
+    sink.close()
+    assert [int(r["iteration"]) for r in read_rows(path)] == [7, 8, 9]
+
+
+def test_flush_requests_never_wait_for_room(tmp_path):
+    path = str(tmp_path / "log.csv")
+    sink = SlowSink(path, max_queue_size=2)
+    sink.log({"iteration": 0})
+    sink.log({"iteration": 1})
+    # the queue is full and the writer held back: neither call may block
+    sink.episode_finish()
+    assert not sink.flush(timeout=0.2)
+    sink.release.set()
+    assert sink.flush(timeout=5)
+    assert [int(r["iteration"]) for r in read_rows(path)] == [0, 1]
+    sink.close()
+
+
+class StoppedSink(SlowSink):
+    """Writer thread that exits once released, without draining the queue."""
+
+    def _run(self):
+        self.release.wait()
+
+
+def test_blocked_log_raises_when_writer_stops(tmp_path):
+    sink = StoppedSink(str(tmp_path / "log.csv"), max_queue_size=1)
+    sink.log({"iteration": 0})
+    threading.Timer(0.2, sink.release.set).start()
+    with pytest.raises(RuntimeError):
+        sink.log({"iteration": 1})
+    # the queue is still full, close must not wait for room either
+    sink.close()
@@ -27,6 +27,13 @@ def get_app():
         "/v2/workspaces/{workspace}/simulatorSessions/{session_id}/advance",
         stub.get_next_event,
     )
+    app.router.add_delete(
+        "/v2/workspaces/{workspace}/simulatorSessions/{session_id}", stub.delete
+    )
+    brain = ExportedBrainStub()
+    app.router.add_get("/v1/prediction", brain.predict)
+    app.router.add_delete("/v1", brain.forget_memory)
+    app.router.add_get("/stub/connections", brain.connections)
     return app
 
 
@@ -91,9 +98,33 @@ class SimulatorGatewayStub:
 
         return web.json_response(MOCK_EPISODE_STEP_RESPONSE)
 
+    async def delete(self, request):
+        return web.Response(status=204)
+
     async def unregister(self, request):
         return web.json_response(MOCK_UNREGISTER_RESPONSE)
 
 
+class ExportedBrainStub:
+    """Stand-in for an exported brain: pushes the cart back towards 0."""
+
+    def __init__(self):
+        self._peers = set()
+
+    async def predict(self, request):
+        self._peers.add(request.transport.get_extra_info("peername"))
+        state = await request.json()
+        if "fail" in state:
+            return web.Response(status=400)
+        return web.json_response({"command": -state["cart_position"]})
+
+    async def forget_memory(self, request):
+        return web.Response(status=204)
+
+    async def connections(self, request):
+        """Number of distinct client connections that asked for predictions."""
+        return web.json_response({"count": len(self._peers)})
+
+
 if __name__ == "__main__":
     start_app()